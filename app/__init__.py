@@ -1,4 +1,5 @@
 import os
+import tempfile
 import traceback
 from typing import Optional
 
@@ -10,8 +11,15 @@ from sqlalchemy import Date, DateTime
 from werkzeug.exceptions import HTTPException
 from markupsafe import escape
 
+from .attachment_uploads import AttachmentUploadFinalizer
 from .auth import get_user
-from .models import db as sqlalchemy_db, Setting, FieldRegistry, PaymentPackage
+from .card_print_jobs import CardPrintJobRunner
+from .email_jobs import BrevoTransport, EmailJobRunner
+from .models import db as sqlalchemy_db, FieldRegistry
+from .field_registry_cache import field_registry_cache
+from .payment_package_cache import active_payment_packages, payment_package_cache
+from .settings_cache import SettingsCache
+from .storage import GCSStorage, LocalStorage
 
 DOCS_BASE_URL = "https://docs.pfotenregister.com"
 
@@ -76,9 +84,12 @@ def create_app(config_overrides: Optional[dict] = None):
     if config_overrides:
         app.config.update(config_overrides)
 
-    if app.config.get("TESTING"):
+    if app.config.get("TESTING") or app.config.get("STORAGE_BACKEND") == "local":
         app.storage_client = None
         app.bucket = None
+        app.storage = LocalStorage(
+            app.config.get("LOCAL_STORAGE_PATH") or tempfile.mkdtemp(prefix="pfotenregister-storage-")
+        )
     else:
         # If you’ve set GOOGLE_APPLICATION_CREDENTIALS in the env, load a SA key.
         creds_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
@@ -92,6 +103,7 @@ def create_app(config_overrides: Optional[dict] = None):
         # Make bucket object global for easy import
         app.storage_client = storage_client
         app.bucket = storage_client.bucket(app.config["GCS_BUCKET_NAME"])  # type: ignore
+        app.storage = GCSStorage(app.bucket)
 
     if not app.config.get("SQLALCHEMY_DATABASE_URI"):
         db_uri = (
@@ -108,6 +120,8 @@ def create_app(config_overrides: Optional[dict] = None):
 
     # Push application context before initializing the database.
     from . import db #not sqlalchemy yet
+    from . import search_index  # registers the shell search change listeners
+    from . import dashboard_stats  # registers the dashboard revision listeners
 
     @app.context_processor
     def inject_settings():
@@ -119,12 +133,7 @@ def create_app(config_overrides: Optional[dict] = None):
 
     @app.context_processor
     def inject_payment_packages():
-        packages = (
-            PaymentPackage.query.filter_by(active=True)
-            .order_by(PaymentPackage.display_order.asc(), PaymentPackage.name.asc())
-            .all()
-        )
-        return {"payment_packages": packages}
+        return {"payment_packages": active_payment_packages()}
 
     @app.errorhandler(Exception)
     def render_error_page(error):
@@ -229,18 +238,42 @@ def create_app(config_overrides: Optional[dict] = None):
 </html>"""
         return html, status_code
 
-    def load_settings():
-        rows = Setting.query.all()
-        settings = {}
-        for row in rows:
-            settings[row.setting_key] = {
-                "value": row.value,
-                "description": row.description,
-            }
-        return settings
+    app.settings_cache = SettingsCache(app, poll_seconds=app.config.get("SETTINGS_POLL_SECONDS", 5.0))
+    field_registry_cache.watch.poll_seconds = app.config.get("SETTINGS_POLL_SECONDS", 5.0)
+    payment_package_cache.watch.poll_seconds = app.config.get("SETTINGS_POLL_SECONDS", 5.0)
+    app.email_transport = BrevoTransport(pool_size=app.config.get("EMAIL_JOB_WORKERS", 4))
+    app.email_jobs = EmailJobRunner(
+        app,
+        workers=app.config.get("EMAIL_JOB_WORKERS", 4),
+        rate_per_second=app.config.get("EMAIL_JOB_RATE_PER_SECOND", 5.0),
+        max_attempts=app.config.get("EMAIL_JOB_MAX_ATTEMPTS", 3),
+        backoff_seconds=app.config.get("EMAIL_JOB_BACKOFF_SECONDS", 2.0),
+        batch_size=app.config.get("EMAIL_JOB_BATCH_SIZE", 25),
+        inline=app.config.get("EMAIL_JOBS_INLINE", False),
+        stale_after_minutes=app.config.get("EMAIL_JOB_STALE_MINUTES", 10),
+    )
+    app.card_print_jobs = CardPrintJobRunner(
+        app,
+        output_dir=app.config.get("CARD_PRINT_DIR"),
+        inline=app.config.get("CARD_PRINT_JOBS_INLINE", False),
+        stale_after_minutes=app.config.get("CARD_PRINT_JOB_STALE_MINUTES", 30),
+        keep_hours=app.config.get("CARD_PRINT_KEEP_HOURS", 24),
+    )
+    app.upload_finalizer = AttachmentUploadFinalizer(
+        app,
+        workers=app.config.get("ATTACHMENT_FINALIZE_WORKERS", 2),
+        inline=app.config.get("ATTACHMENT_FINALIZE_INLINE", False),
+        stale_after_minutes=app.config.get("ATTACHMENT_FINALIZE_STALE_MINUTES", 10),
+        expire_after_hours=app.config.get("ATTACHMENT_UPLOAD_EXPIRE_HOURS", 48),
+        sweep_seconds=app.config.get("ATTACHMENT_UPLOAD_SWEEP_SECONDS", 300),
+    )
 
     def refresh_settings():
-        app.config["SETTINGS"] = load_settings()
+        app.settings_cache.reload()
+
+    @app.before_request
+    def sync_settings():
+        app.settings_cache.ensure_fresh()
 
     def default_label(name: str) -> str:
         return name.replace("_", " ").capitalize()
@@ -335,4 +368,10 @@ def create_app(config_overrides: Optional[dict] = None):
     app.register_blueprint(admin_bp)
     app.register_blueprint(admin_io_bp)
 
+    # Background work left behind by a previous process (restart, deploy) is picked up at startup.
+    if app.config.get("BACKGROUND_WORKERS_AUTOSTART") and not app.config.get("TESTING"):
+        app.email_jobs.start()
+        app.card_print_jobs.start()
+        app.upload_finalizer.start()
+
     return app
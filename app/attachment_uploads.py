@@ -0,0 +1,337 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from .helpers import attachment_blob_path
+from .models import db, Attachment, AttachmentUpload, AttachmentUploadPart
+
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be accepted; the message is shown to the user."""
+
+
+STAGING_PREFIX = "uploads/"
+
+
+def part_path(upload_id: str, part_number: int) -> str:
+    return f"{STAGING_PREFIX}{upload_id}/{part_number:05d}"
+
+
+def start_upload(
+    owner_id: str,
+    filename: str,
+    size: int,
+    chunk_size: int,
+    content_type: Optional[str] = None,
+    created_by_id: Optional[int] = None,
+) -> AttachmentUpload:
+    if not filename:
+        raise UploadError("Keine Datei ausgewählt.")
+    if size < 0:
+        raise UploadError("Ungültige Dateigröße.")
+    upload = AttachmentUpload(
+        id=uuid.uuid4().hex,
+        owner_id=str(owner_id),
+        filename=filename,
+        content_type=content_type or "application/octet-stream",
+        size=size,
+        chunk_size=chunk_size,
+        status="open",
+        created_by_id=created_by_id,
+    )
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def expected_part_size(upload: AttachmentUpload, part_number: int) -> int:
+    if part_number == upload.part_count - 1:
+        return upload.size - part_number * upload.chunk_size
+    return upload.chunk_size
+
+
+def store_part(storage, upload: AttachmentUpload, part_number: int, stream: BinaryIO, length: Optional[int]) -> None:
+    """Write one part to storage and record it; sending a part again replaces it."""
+    if upload.status not in ("open", "failed"):
+        raise UploadError("Der Upload ist bereits abgeschlossen.")
+    if not 0 <= part_number < upload.part_count:
+        raise UploadError("Ungültige Teilnummer.")
+    expected = expected_part_size(upload, part_number)
+    if length != expected:
+        raise UploadError(f"Teil {part_number} muss {expected} Bytes groß sein.")
+
+    storage.put(part_path(upload.id, part_number), stream, content_type="application/octet-stream")
+    part = db.session.get(AttachmentUploadPart, (upload.id, part_number))
+    if part is None:
+        db.session.add(AttachmentUploadPart(upload_id=upload.id, part_number=part_number, size=length))
+    else:
+        part.size = length
+        part.received_on = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The same part arrived twice at once; the stored copy is complete either way.
+        db.session.rollback()
+
+
+def signed_part_urls(storage, upload: AttachmentUpload, parts: List[int], expires_minutes: int) -> Dict[int, str]:
+    """
+    URLs the browser PUTs the given parts to, straight into the bucket. Empty if the storage
+    cannot sign uploads; the parts are then sent through ``store_part``.
+    """
+    urls = {}
+    for part_number in parts:
+        url = storage.signed_upload_url(part_path(upload.id, part_number), expires_minutes)
+        if url is None:
+            return {}
+        urls[part_number] = url
+    return urls
+
+
+def sync_stored_parts(storage, upload: AttachmentUpload) -> None:
+    """Record parts the browser uploaded directly to storage; objects of the wrong size are ignored."""
+    if upload.status not in ("open", "failed"):
+        return
+    recorded = set(received_parts(upload))
+    added = False
+    for path, size in storage.list_sizes(f"{STAGING_PREFIX}{upload.id}/").items():
+        try:
+            part_number = int(path.rsplit("/", 1)[1])
+        except ValueError:
+            continue
+        if part_number in recorded or not 0 <= part_number < upload.part_count:
+            continue
+        if size != expected_part_size(upload, part_number):
+            continue
+        db.session.add(AttachmentUploadPart(upload_id=upload.id, part_number=part_number, size=size))
+        added = True
+    if added:
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request recorded the same parts at the same time.
+            db.session.rollback()
+
+
+def received_parts(upload: AttachmentUpload) -> List[int]:
+    return [
+        part_number
+        for (part_number,) in db.session.query(AttachmentUploadPart.part_number).filter_by(upload_id=upload.id)
+    ]
+
+
+def missing_parts(upload: AttachmentUpload) -> List[int]:
+    received = set(received_parts(upload))
+    return [number for number in range(upload.part_count) if number not in received]
+
+
+def upload_progress(upload: AttachmentUpload) -> dict:
+    missing = missing_parts(upload)
+    return {
+        "id": upload.id,
+        "status": upload.status,
+        "filename": upload.filename,
+        "size": upload.size,
+        "chunk_size": upload.chunk_size,
+        "part_count": upload.part_count,
+        "missing_parts": missing,
+        "received_parts": upload.part_count - len(missing),
+        "attachment_id": upload.attachment_id,
+        "error": upload.error,
+    }
+
+
+def request_finalize(upload: AttachmentUpload) -> bool:
+    """Mark a fully received upload for finalizing; False if it is incomplete or already being finalized."""
+    if missing_parts(upload):
+        return False
+    claimed = db.session.execute(
+        update(AttachmentUpload)
+        .where(AttachmentUpload.id == upload.id, AttachmentUpload.status.in_(("open", "failed")))
+        .values(status="finalizing", error=None, finalize_requested_on=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+class AttachmentUploadFinalizer:
+    """
+    Assembles uploaded parts into the final object off the request thread and records the attachment.
+    Jobs live in this process only, so a background sweep every ``sweep_seconds`` picks up uploads
+    left in "finalizing" for ``stale_after_minutes`` (e.g. by a restart), expires uploads untouched
+    for ``expire_after_hours`` and deletes staging parts nobody needs any more.
+    With ``inline=True`` finalizing runs synchronously (tests).
+    """
+
+    def __init__(
+        self,
+        app,
+        workers: int = 2,
+        inline: bool = False,
+        stale_after_minutes: int = 10,
+        expire_after_hours: int = 48,
+        sweep_seconds: float = 300,
+    ):
+        self.app = app
+        self.workers = workers
+        self.inline = inline
+        self.stale_after_minutes = stale_after_minutes
+        self.expire_after_hours = expire_after_hours
+        self.sweep_seconds = sweep_seconds
+        self._executor = None
+        self._sweeper = None
+        self._lock = threading.Lock()
+
+    def submit(self, upload_id: str) -> None:
+        if self.inline:
+            self.finalize(upload_id)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload-finalize")
+        self._executor.submit(self.finalize, upload_id)
+
+    def start(self) -> None:
+        """Start the background sweep; the first run recovers what a previous process left behind."""
+        with self._lock:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="upload-sweep", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while True:
+            try:
+                self.recover()
+            except Exception:  # noqa: BLE001
+                self.app.logger.exception("Upload-Aufräumlauf fehlgeschlagen")
+            time.sleep(self.sweep_seconds)
+
+    def recover(self) -> dict:
+        """Resubmit stale finalize jobs, expire abandoned uploads and delete unneeded staging parts."""
+        with self.app.app_context():
+            try:
+                now = datetime.utcnow()
+                resubmitted = self._claim_stale_finalizing(now - timedelta(minutes=self.stale_after_minutes), now)
+                expired = db.session.execute(
+                    update(AttachmentUpload)
+                    .where(
+                        AttachmentUpload.status.in_(("open", "failed")),
+                        AttachmentUpload.created_on < now - timedelta(hours=self.expire_after_hours),
+                    )
+                    .values(status="expired", finished_on=now)
+                ).rowcount
+                db.session.commit()
+                deleted = self._delete_unneeded_parts()
+            finally:
+                db.session.remove()
+        for upload_id in resubmitted:
+            self.submit(upload_id)
+        return {"resubmitted": len(resubmitted), "expired": expired, "deleted_parts": deleted}
+
+    @staticmethod
+    def _claim_stale_finalizing(stale_before: datetime, now: datetime) -> List[str]:
+        stale = or_(
+            AttachmentUpload.finalize_requested_on.is_(None),
+            AttachmentUpload.finalize_requested_on < stale_before,
+        )
+        upload_ids = [
+            upload_id
+            for (upload_id,) in db.session.query(AttachmentUpload.id).filter(
+                AttachmentUpload.status == "finalizing", stale
+            )
+        ]
+        claimed = []
+        for upload_id in upload_ids:
+            # Moving the timestamp forward keeps other workers' sweeps off the same upload.
+            if db.session.execute(
+                update(AttachmentUpload)
+                .where(AttachmentUpload.id == upload_id, AttachmentUpload.status == "finalizing", stale)
+                .values(finalize_requested_on=now)
+            ).rowcount:
+                claimed.append(upload_id)
+        db.session.commit()
+        return claimed
+
+    def _delete_unneeded_parts(self) -> int:
+        """Staging parts of finished, expired or unknown uploads; parts of live uploads stay."""
+        storage = self.app.storage
+        paths_by_upload = defaultdict(list)
+        for path in storage.list_sizes(STAGING_PREFIX):
+            paths_by_upload[path[len(STAGING_PREFIX):].split("/", 1)[0]].append(path)
+        if not paths_by_upload:
+            return 0
+        live = {
+            upload_id
+            for (upload_id,) in db.session.query(AttachmentUpload.id).filter(
+                AttachmentUpload.id.in_(list(paths_by_upload)),
+                AttachmentUpload.status.in_(("open", "failed", "finalizing")),
+            )
+        }
+        unneeded = [upload_id for upload_id in paths_by_upload if upload_id not in live]
+        paths = [path for upload_id in unneeded for path in paths_by_upload[upload_id]]
+        storage.delete_many(paths)
+        db.session.query(AttachmentUploadPart).filter(AttachmentUploadPart.upload_id.in_(unneeded)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        return len(paths)
+
+    def finalize(self, upload_id: str) -> None:
+        with self.app.app_context():
+            try:
+                upload = db.session.get(AttachmentUpload, upload_id)
+                if upload is None or upload.status != "finalizing":
+                    return
+                storage = self.app.storage
+                parts = [part_path(upload.id, number) for number in range(upload.part_count)]
+                new_path = upload.gcs_path is None
+                gcs_path = upload.gcs_path or attachment_blob_path(upload.owner_id, upload.filename)
+                storage.compose(gcs_path, parts, content_type=upload.content_type)
+
+                attachment = Attachment(
+                    owner_id=upload.owner_id,
+                    filename=upload.filename,
+                    gcs_path=gcs_path,
+                    uploaded_on=datetime.today(),
+                )
+                db.session.add(attachment)
+                db.session.flush()
+                # A resubmitted job may race the original one; only the first to get here records the file.
+                finished = db.session.execute(
+                    update(AttachmentUpload)
+                    .where(AttachmentUpload.id == upload_id, AttachmentUpload.status == "finalizing")
+                    .values(
+                        gcs_path=gcs_path,
+                        attachment_id=attachment.id,
+                        status="done",
+                        finished_on=datetime.utcnow(),
+                    )
+                ).rowcount
+                if not finished:
+                    db.session.rollback()
+                    if new_path:
+                        storage.delete(gcs_path)
+                    return
+                db.session.commit()
+                try:
+                    storage.delete_many(parts)
+                except Exception:  # noqa: BLE001
+                    self.app.logger.exception("Upload-Teile von %s konnten nicht gelöscht werden", upload_id)
+            except Exception as exc:  # noqa: BLE001
+                db.session.rollback()
+                self.app.logger.exception("Upload %s konnte nicht abgeschlossen werden", upload_id)
+                db.session.execute(
+                    update(AttachmentUpload)
+                    .where(AttachmentUpload.id == upload_id, AttachmentUpload.status == "finalizing")
+                    .values(status="failed", error=str(exc))
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
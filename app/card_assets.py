@@ -0,0 +1,169 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import qrcode
+import requests
+from flask import current_app
+from reportlab.lib.utils import ImageReader
+
+
+class QRCodeCache:
+    """
+    Content-addressed cache of rendered QR code PNGs.
+    Entries live in a bounded in-memory LRU and, if a directory is configured, on disk.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(payload: str) -> str:
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def png(self, payload: str, disk_dir: Optional[str] = None) -> bytes:
+        """Return the PNG bytes of the QR code for `payload`, rendering it only on a cache miss."""
+        key = self.key(payload)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        path = os.path.join(disk_dir, f"{key}.png") if disk_dir else None
+        data = None
+        if path and os.path.exists(path):
+            with open(path, "rb") as handle:
+                data = handle.read()
+        if data is None:
+            buffer = io.BytesIO()
+            qrcode.make(payload).save(buffer, format="PNG")
+            data = buffer.getvalue()
+            if path:
+                os.makedirs(disk_dir, exist_ok=True)
+                # Write to a unique temporary file first so other threads and workers never read
+                # a partial file.
+                with tempfile.NamedTemporaryFile(dir=disk_dir, suffix=".tmp", delete=False) as handle:
+                    handle.write(data)
+                os.replace(handle.name, path)
+
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def reader(self, payload: str, disk_dir: Optional[str] = None) -> ImageReader:
+        return ImageReader(io.BytesIO(self.png(payload, disk_dir=disk_dir)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class LogoCache:
+    """
+    Decoded logo images keyed by source.
+    Local files are keyed by path and mtime, raw data by content hash,
+    and remote logos by URL, revalidated via ETag after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._local = {}
+        self._remote = {}
+        self._decoded = {}
+        self._lock = threading.Lock()
+
+    def local(self, path: str) -> ImageReader:
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._local.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, ImageReader(path))
+                self._local[path] = cached
+            return cached[1]
+
+    def from_bytes(self, data: bytes) -> ImageReader:
+        """Return a shared reader for raw image data, keyed by its content hash."""
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            reader = self._decoded.get(key)
+            if reader is None:
+                reader = ImageReader(io.BytesIO(data))
+                self._decoded[key] = reader
+            return reader
+
+    def remote(self, url: str) -> ImageReader:
+        return self._remote_entry(url)["reader"]
+
+    def remote_data(self, url: str) -> bytes:
+        return self._remote_entry(url)["data"]
+
+    def _remote_entry(self, url: str) -> dict:
+        with self._lock:
+            entry = self._remote.get(url)
+        now = time.monotonic()
+        if entry is not None and now - entry["checked_at"] < self.ttl:
+            return entry
+
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        resp = requests.get(url, headers=headers, timeout=10)
+        if entry is not None and resp.status_code == 304:
+            entry = {**entry, "checked_at": now}
+        else:
+            resp.raise_for_status()
+            entry = {
+                "etag": resp.headers.get("ETag"),
+                "data": resp.content,
+                "reader": ImageReader(io.BytesIO(resp.content)),
+                "checked_at": now,
+            }
+        with self._lock:
+            self._remote[url] = entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+            self._remote.clear()
+            self._decoded.clear()
+
+
+qr_code_cache = QRCodeCache()
+logo_cache = LogoCache()
+
+
+def static_logo_path() -> str:
+    return os.path.join(current_app.root_path, "static", "logo.png")
+
+
+def load_logo_reader(url: Optional[str]) -> ImageReader:
+    """Return a shared ImageReader for the configured logo URL or static path."""
+    if not url or url == "/static/logo.png":
+        return logo_cache.local(static_logo_path())
+    if url.startswith("http"):
+        return logo_cache.remote(url)
+    # lokaler Pfad relativ zum static-Ordner
+    return logo_cache.local(os.path.join(current_app.root_path, "static", url))
+
+
+def load_logo_bytes(url: Optional[str]) -> bytes:
+    """Return the raw logo image, e.g. to hand it to card rendering worker processes."""
+    if url and url.startswith("http"):
+        return logo_cache.remote_data(url)
+    path = static_logo_path() if not url or url == "/static/logo.png" else os.path.join(
+        current_app.root_path, "static", url
+    )
+    with open(path, "rb") as handle:
+        return handle.read()
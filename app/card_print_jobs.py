@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import update
+
+from .models import db, CardPrintJob, Guest
+from .reports import generate_multiple_gast_cards_pdf, generate_multiple_gast_cards_pdf_parallel
+
+
+def create_card_print_job(
+    guest_ids: Iterable[str],
+    double_sided: bool = False,
+    flip_backside: bool = False,
+    created_by_id: Optional[int] = None,
+) -> CardPrintJob:
+    """Persist a queued guest card print job; the cards are printed in the given order."""
+    guest_ids = list(dict.fromkeys(guest_ids))
+    job = CardPrintJob(
+        status="queued",
+        guest_ids=json.dumps(guest_ids),
+        total=len(guest_ids),
+        double_sided=double_sided,
+        flip_backside=double_sided and flip_backside,
+        created_by_id=created_by_id,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def card_print_job_progress(job: CardPrintJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "error": job.error,
+        "created_on": job.created_on.isoformat(timespec="seconds") if job.created_on else None,
+        "finished_on": job.finished_on.isoformat(timespec="seconds") if job.finished_on else None,
+    }
+
+
+class CardPrintJobRunner:
+    """
+    Renders guest card PDFs off the request thread and keeps each file for download.
+    Jobs run one at a time on a background thread of this process; large print runs fan out on the
+    card process pool themselves (see ``GUEST_CARD_PDF_WORKERS``). Since jobs live in this process only,
+    ``recover`` fails jobs still queued or running after ``stale_after_minutes`` (e.g. across a restart)
+    and deletes PDFs older than ``keep_hours``. With ``inline=True`` jobs run synchronously (tests).
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir: Optional[str] = None,
+        inline: bool = False,
+        stale_after_minutes: int = 30,
+        keep_hours: int = 24,
+    ):
+        self.app = app
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "pfotenregister-card-prints")
+        self.inline = inline
+        self.stale_after_minutes = stale_after_minutes
+        self.keep_hours = keep_hours
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: int) -> None:
+        if self.inline:
+            self.run_job(job_id)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="card-print")
+        self._executor.submit(self.run_job, job_id)
+
+    def start(self) -> None:
+        """Clean up after a previous process: fail its unfinished jobs and delete expired PDFs."""
+        try:
+            self.recover()
+        except Exception:  # noqa: BLE001
+            self.app.logger.exception("Aufräumen der Gästekarten-Druckaufträge fehlgeschlagen")
+
+    def recover(self) -> dict:
+        with self.app.app_context():
+            try:
+                now = datetime.utcnow()
+                abandoned = db.session.execute(
+                    update(CardPrintJob)
+                    .where(
+                        CardPrintJob.status.in_(("queued", "running")),
+                        CardPrintJob.created_on < now - timedelta(minutes=self.stale_after_minutes),
+                    )
+                    .values(status="failed", error="Abgebrochen, bitte erneut erstellen.", finished_on=now)
+                ).rowcount
+                expired = CardPrintJob.query.filter(
+                    CardPrintJob.status == "done",
+                    CardPrintJob.finished_on < now - timedelta(hours=self.keep_hours),
+                ).all()
+                for job in expired:
+                    self._remove_file(job.file_path)
+                    job.status = "expired"
+                    job.file_path = None
+                db.session.commit()
+            finally:
+                db.session.remove()
+        return {"abandoned": abandoned, "expired": len(expired)}
+
+    def run_job(self, job_id: int) -> None:
+        with self.app.app_context():
+            try:
+                claimed = db.session.execute(
+                    update(CardPrintJob)
+                    .where(CardPrintJob.id == job_id, CardPrintJob.status == "queued")
+                    .values(status="running", started_on=datetime.utcnow())
+                ).rowcount
+                db.session.commit()
+                if not claimed:
+                    return
+                job = db.session.get(CardPrintJob, job_id)
+                guest_ids = json.loads(job.guest_ids)
+                path = self._write_pdf(job_id, self._render(guest_ids, job.double_sided, job.flip_backside))
+                Guest.query \
+                    .filter(Guest.id.in_(guest_ids)) \
+                    .update({"guest_card_printed_on": datetime.today()}, synchronize_session=False)
+                job.status = "done"
+                job.file_path = path
+                job.finished_on = datetime.utcnow()
+                db.session.commit()
+            except Exception as exc:  # noqa: BLE001
+                db.session.rollback()
+                self.app.logger.exception("Gästekarten-Druckauftrag %s fehlgeschlagen", job_id)
+                db.session.execute(
+                    update(CardPrintJob)
+                    .where(CardPrintJob.id == job_id, CardPrintJob.status == "running")
+                    .values(status="failed", error=str(exc), finished_on=datetime.utcnow())
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def _render(self, guest_ids, double_sided, flip_backside):
+        generate = generate_multiple_gast_cards_pdf
+        if (
+            self.app.config.get("GUEST_CARD_PDF_WORKERS", 1) > 1
+            and len(guest_ids) >= self.app.config.get("GUEST_CARD_PARALLEL_MIN_CARDS", 200)
+        ):
+            generate = generate_multiple_gast_cards_pdf_parallel
+        if double_sided:
+            return generate(guest_ids, double_sided=True, flip_backside=flip_backside)
+        return generate(guest_ids)
+
+    def _write_pdf(self, job_id: int, pdf_buffer) -> str:
+        """Write the PDF next to its final name first, so a download never sees a partial file."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"guest-cards-{job_id}.pdf")
+        with tempfile.NamedTemporaryFile(dir=self.output_dir, suffix=".tmp", delete=False) as handle:
+            shutil.copyfileobj(pdf_buffer, handle)
+        os.replace(handle.name, path)
+        return path
+
+    @staticmethod
+    def _remove_file(path: Optional[str]) -> None:
+        if not path:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
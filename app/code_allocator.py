@@ -0,0 +1,104 @@
+import bisect
+import secrets
+import string
+import threading
+import time
+from typing import Callable, List
+
+from sqlalchemy.exc import IntegrityError
+
+from .models import db, Guest
+
+CODE_ALPHABET = (
+    "".join(c for c in string.ascii_uppercase if c not in "IO")
+    + "".join(c for c in string.ascii_lowercase if c not in "lo")
+    + "".join(c for c in string.digits if c not in "01")
+)
+
+
+class GuestCodeAllocator:
+    """
+    Hands out unused guest ids without a query per code.
+    Candidates are checked against a sorted per-process snapshot of existing ids plus the codes
+    this process already handed out. Other workers may insert ids after the snapshot was taken,
+    so the primary key stays the final check: callers retry on conflict (see `commit_with_guest_code`)
+    or ask `reserve` to verify candidates against the database in one query.
+    """
+
+    def __init__(self, length: int = 6, max_age_seconds: float = 300.0):
+        self.length = length
+        self.max_age_seconds = max_age_seconds
+        self._existing: List[str] = []
+        self._reserved = set()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _snapshot_locked(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.max_age_seconds:
+            return
+        self._existing = [row[0] for row in db.session.query(Guest.id).order_by(Guest.id).all()]
+        # Codes handed out before are either in the new snapshot or were never used.
+        self._reserved = set()
+        self._loaded_at = time.monotonic()
+
+    def _known_locked(self, code: str) -> bool:
+        index = bisect.bisect_left(self._existing, code)
+        return (index < len(self._existing) and self._existing[index] == code) or code in self._reserved
+
+    def reserve(self, count: int, verify: bool = False, length: int = None) -> List[str]:
+        """
+        Return `count` distinct codes unknown to this process and mark them as handed out.
+        With `verify`, the candidates are also checked against the database in one query per round.
+        """
+        length = length or self.length
+        codes = []
+        with self._lock:
+            self._snapshot_locked()
+            while len(codes) < count:
+                candidates = set()
+                while len(candidates) < count - len(codes):
+                    code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(length))
+                    if not self._known_locked(code):
+                        candidates.add(code)
+                if verify:
+                    taken = _existing_ids(candidates)
+                    for code in taken:
+                        bisect.insort(self._existing, code)
+                    candidates -= taken
+                self._reserved.update(candidates)
+                codes.extend(candidates)
+        return codes
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+def _existing_ids(codes) -> set:
+    codes = list(codes)
+    taken = set()
+    for i in range(0, len(codes), 500):
+        chunk = codes[i:i + 500]
+        taken.update(row[0] for row in db.session.query(Guest.id).filter(Guest.id.in_(chunk)))
+    return taken
+
+
+guest_codes = GuestCodeAllocator()
+
+
+def commit_with_guest_code(add_rows: Callable[[str], None], attempts: int = 5) -> str:
+    """
+    Reserve a guest id, let `add_rows` add the guest and its dependent rows, and commit.
+    If another worker inserted the same id in the meantime, roll back and retry with a new one.
+    """
+    for attempt in range(1, attempts + 1):
+        guest_id = guest_codes.reserve(1)[0]
+        add_rows(guest_id)
+        try:
+            db.session.commit()
+            return guest_id
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == attempts or not _existing_ids([guest_id]):
+                raise
+            guest_codes.invalidate()
@@ -0,0 +1,271 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Dict, Mapping
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import db, Animal, FoodHistory, FoodTag, Guest, MedicalEvent, Payment
+from .settings_cache import bump_revision_after_commit, read_revisions
+
+DASHBOARD_REVISION_PREFIX = "dashboard:"
+
+# Models whose changes invalidate each dashboard section.
+DASHBOARD_SECTION_MODELS = {
+    "guests": (Guest,),
+    "visits": (Guest, FoodHistory),
+    "payments": (FoodHistory, Payment),
+    "medical": (MedicalEvent,),
+    "animals": (Animal, FoodTag),
+}
+
+# Sections whose values depend on today's date and are recomputed once per day.
+DATE_DEPENDENT_SECTIONS = {"visits", "medical"}
+
+
+def _guest_stats(today: date) -> dict:
+    counts = dict(
+        db.session.query(Guest.lifecycle_status, db.func.count())
+        .group_by(Guest.lifecycle_status)
+        .all()
+    )
+    return {
+        "total_guests": sum(counts.values()),
+        "active_guests": counts.get("active", 0),
+        "staging_guests": counts.get("staging", 0),
+    }
+
+
+def _visit_stats(today: date) -> dict:
+    recent_guests = (
+        FoodHistory.query.filter(FoodHistory.distributed_on >= today - timedelta(days=30))
+        .with_entities(FoodHistory.guest_id)
+        .distinct()
+        .count()
+    )
+    top_guests_by_visits = (
+        db.session.query(Guest.number, Guest.firstname, Guest.lastname, Guest.id,
+                         db.func.count(FoodHistory.id).label("besuche"))
+        .outerjoin(FoodHistory, Guest.id == FoodHistory.guest_id)
+        .group_by(Guest.id)
+        .order_by(db.desc("besuche"))
+        .limit(10)
+        .all()
+    )
+    return {
+        "recent_guests": recent_guests,
+        "top_guests_by_visits": tuple(top_guests_by_visits),
+    }
+
+
+def _payment_stats(today: date) -> dict:
+    payment_trends = (
+        db.session.query(
+            FoodHistory.distributed_on,
+            db.func.coalesce(db.func.sum(Payment.food_amount), 0).label("Futtersumme"),
+            db.func.coalesce(db.func.sum(Payment.other_amount), 0).label("Andere"),
+        )
+        .outerjoin(Payment,
+                   (FoodHistory.guest_id == Payment.guest_id) & (Payment.paid_on == FoodHistory.distributed_on))
+        .group_by(FoodHistory.distributed_on)
+        .order_by(FoodHistory.distributed_on.asc())
+        .limit(30)
+        .all()
+    )
+    return {"payment_trends": tuple(payment_trends)}
+
+
+def _medical_stats(today: date) -> dict:
+    counts = dict(
+        db.session.query(MedicalEvent.status, db.func.count())
+        .group_by(MedicalEvent.status)
+        .all()
+    )
+    upcoming_follow_ups = (
+        MedicalEvent.query.filter(
+            MedicalEvent.follow_up_on.isnot(None),
+            MedicalEvent.follow_up_on >= today,
+            MedicalEvent.follow_up_on <= today + timedelta(days=14),
+        ).count()
+    )
+    total_medical_actual_cost = (
+        db.session.query(db.func.coalesce(db.func.sum(MedicalEvent.actual_cost), 0)).scalar() or 0
+    )
+    return {
+        "total_medical_events": sum(counts.values()),
+        "planned_medical_events": counts.get("Geplant", 0),
+        "active_medical_events": counts.get("Aktiv", 0),
+        "past_medical_events": counts.get("Abgeschlossen", 0) + counts.get("Abgesagt", 0),
+        "upcoming_follow_ups": upcoming_follow_ups,
+        "total_medical_actual_cost": total_medical_actual_cost,
+    }
+
+
+def _animal_stats(today: date) -> dict:
+    animals_by_type = (
+        Animal.query.with_entities(Animal.species, db.func.count().label("count"))
+        .group_by(Animal.species)
+        .all()
+    )
+
+    aft = db.metadata.tables.get("animal_food_tags")
+    # Build counts for (tag, species) + also derive "associated species" per tag.
+    tag_species_rows = (
+        db.session.query(
+            FoodTag.id.label("tag_id"),
+            FoodTag.name.label("tag_name"),
+            FoodTag.color.label("tag_color"),
+            Animal.species.label("species"),
+            db.func.count(db.distinct(Animal.id)).label("animal_count"),
+        )
+        .join(aft, aft.c.food_tag_id == FoodTag.id)
+        .join(Animal, Animal.id == aft.c.animal_id)
+        .filter(Animal.species.isnot(None))
+        .group_by(FoodTag.id, FoodTag.name, FoodTag.color, Animal.species)
+        .all()
+    )
+
+    associated_species_by_tag = defaultdict(set)
+    rows_by_species = defaultdict(list)
+    for row in tag_species_rows:
+        if row.species:
+            associated_species_by_tag[row.tag_id].add(row.species)
+            rows_by_species[row.species].append(row)
+
+    species_labels = sorted(row.species for row in animals_by_type if row.species)
+    species_tabs = []
+    top_tags_by_species = {}
+    for label in species_labels:
+        tab_id = re.sub(r"[^a-z0-9_-]+", "_", str(label).strip().lower()).strip("_") or "unknown"
+        species_tabs.append(MappingProxyType({"id": tab_id, "label": label}))
+        entries = [
+            {
+                "id": row.tag_id,
+                "name": row.tag_name,
+                "color": row.tag_color,
+                "count": int(row.animal_count or 0),
+                "associated_species": tuple(sorted(associated_species_by_tag.get(row.tag_id, set()))),
+            }
+            for row in rows_by_species.get(label, [])
+        ]
+        entries.sort(key=lambda e: (-e["count"], e["name"].lower()))
+        top_tags_by_species[tab_id] = tuple(MappingProxyType(entry) for entry in entries[:10])
+
+    return {
+        "total_animals": sum(count for _, count in animals_by_type),
+        "animals_by_type": tuple(animals_by_type),
+        "species_tabs": tuple(species_tabs),
+        "top_tags_by_species": MappingProxyType(top_tags_by_species),
+    }
+
+
+DASHBOARD_SECTION_BUILDERS = {
+    "guests": _guest_stats,
+    "visits": _visit_stats,
+    "payments": _payment_stats,
+    "medical": _medical_stats,
+    "animals": _animal_stats,
+}
+
+
+@dataclass(frozen=True)
+class DashboardSection:
+    """Materialized values of one dashboard section and the revision they were computed for."""
+
+    revision: int
+    computed_for: date
+    computed_at: float
+    values: Mapping[str, object]
+
+
+class DashboardStatsCache:
+    """
+    Per-process dashboard statistics, materialized per section.
+    Each section is recomputed only when its shared revision changed, its date window moved,
+    or it is older than ``max_age_seconds``; everything else is served from memory.
+    A changed revision triggers a rebuild at most once per ``min_rebuild_seconds``, so a
+    steady stream of food history or payment writes does not rerun the aggregates on every visit.
+    """
+
+    def __init__(self, max_age_seconds: float = 3600.0, min_rebuild_seconds: float = 60.0):
+        self.max_age_seconds = max_age_seconds
+        self.min_rebuild_seconds = min_rebuild_seconds
+        self._sections: Dict[str, DashboardSection] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"section_builds": 0, "full_recomputes": 0}
+
+    def stats(self, force: bool = False) -> Dict[str, object]:
+        """Return all dashboard values, rebuilding stale sections (or all of them with ``force``)."""
+        revisions = {
+            name[len(DASHBOARD_REVISION_PREFIX):]: revision
+            for name, revision in read_revisions(DASHBOARD_REVISION_PREFIX).items()
+        }
+        today = date.today()
+        now = time.monotonic()
+        with self._lock:
+            sections = dict(self._sections)
+        for name, build in DASHBOARD_SECTION_BUILDERS.items():
+            cached = sections.get(name)
+            revision = revisions.get(name, 0)
+            if (
+                force
+                or cached is None
+                or (cached.revision != revision and now - cached.computed_at >= self.min_rebuild_seconds)
+                or (name in DATE_DEPENDENT_SECTIONS and cached.computed_for != today)
+                or now - cached.computed_at > self.max_age_seconds
+            ):
+                sections[name] = DashboardSection(
+                    revision=revision,
+                    computed_for=today,
+                    computed_at=now,
+                    values=MappingProxyType(build(today)),
+                )
+                self._metrics["section_builds"] += 1
+        if force:
+            self._metrics["full_recomputes"] += 1
+        with self._lock:
+            self._sections = sections
+
+        merged = {}
+        for section in sections.values():
+            merged.update(section.values)
+        return merged
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sections = {}
+
+    def metrics(self) -> dict:
+        return dict(self._metrics)
+
+
+dashboard_stats = DashboardStatsCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_dashboard_revisions(session, flush_context):
+    """Bump, after commit, the revision of every dashboard section whose source rows were written in this flush."""
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for section, models in DASHBOARD_SECTION_MODELS.items():
+            if isinstance(obj, models):
+                changed.add(section)
+    if changed:
+        bump_revision_after_commit(session, (f"{DASHBOARD_REVISION_PREFIX}{section}" for section in changed))
+
+
+def mark_dashboard_changed(*models) -> None:
+    """Bump the sections fed by models written through bulk statements, which the flush hook does not see."""
+    bump_revision_after_commit(
+        db.session(),
+        (
+            f"{DASHBOARD_REVISION_PREFIX}{section}"
+            for section, section_models in DASHBOARD_SECTION_MODELS.items()
+            if any(issubclass(model, section_models) for model in models)
+        ),
+    )
@@ -0,0 +1,420 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func, update
+
+from .helpers import build_guest_card_email
+from .models import db, EmailJob, EmailJobItem, Guest
+
+BREVO_SEND_URL = "https://api.brevo.com/v3/smtp/email"
+
+
+class EmailSendError(Exception):
+    """A failed send; `retryable` marks errors worth another attempt (rate limits, server errors)."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BrevoTransport:
+    """Sends transactional emails through the Brevo API on a pooled keep-alive session."""
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30):
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+
+    def send(self, payload: dict) -> None:
+        try:
+            resp = self._session.post(
+                BREVO_SEND_URL,
+                json=payload,
+                headers={
+                    "api-key": os.environ.get("MAIL_KEY", ""),
+                    "Content-Type": "application/json",
+                    "Accept": "application/json",
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException as exc:
+            raise EmailSendError(str(exc), retryable=True) from exc
+        if resp.status_code in (200, 201, 202):
+            return
+        raise EmailSendError(
+            f"{resp.status_code} {resp.text}",
+            retryable=resp.status_code == 429 or resp.status_code >= 500,
+        )
+
+
+class RateLimiter:
+    """Token bucket shared by all sender threads: `rate` sends per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def create_guest_card_job(guest_ids: Iterable[str], created_by_id: Optional[int] = None) -> EmailJob:
+    """Persist a queued guest card email job with one pending item per guest."""
+    guest_ids = list(dict.fromkeys(guest_ids))
+    job = EmailJob(kind="guest_card", status="queued", total=len(guest_ids), created_by_id=created_by_id)
+    job.items = [EmailJobItem(guest_id=guest_id, status="pending") for guest_id in guest_ids]
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def job_progress(job: EmailJob) -> dict:
+    done = job.sent + job.skipped + job.failed
+    return {
+        "id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "sent": job.sent,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "done": done,
+        "percent": round(100 * done / job.total) if job.total else 100,
+        "error": job.error,
+        "created_on": job.created_on.isoformat(timespec="seconds") if job.created_on else None,
+        "finished_on": job.finished_on.isoformat(timespec="seconds") if job.finished_on else None,
+    }
+
+
+class _ClaimLost(Exception):
+    """The job was queued again and is now claimed by another runner."""
+
+
+class EmailJobRunner:
+    """
+    Works through queued email jobs on a background thread of this process.
+    Emails are sent concurrently by a small thread pool under a shared rate limit. Each batch of
+    items is claimed ("sending") before it is sent and its results are written back at once, while
+    the job's heartbeat is refreshed after every send. Running jobs whose heartbeat is older than
+    ``stale_after_minutes`` (their worker died) are queued again with their claimed items, so at
+    most the batch in flight is sent twice. With ``inline=True`` jobs run synchronously.
+    """
+
+    def __init__(
+        self,
+        app,
+        workers: int = 4,
+        rate_per_second: float = 5.0,
+        max_attempts: int = 3,
+        backoff_seconds: float = 2.0,
+        batch_size: int = 25,
+        inline: bool = False,
+        stale_after_minutes: int = 10,
+        heartbeat_seconds: float = 30.0,
+    ):
+        self.app = app
+        self.workers = workers
+        self.stale_after_minutes = stale_after_minutes
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.batch_size = batch_size
+        self.inline = inline
+        self.rate_limiter = RateLimiter(rate_per_second, burst=workers)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: int) -> None:
+        """Start a freshly queued job, inline or by waking the background thread."""
+        if self.inline:
+            self.run_job(job_id)
+            return
+        self._ensure_started()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the background thread, which also picks up jobs queued or interrupted before a restart."""
+        if self.inline:
+            return
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="email-jobs", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self.app.app_context():
+                try:
+                    self._requeue_stale_jobs()
+                    claim = self._claim_next_job()
+                except Exception:  # noqa: BLE001
+                    db.session.rollback()
+                    self.app.logger.exception("Claiming email job failed")
+                    claim = None
+                finally:
+                    db.session.remove()
+            if claim is None:
+                self._wakeup.wait(timeout=30)
+                self._wakeup.clear()
+                continue
+            job_id, token = claim
+            self.run_job(job_id, token=token)
+
+    def _requeue_stale_jobs(self) -> int:
+        """Queue running jobs without a recent heartbeat again and release their claimed items."""
+        stale_before = datetime.utcnow() - timedelta(minutes=self.stale_after_minutes)
+        stale = (
+            EmailJob.status == "running",
+            func.coalesce(EmailJob.heartbeat_on, EmailJob.started_on) < stale_before,
+        )
+        requeued = 0
+        for (job_id,) in db.session.query(EmailJob.id).filter(*stale).all():
+            if db.session.execute(
+                update(EmailJob).where(EmailJob.id == job_id, *stale).values(status="queued", claim_token=None)
+            ).rowcount:
+                db.session.execute(
+                    update(EmailJobItem)
+                    .where(EmailJobItem.job_id == job_id, EmailJobItem.status == "sending")
+                    .values(status="pending")
+                )
+                requeued += 1
+        db.session.commit()
+        if requeued:
+            self.app.logger.warning("%s unterbrochene E-Mail-Jobs wieder eingereiht", requeued)
+        return requeued
+
+    @staticmethod
+    def _claim_job(job_id: int) -> Optional[str]:
+        """Mark a queued job as running under a new claim token; None if another runner was faster."""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(EmailJob)
+            .where(EmailJob.id == job_id, EmailJob.status == "queued")
+            .values(status="running", claim_token=token, started_on=now, heartbeat_on=now)
+        ).rowcount
+        db.session.commit()
+        return token if claimed else None
+
+    @staticmethod
+    def _claim_next_job() -> Optional[Tuple[int, str]]:
+        """Claim the oldest queued job; returns its id and claim token."""
+        while True:
+            job_id = (
+                db.session.query(EmailJob.id)
+                .filter(EmailJob.status == "queued")
+                .order_by(EmailJob.id.asc())
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                return None
+            token = EmailJobRunner._claim_job(job_id)
+            if token is not None:
+                return job_id, token
+
+    @staticmethod
+    def _heartbeat(job_id: int, token: str) -> bool:
+        """Refresh the job's heartbeat; False once the job is no longer running under `token`."""
+        alive = db.session.execute(
+            update(EmailJob)
+            .where(EmailJob.id == job_id, EmailJob.status == "running", EmailJob.claim_token == token)
+            .values(heartbeat_on=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        return bool(alive)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="email-send")
+            return self._executor
+
+    def run_job(self, job_id: int, token: Optional[str] = None) -> None:
+        """Send a job's pending items; without a `token` the job is claimed first."""
+        with self.app.app_context():
+            try:
+                if token is None:
+                    token = self._claim_job(job_id)
+                    if token is None:
+                        return
+                while self._run_batch(job_id, token):
+                    pass
+                self._finish(job_id, token, status="done")
+            except _ClaimLost:
+                db.session.rollback()
+                self.app.logger.warning("E-Mail-Job %s wurde von einem anderen Runner übernommen", job_id)
+            except Exception as exc:  # noqa: BLE001
+                db.session.rollback()
+                self.app.logger.exception("E-Mail-Job %s fehlgeschlagen", job_id)
+                self._finish(job_id, token, status="failed", error=str(exc))
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _finish(job_id: int, token: Optional[str], status: str, error: Optional[str] = None) -> None:
+        db.session.execute(
+            update(EmailJob)
+            .where(EmailJob.id == job_id, EmailJob.status == "running", EmailJob.claim_token == token)
+            .values(status=status, error=error, finished_on=datetime.utcnow())
+        )
+        db.session.commit()
+
+    def _claim_items(self, job_id: int) -> List[int]:
+        """Move the next pending items to "sending"; items another runner claimed first are skipped."""
+        candidate_ids = [
+            item_id
+            for (item_id,) in db.session.query(EmailJobItem.id)
+            .filter_by(job_id=job_id, status="pending")
+            .order_by(EmailJobItem.id.asc())
+            .limit(self.batch_size)
+        ]
+        claimed_ids = [
+            item_id
+            for item_id in candidate_ids
+            if db.session.execute(
+                update(EmailJobItem)
+                .where(EmailJobItem.id == item_id, EmailJobItem.status == "pending")
+                .values(status="sending")
+            ).rowcount
+        ]
+        db.session.commit()
+        return claimed_ids
+
+    def _run_batch(self, job_id: int, token: str) -> bool:
+        """Send the next batch of pending items and record the outcome; False once nothing is left."""
+        if not self._heartbeat(job_id, token):
+            raise _ClaimLost()
+        item_ids = self._claim_items(job_id)
+        if not item_ids:
+            return db.session.query(
+                EmailJobItem.query.filter_by(job_id=job_id, status="pending").exists()
+            ).scalar()
+        items = (
+            db.session.query(EmailJobItem.id, EmailJobItem.guest_id)
+            .filter(EmailJobItem.id.in_(item_ids))
+            .order_by(EmailJobItem.id.asc())
+            .all()
+        )
+
+        guests = {
+            guest.id: guest
+            for guest in Guest.query.filter(Guest.id.in_([item.guest_id for item in items])).all()
+        }
+        settings = self.app.config.get("SETTINGS", {})
+        results = {}
+        futures = {}
+        for item in items:
+            guest = guests.get(item.guest_id)
+            if guest is None:
+                results[item.id] = ("skipped", 0, "Gast nicht gefunden.")
+                continue
+            name = f"{guest.firstname} {guest.lastname}"
+            payload, msg = build_guest_card_email(guest, settings)
+            if payload is None:
+                results[item.id] = ("skipped", 0, f"{name}: {msg}")
+                continue
+            futures[self._pool().submit(self._deliver, payload)] = (item.id, name)
+
+        claim_lost = False
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=self.heartbeat_seconds, return_when=FIRST_COMPLETED)
+            for future in done:
+                item_id, name = futures[future]
+                ok, attempts, msg = future.result()
+                results[item_id] = ("sent", attempts, None) if ok else ("failed", attempts, f"{name}: {msg}")
+            # Record the sends of a lost claim anyway; they went out and must not be repeated.
+            if not claim_lost and not self._heartbeat(job_id, token):
+                claim_lost = True
+
+        self._record_batch(job_id, items, results)
+        if claim_lost:
+            raise _ClaimLost()
+        return True
+
+    def _deliver(self, payload: dict) -> Tuple[bool, int, Optional[str]]:
+        """Send one email with exponential backoff on retryable errors; runs on the send pool."""
+        transport = self.app.email_transport
+        attempt = 0
+        while True:
+            attempt += 1
+            self.rate_limiter.acquire()
+            try:
+                transport.send(payload)
+                return True, attempt, None
+            except EmailSendError as exc:
+                if not exc.retryable or attempt >= self.max_attempts:
+                    return False, attempt, f"Versand fehlgeschlagen: {exc}"
+            except Exception as exc:  # noqa: BLE001
+                return False, attempt, f"Versand fehlgeschlagen: {exc}"
+            time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+
+    @staticmethod
+    def _record_batch(job_id: int, items: list, results: dict) -> None:
+        now = datetime.utcnow()
+        rows = []
+        for item in items:
+            status, attempts, msg = results[item.id]
+            rows.append(
+                {
+                    "id": item.id,
+                    "status": status,
+                    "attempts": attempts,
+                    "message": msg,
+                    "sent_on": now if status == "sent" else None,
+                }
+            )
+        db.session.expire_all()
+        db.session.execute(update(EmailJobItem), rows)
+        sent_guest_ids = [item.guest_id for item in items if results[item.id][0] == "sent"]
+        if sent_guest_ids:
+            db.session.execute(
+                update(Guest)
+                .where(Guest.id.in_(sent_guest_ids))
+                .values(guest_card_emailed_on=now.date())
+            )
+        # Counted from the items, so a batch recorded by two runners is not added twice.
+        counts = dict(
+            db.session.query(EmailJobItem.status, func.count())
+            .filter(EmailJobItem.job_id == job_id)
+            .group_by(EmailJobItem.status)
+            .all()
+        )
+        db.session.execute(
+            update(EmailJob)
+            .where(EmailJob.id == job_id)
+            .values(
+                sent=counts.get("sent", 0),
+                skipped=counts.get("skipped", 0),
+                failed=counts.get("failed", 0),
+            )
+        )
+        db.session.commit()
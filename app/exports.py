@@ -0,0 +1,237 @@
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from openpyxl import Workbook
+from sqlalchemy import Numeric, inspect, select
+
+try:  # Parquet export is optional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the installation
+    pa = None
+    pq = None
+
+from .models import db
+
+# Rows fetched per database round trip while streaming an export.
+EXPORT_CHUNK_ROWS = 1000
+# Exports stay in memory up to this size and are moved to a temporary file beyond it.
+EXPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Size of the pieces the finished file is sent in.
+EXPORT_SEND_CHUNK_BYTES = 64 * 1024
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIMETYPE = "application/zip"
+
+
+class ExportTable(NamedTuple):
+    """One table of an export: output name, header labels and the model attribute behind each column."""
+
+    name: str
+    model: type
+    headers: Sequence[str]
+    attributes: Sequence[Optional[str]]
+
+
+def build_export_table(name: str, model, columns: Sequence[str], field_map: dict) -> Optional[ExportTable]:
+    """Resolve selected UI columns to model attributes; None if no selected column exists on the model."""
+    attributes = []
+    for column in columns:
+        attr = field_map.get(column)
+        attributes.append(attr if attr and hasattr(model, attr) else None)
+    if not any(attributes):
+        return None
+    return ExportTable(name=name, model=model, headers=list(columns), attributes=attributes)
+
+
+def export_cell(value):
+    """Dates are exported as ISO strings, everything else unchanged."""
+    if hasattr(value, "isoformat"):
+        try:
+            return value.isoformat()
+        except Exception:
+            pass
+    return value
+
+
+def iter_export_rows(
+    table: ExportTable,
+    chunk_size: int = EXPORT_CHUNK_ROWS,
+    convert: Optional[Callable] = export_cell,
+) -> Iterator[List]:
+    """
+    Yield the rows of an export table as plain lists.
+    Only the selected columns are fetched, `chunk_size` rows at a time, without building ORM objects.
+    Values pass through `convert`; None keeps the database types.
+    """
+    if convert is None:
+        convert = _identity
+    selected = [attr for attr in dict.fromkeys(table.attributes) if attr]
+    primary_key = inspect(table.model).primary_key
+    stmt = (
+        select(*(getattr(table.model, attr) for attr in selected))
+        .order_by(*primary_key)
+        .execution_options(yield_per=chunk_size)
+    )
+    positions = [selected.index(attr) if attr else None for attr in table.attributes]
+    for row in db.session.execute(stmt):
+        yield [convert(row[pos]) if pos is not None else None for pos in positions]
+
+
+def _identity(value):
+    return value
+
+
+def new_export_spool(max_bytes: int = EXPORT_SPOOL_MAX_BYTES):
+    return tempfile.SpooledTemporaryFile(max_size=max_bytes, mode="w+b")
+
+
+def write_xlsx_export(
+    tables: Iterable[ExportTable], include_header: bool, target, chunk_size: int = EXPORT_CHUNK_ROWS
+) -> int:
+    """Write one sheet per table into `target` with a write-only workbook; returns the number of sheets."""
+    workbook = Workbook(write_only=True)
+    sheets = 0
+    for table in tables:
+        sheet = workbook.create_sheet(title=table.name)
+        if include_header:
+            sheet.append(list(table.headers))
+        for row in iter_export_rows(table, chunk_size):
+            sheet.append(row)
+        sheets += 1
+    if sheets:
+        workbook.save(target)
+    return sheets
+
+
+def write_csv_zip_export(
+    tables: Iterable[ExportTable], include_header: bool, target, chunk_size: int = EXPORT_CHUNK_ROWS
+) -> int:
+    """Write one UTF-8 CSV file per table into a zip archive, row by row; returns the number of files."""
+    files = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in tables:
+            with archive.open(f"{table.name}.csv", "w", force_zip64=True) as raw:
+                with io.TextIOWrapper(raw, encoding="utf-8", newline="") as text:
+                    writer = csv.writer(text)
+                    if include_header:
+                        writer.writerow(table.headers)
+                    for row in iter_export_rows(table, chunk_size):
+                        writer.writerow(row)
+            files += 1
+    return files
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _arrow_type(model, attr: Optional[str]):
+    """Arrow type for a model column; unknown or unmapped columns are exported as strings."""
+    column = model.__table__.columns.get(attr) if attr else None
+    if column is None:
+        return pa.string()
+    if isinstance(column.type, Numeric) and column.type.asdecimal:
+        return pa.decimal128(column.type.precision or 18, column.type.scale or 2)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return pa.string()
+    if python_type is bool:
+        return pa.bool_()
+    if python_type is int:
+        return pa.int64()
+    if python_type is float:
+        return pa.float64()
+    if python_type is Decimal:
+        return pa.decimal128(18, 2)
+    if python_type is datetime:
+        return pa.timestamp("us")
+    if python_type is date:
+        return pa.date32()
+    return pa.string()
+
+
+def _record_batch(rows: List[List], schema):
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(list(column), type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _write_parquet_table(table: ExportTable, target, chunk_size: int) -> None:
+    schema = pa.schema(
+        [
+            pa.field(header, _arrow_type(table.model, attr))
+            for header, attr in zip(table.headers, table.attributes)
+        ]
+    )
+    string_columns = [pa.types.is_string(field.type) for field in schema]
+    with pq.ParquetWriter(target, schema, compression="snappy") as writer:
+        batch = []
+        for row in iter_export_rows(table, chunk_size, convert=None):
+            batch.append(
+                [str(value) if is_string and value is not None else value
+                 for value, is_string in zip(row, string_columns)]
+            )
+            if len(batch) >= chunk_size:
+                writer.write_batch(_record_batch(batch, schema))
+                batch = []
+        if batch:
+            writer.write_batch(_record_batch(batch, schema))
+
+
+def write_parquet_zip_export(
+    tables: Iterable[ExportTable], include_header: bool, target, chunk_size: int = EXPORT_CHUNK_ROWS
+) -> int:
+    """
+    Write one Parquet file per table into a zip archive; returns the number of files.
+    Parquet always carries column names, so `include_header` has no effect. Requires pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow ist nicht installiert.")
+    files = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as archive:
+        for table in tables:
+            # Parquet files are compressed internally; each is staged in a spool first because
+            # the writer tracks its position, which a zip member stream does not support.
+            with new_export_spool() as part:
+                _write_parquet_table(table, part, chunk_size)
+                part.seek(0)
+                with archive.open(f"{table.name}.parquet", "w", force_zip64=True) as member:
+                    shutil.copyfileobj(part, member, EXPORT_SEND_CHUNK_BYTES)
+            files += 1
+    return files
+
+
+class ExportFormat(NamedTuple):
+    write: Callable
+    mimetype: str
+    suffix: str
+
+
+EXPORT_FORMATS = {
+    "xlsx": ExportFormat(write_xlsx_export, XLSX_MIMETYPE, ".xlsx"),
+    "csv": ExportFormat(write_csv_zip_export, ZIP_MIMETYPE, "_csv.zip"),
+    "parquet": ExportFormat(write_parquet_zip_export, ZIP_MIMETYPE, "_parquet.zip"),
+}
+
+
+def iter_spool_chunks(spool, chunk_size: int = EXPORT_SEND_CHUNK_BYTES) -> Iterator[bytes]:
+    """Stream a finished export from the start and close it afterwards."""
+    try:
+        spool.seek(0)
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
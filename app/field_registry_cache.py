@@ -0,0 +1,158 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import FieldRegistry
+from .settings_cache import RevisionWatch, bump_revision_after_commit
+
+FIELD_REGISTRY_REVISION = "field_registry"
+
+
+@dataclass(frozen=True)
+class RegistryField:
+    """Read-only copy of a FieldRegistry row that can be shared between requests."""
+
+    id: int
+    model_name: str
+    field_name: str
+    globally_visible: bool
+    visibility_level: str
+    editability_level: str
+    show_inline: bool
+    display_order: int
+    optional: bool
+    ui_label: str
+    remindable: bool
+    reminder_interval_days: Optional[int]
+    reminder_species: Optional[str]
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """All registry fields of one cache version, grouped by model and sorted by display order."""
+
+    version: int
+    by_model: Dict[str, Tuple[RegistryField, ...]]
+    remindable: Tuple[RegistryField, ...]
+
+    def fields(self, model_name: str, visible_only: bool = False) -> Tuple[RegistryField, ...]:
+        fields = self.by_model.get(model_name, ())
+        if visible_only:
+            return tuple(field for field in fields if field.globally_visible)
+        return fields
+
+
+class FieldRegistryCache:
+    """
+    Process-wide registry cache; a new version is loaded lazily after each invalidation.
+    Edits in other workers are noticed through the shared "field_registry" revision.
+    """
+
+    def __init__(self, poll_seconds: float = 5.0):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self.watch = RevisionWatch(FIELD_REGISTRY_REVISION, poll_seconds)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        """Drop the cached rows so the next lookup reloads them."""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def snapshot(self) -> RegistrySnapshot:
+        if self.watch.changed():
+            self.invalidate()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                self.watch.loading()
+                self._snapshot = self._load(self._version)
+            return self._snapshot
+
+    @staticmethod
+    def _load(version: int) -> RegistrySnapshot:
+        rows = FieldRegistry.query.order_by(
+            FieldRegistry.model_name.asc(),
+            FieldRegistry.display_order.asc(),
+            FieldRegistry.field_name.asc(),
+        ).all()
+        by_model = {}
+        for row in rows:
+            field = RegistryField(
+                id=row.id,
+                model_name=row.model_name,
+                field_name=row.field_name,
+                globally_visible=bool(row.globally_visible),
+                visibility_level=row.visibility_level,
+                editability_level=row.editability_level,
+                show_inline=bool(row.show_inline),
+                display_order=row.display_order or 0,
+                optional=bool(row.optional),
+                ui_label=row.ui_label,
+                remindable=bool(row.remindable),
+                reminder_interval_days=row.reminder_interval_days,
+                reminder_species=row.reminder_species,
+            )
+            by_model.setdefault(field.model_name, []).append(field)
+        return RegistrySnapshot(
+            version=version,
+            by_model={model_name: tuple(fields) for model_name, fields in by_model.items()},
+            remindable=tuple(
+                field for fields in by_model.values() for field in fields if field.remindable
+            ),
+        )
+
+
+field_registry_cache = FieldRegistryCache()
+
+
+def get_field_registry() -> RegistrySnapshot:
+    """Return the registry snapshot, remembered on the request until the cache is invalidated."""
+    if not has_app_context():
+        return field_registry_cache.snapshot()
+    snapshot = g.get("field_registry")
+    if snapshot is None or snapshot.version != field_registry_cache.version:
+        snapshot = field_registry_cache.snapshot()
+        g.field_registry = snapshot
+    return snapshot
+
+
+def registry_fields(model_name: str, visible_only: bool = False) -> Tuple[RegistryField, ...]:
+    """Return the cached registry fields of a model in display order."""
+    return get_field_registry().fields(model_name, visible_only=visible_only)
+
+
+def invalidate_field_registry() -> None:
+    """Force a reload in this worker after registry edits; ORM commits touching FieldRegistry also invalidate."""
+    field_registry_cache.invalidate()
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_registry_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, FieldRegistry):
+            session.info["field_registry_changed"] = True
+            bump_revision_after_commit(session, {FIELD_REGISTRY_REVISION})
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("field_registry_changed", False):
+        field_registry_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_changes(session):
+    session.info.pop("field_registry_changed", None)
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from .models import db, Animal, CacheRevision, FoodPlan, FoodPlanGuest, FoodTag, Guest
+from .settings_cache import bump_revision_after_commit
+
+# Shared revision for changes that can touch every plan (food tags, unscoped bulk statements).
+FOOD_PLAN_REVISION = "food_plans"
+# Per-plan revisions, e.g. "food_plan:12".
+FOOD_PLAN_REVISION_PREFIX = "food_plan:"
+
+# Models whose rows end up in a computed food plan.
+FOOD_PLAN_SOURCE_MODELS = (FoodPlan, FoodPlanGuest, Guest, Animal, FoodTag)
+
+
+def food_plan_revision_name(plan_id: int) -> str:
+    return f"{FOOD_PLAN_REVISION_PREFIX}{plan_id}"
+
+
+class FoodPlanCache:
+    """
+    Values derived from food plans (computed views, rendered PDFs) in a bounded LRU.
+    Keys carry the plan's revisions, which writes to the plan, its guests or their animals bump
+    after commit, so each worker stops serving a stale plan on its next lookup.
+    Cached plans are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "builds": 0}
+
+    def get(self, key: Hashable, build: Callable[[], Dict]) -> Dict:
+        with self._lock:
+            computed = self._entries.get(key)
+            if computed is not None:
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return computed
+
+        computed = build()
+        with self._lock:
+            self._entries[key] = computed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._metrics["builds"] += 1
+        return computed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return dict(self._metrics)
+
+
+food_plan_cache = FoodPlanCache()
+
+
+def food_plan_revision(plan_id: int) -> Tuple[int, int]:
+    """The plan's own revision and the shared one, read in one query."""
+    names = (food_plan_revision_name(plan_id), FOOD_PLAN_REVISION)
+    revisions = dict(
+        db.session.execute(
+            select(CacheRevision.name, CacheRevision.revision).where(CacheRevision.name.in_(names))
+        ).all()
+    )
+    return revisions.get(names[0], 0), revisions.get(names[1], 0)
+
+
+def _plans_of_guests(connection, guest_ids) -> set:
+    guest_ids = {guest_id for guest_id in guest_ids if guest_id}
+    if not guest_ids:
+        return set()
+    return set(
+        connection.execute(
+            select(FoodPlanGuest.food_plan_id).where(FoodPlanGuest.guest_id.in_(guest_ids)).distinct()
+        ).scalars()
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_food_plan_revision(session, flush_context):
+    """Bump, after commit, the revisions of the plans whose plan rows, guests or animals were written."""
+    plan_ids, guest_ids, shared = set(), set(), False
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, FoodPlan):
+            plan_ids.add(obj.id)
+        elif isinstance(obj, FoodPlanGuest):
+            plan_ids.add(obj.food_plan_id)
+            history = inspect(obj).attrs.food_plan_id.history
+            plan_ids.update(history.deleted or ())
+        elif isinstance(obj, Guest):
+            guest_ids.add(obj.id)
+        elif isinstance(obj, Animal):
+            guest_ids.add(obj.guest_id)
+            guest_ids.update(inspect(obj).attrs.guest_id.history.deleted or ())
+        elif isinstance(obj, FoodTag):
+            shared = True
+    plan_ids |= _plans_of_guests(session.connection(), guest_ids)
+    names = {food_plan_revision_name(plan_id) for plan_id in plan_ids if plan_id is not None}
+    if shared:
+        names.add(FOOD_PLAN_REVISION)
+    if names:
+        bump_revision_after_commit(session, names)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_food_plan_revision_on_bulk(orm_execute_state):
+    """
+    Bulk INSERT/UPDATE/DELETE statements bypass the flush, e.g. ``FoodPlanGuest.query.delete()``.
+    Statements run with ``execution_options(food_plan_id=...)`` bump only that plan, all others every plan.
+    """
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or not issubclass(mapper.class_, FOOD_PLAN_SOURCE_MODELS):
+        return
+    plan_id = orm_execute_state.execution_options.get("food_plan_id")
+    name = FOOD_PLAN_REVISION if plan_id is None else food_plan_revision_name(plan_id)
+    bump_revision_after_commit(orm_execute_state.session, {name})
@@ -0,0 +1,260 @@
+import io
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import (
+    Image, KeepTogether, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+)
+
+# Long tables are cut into pieces of this many rows, each with its own header row,
+# so reportlab never has to measure and split one table of hundreds of rows.
+FOOD_PLAN_PDF_TABLE_ROWS = 40
+
+PAGE_MARGIN = 12 * mm
+CONTENT_WIDTH = A4[0] - 2 * PAGE_MARGIN
+_HEX_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+_styles = getSampleStyleSheet()
+BODY = ParagraphStyle("plan-body", parent=_styles["Normal"], fontSize=9, leading=11)
+MUTED = ParagraphStyle("plan-muted", parent=BODY, textColor=colors.HexColor("#666666"))
+DANGER = ParagraphStyle("plan-danger", parent=BODY, textColor=colors.HexColor("#b00020"))
+CELL = ParagraphStyle("plan-cell", parent=BODY, fontSize=8.5, leading=10.5)
+H1 = ParagraphStyle("plan-h1", parent=_styles["Heading1"], fontSize=15, leading=18, spaceAfter=2)
+H2 = ParagraphStyle("plan-h2", parent=_styles["Heading2"], fontSize=12, leading=15, spaceBefore=10, spaceAfter=4)
+H3 = ParagraphStyle("plan-h3", parent=_styles["Heading3"], fontSize=10.5, leading=13, spaceBefore=8, spaceAfter=3)
+
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#999999")),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+])
+
+
+def _text(value: Optional[str], style=CELL) -> Paragraph:
+    return Paragraph(escape(value or ""), style)
+
+
+def _tags(tags: Iterable[Dict], empty: str = "-") -> Paragraph:
+    badges = []
+    for tag in tags:
+        color = tag.get("color") if _HEX_COLOR.match(tag.get("color") or "") else "#6c757d"
+        badges.append(f'<font backColor="{color}" color="#ffffff">&nbsp;{escape(tag["name"])}&nbsp;</font>')
+    return Paragraph(" ".join(badges), CELL) if badges else Paragraph(escape(empty), MUTED)
+
+
+def _animal_label(entry: Dict) -> str:
+    return f"{entry.get('species') or ''}: {entry['name']}" if entry.get("name") else entry.get("species") or ""
+
+
+def _tables(header: List[str], rows: List[List], widths: List[float]) -> List[Table]:
+    head = [Paragraph(f"<b>{escape(label)}</b>", CELL) for label in header]
+    tables = []
+    for start in range(0, len(rows), FOOD_PLAN_PDF_TABLE_ROWS):
+        table = Table([head] + rows[start:start + FOOD_PLAN_PDF_TABLE_ROWS], colWidths=widths, repeatRows=1)
+        table.setStyle(TABLE_STYLE)
+        tables.append(table)
+    return tables
+
+
+def _widths(*fractions: float) -> List[float]:
+    return [CONTENT_WIDTH * fraction for fraction in fractions]
+
+
+def _special_sections(special: List[Dict]) -> List:
+    elements = [Paragraph("Spezielle Zubereitungen", H2)]
+    for title, key, style in (("Futterinfo", "food_info", CELL), ("Allergien", "allergies", DANGER)):
+        elements.append(Paragraph(title, H3))
+        rows = [
+            [
+                _text(f"{e.get('guest_number') or ''} {e.get('guest_name') or ''}"),
+                _text(_animal_label(e)),
+                _tags(e.get("tags") or []),
+                _text(e[key], style),
+            ]
+            for e in special
+            if e.get(key)
+        ]
+        if rows:
+            elements.extend(_tables(["Gast", "Tier", "Tags", title], rows, _widths(0.28, 0.22, 0.22, 0.28)))
+        else:
+            elements.append(Paragraph("Keine.", MUTED))
+    return elements
+
+
+def _guest_view(computed: Dict) -> List:
+    elements = [Paragraph("Ansicht: Gäste › Tiere › Tags", H2)]
+    for guest in computed["guests"]:
+        block = [Paragraph(escape(f"{guest['number'] or ''} {guest['name']}"), H3)]
+        if guest["note"]:
+            block.append(Paragraph(f"<b>Gast-Notiz:</b> {escape(guest['note'])}", BODY))
+        if guest["animals"]:
+            rows = []
+            for animal in guest["animals"]:
+                info = escape(animal["food_info"]) if animal["food_info"] else '<font color="#666666">-</font>'
+                if animal["allergies"]:
+                    info += f'<br/><font color="#b00020">Allergien: {escape(animal["allergies"])}</font>'
+                rows.append([_text(_animal_label(animal)), _tags(animal["tags"]), Paragraph(info, CELL)])
+            tables = _tables(["Tier", "Tags", "Futterinfo"], rows, _widths(0.24, 0.28, 0.48))
+            # Keep a household's heading with the start of its table.
+            elements.append(KeepTogether(block + tables[:1]))
+            elements.extend(tables[1:])
+        else:
+            elements.append(KeepTogether(block + [Paragraph("Keine aktiven Tiere.", MUTED)]))
+    return elements + _special_sections(computed["special"])
+
+
+def _detail_view(computed: Dict) -> List:
+    elements = [Paragraph("Ansicht: Detailansicht", H2)]
+    if not computed["guests"]:
+        return elements + [Paragraph("Noch keine Gäste im Futterplan.", MUTED)]
+    for index, guest in enumerate(computed["guests"]):
+        if index:
+            elements.append(PageBreak())
+        elements.append(Paragraph(escape(f"{guest['number'] or ''} {guest['name']}"), H2))
+        if guest["note"]:
+            elements.append(Paragraph(f"<b>Gast-Notiz:</b> {escape(guest['note'])}", BODY))
+        address = escape(guest["address"] or "-")
+        if guest["city_line"]:
+            address += f", {escape(guest['city_line'])}"
+        contact = f"<b>Adresse:</b> {address}<br/><b>Telefon:</b> {escape(guest['phone'] or guest['mobile'] or '-')}"
+        if guest["email"]:
+            contact += f"<br/><b>E-Mail:</b> {escape(guest['email'])}"
+        elements.append(Paragraph(contact, BODY))
+        if not guest["animals"]:
+            elements.append(Paragraph("Keine aktiven Tiere.", MUTED))
+            continue
+        for animal in guest["animals"]:
+            meta = Table(
+                [
+                    [Paragraph(f"<b>Alter:</b> {escape(animal['age'] or '-')}", CELL),
+                     Paragraph(f"<b>Gewicht/Größe:</b> {escape(animal['weight_or_size'] or '-')}", CELL)],
+                    [Paragraph(f"<b>Futterart:</b> {escape(animal['food_type'] or '-')}", CELL),
+                     Paragraph(f"<b>Vollversorgung:</b> {escape(animal['complete_care'] or '-')}", CELL)],
+                ],
+                colWidths=_widths(0.5, 0.5),
+            )
+            card = [Paragraph(escape(_animal_label(animal)), H3), meta]
+            card.append(Table([[Paragraph("<b>Tags:</b>", CELL), _tags(animal["tags"])]],
+                              colWidths=_widths(0.12, 0.88)))
+            card.append(Paragraph(f"<b>Futtermenge / Futterinfo:</b> {escape(animal['food_info'] or '-')}", BODY))
+            if animal["allergies"]:
+                card.append(Paragraph(f"<b>Allergien:</b> {escape(animal['allergies'])}", DANGER))
+            if animal["illnesses"]:
+                card.append(Paragraph(f"<b>Erkrankungen:</b> {escape(animal['illnesses'])}", BODY))
+            if animal["note"]:
+                card.append(Paragraph(f"<b>Notiz:</b> {escape(animal['note'])}", BODY))
+            elements.append(KeepTogether(card))
+    return elements
+
+
+def _type_view(computed: Dict) -> List:
+    elements = [Paragraph("Ansicht: Tierart › Tags › Tiere", H2)]
+    for group in computed["grouped_sorted"]:
+        rows = []
+        for combo in group["combos"]:
+            lines = [
+                escape(f"{e.get('guest_number') or ''} {e.get('guest_name') or ''} — {e.get('name') or '-'}")
+                for e in combo["entries"]
+            ]
+            # A combination shared by many animals continues over several rows, so no cell outgrows a page.
+            for start in range(0, max(len(lines), 1), FOOD_PLAN_PDF_TABLE_ROWS):
+                first = start == 0
+                rows.append([
+                    _tags(combo["tags"], empty="Ohne Tags") if first else Paragraph("(Fortsetzung)", MUTED),
+                    _text(str(combo["count"]) if first else ""),
+                    Paragraph("<br/>".join(lines[start:start + FOOD_PLAN_PDF_TABLE_ROWS]), CELL),
+                ])
+        tables = _tables(["Tag-Kombination", "Anzahl", "Gäste / Tiere"], rows, _widths(0.35, 0.1, 0.55))
+        elements.append(KeepTogether([Paragraph(escape(group["species"]), H3)] + tables[:1]))
+        elements.extend(tables[1:])
+    return elements + _special_sections(computed["special"])
+
+
+def _type_summary(computed: Dict) -> List:
+    elements = [Paragraph("Ansicht: Tiere › Tag-Kombination (ohne Namen)", H2)]
+    if not computed["combo_summary_by_species"]:
+        elements.append(Paragraph("Keine.", MUTED))
+    for group in computed["combo_summary_by_species"]:
+        rows = [[_tags(combo["tags"], empty="Ohne Tags"), _text(str(combo["count"]))] for combo in group["combos"]]
+        tables = _tables(["Tag-Kombination", "Anzahl Tiere"], rows, _widths(0.88, 0.12))
+        elements.append(KeepTogether([Paragraph(escape(group["species"]), H3)] + tables[:1]))
+        elements.extend(tables[1:])
+    return elements + _special_sections(computed["special"])
+
+
+FOOD_PLAN_PDF_VIEWS = {
+    "guest_view": _guest_view,
+    "detail_view": _detail_view,
+    "type_view": _type_view,
+    "type_summary": _type_summary,
+}
+
+
+def render_food_plan_pdf(
+    computed: Dict,
+    title: str,
+    status: str,
+    location_name: Optional[str] = None,
+    organisation: str = "PfotenRegister",
+    logo_data: Optional[bytes] = None,
+    created_on: Optional[datetime] = None,
+) -> bytes:
+    """Render the output of `_compute_plan` as an A4 PDF in the plan's view mode."""
+    created_on = created_on or datetime.now()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=PAGE_MARGIN,
+        rightMargin=PAGE_MARGIN,
+        topMargin=16 * mm,
+        bottomMargin=14 * mm,
+        title=f"Futterplan: {title}",
+    )
+
+    def _footer(canvas, _doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.HexColor("#666666"))
+        canvas.drawString(PAGE_MARGIN, 8 * mm, f"Futterplan: {title}")
+        canvas.drawRightString(A4[0] - PAGE_MARGIN, 8 * mm, f"Seite {canvas.getPageNumber()}")
+        canvas.restoreState()
+
+    branding = [Paragraph(f"<b>{escape(organisation)}</b><br/>Futterplan", BODY)]
+    if logo_data:
+        logo = Image(io.BytesIO(logo_data), width=14 * mm, height=14 * mm, kind="proportional")
+        branding = [Table([[logo, branding[0]]], colWidths=[16 * mm, None])]
+    meta = Paragraph(
+        f"<b>Titel:</b> {escape(title)}<br/><b>Status:</b> {escape(status or '-')}<br/>"
+        f"<b>Standort:</b> {escape(location_name or '-')}<br/>"
+        f"<b>Erstellt am:</b> {created_on.strftime('%d.%m.%Y %H:%M')}",
+        ParagraphStyle("plan-meta", parent=BODY, alignment=2),
+    )
+    header = Table([[branding, meta]], colWidths=_widths(0.5, 0.5))
+    header.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.HexColor("#999999")),
+    ]))
+
+    elements = [header, Spacer(1, 6), Paragraph(escape(f"Futterplan: {title}"), H1)]
+    if computed["general_note"]:
+        note = Table([[Paragraph(f"<b>Allgemeine Notiz:</b> {escape(computed['general_note'])}", BODY)]],
+                     colWidths=[CONTENT_WIDTH])
+        note.setStyle(TableStyle([
+            ("BOX", (0, 0), (-1, -1), 0.5, colors.HexColor("#cccccc")),
+            ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#fafafa")),
+        ]))
+        elements.append(note)
+    elements.extend(FOOD_PLAN_PDF_VIEWS.get(computed["mode"], _guest_view)(computed))
+
+    doc.build(elements, onFirstPage=_footer, onLaterPages=_footer)
+    return buffer.getvalue()
@@ -0,0 +1,163 @@
+from dataclasses import dataclass
+from datetime import date
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy.orm import joinedload, lazyload, selectinload
+
+from .field_registry_cache import registry_fields
+from .helpers import build_reminder_alerts, user_has_access
+from .models import (
+    AccessoriesHistory,
+    Animal,
+    Attachment,
+    ChangeLog,
+    DropOffLocation,
+    FoodHistory,
+    FoodHistoryTag,
+    FoodTag,
+    Guest,
+    MedicalEvent,
+    MedicalEventAttachment,
+    db,
+)
+
+# Database order of the medical_event_status enum, used to sort events like the SQL query did.
+MEDICAL_EVENT_STATUS_ORDER = ("Geplant", "Aktiv", "Abgeschlossen", "Abgesagt")
+
+
+@dataclass(frozen=True)
+class GuestDetail:
+    """Everything the guest detail page renders, loaded up front so the template triggers no lazy loads."""
+
+    guest: Guest
+    animals: Tuple[Animal, ...]
+    representative: Optional[object]
+    messages: Tuple[object, ...]
+    guest_documents: Tuple[object, ...]
+    feed_history: Tuple[FoodHistory, ...]
+    accessories_history: Tuple[AccessoriesHistory, ...]
+    changelog: Tuple[ChangeLog, ...]
+    payments: Tuple[object, ...]
+    medical_events: Tuple[MedicalEvent, ...]
+    planned_medical_events: Tuple[MedicalEvent, ...]
+    active_medical_events: Tuple[MedicalEvent, ...]
+    past_medical_events: Tuple[MedicalEvent, ...]
+    medical_events_by_attachment: Mapping[int, Tuple[MedicalEvent, ...]]
+    all_tags: Tuple[FoodTag, ...]
+    visible_fields_guest: Tuple[Mapping[str, object], ...]
+    visible_fields_animal: Tuple[Mapping[str, object], ...]
+    visible_fields_representative: Tuple[Mapping[str, object], ...]
+    reminder_alerts: Tuple[dict, ...]
+    dispense_locations: Tuple[DropOffLocation, ...]
+
+    def template_context(self) -> dict:
+        return {field: getattr(self, field) for field in self.__dataclass_fields__}
+
+
+def _guest_detail_query():
+    animals = selectinload(Guest.animals)
+    medical_events = selectinload(Guest.medical_events)
+    food_history = selectinload(Guest.food_history)
+    # Attachment.guest is joined-loaded by default; it is always this guest, so skip re-reading the row.
+    return Guest.query.options(
+        joinedload(Guest.dispense_location),
+        animals.selectinload(Animal.food_tags),
+        animals.joinedload(Animal.profile_attachment).lazyload(Attachment.guest),
+        selectinload(Guest.representative),
+        selectinload(Guest.attachments).lazyload(Attachment.guest),
+        selectinload(Guest.messages),
+        selectinload(Guest.payments),
+        food_history.joinedload(FoodHistory.location),
+        food_history.selectinload(FoodHistory.tag_assocs).joinedload(FoodHistoryTag.food_tag),
+        selectinload(Guest.accessories_history).joinedload(AccessoriesHistory.location),
+        selectinload(Guest.changelog).joinedload(ChangeLog.user),
+        medical_events.joinedload(MedicalEvent.animal),
+        medical_events.selectinload(MedicalEvent.attachment_links)
+        .joinedload(MedicalEventAttachment.attachment)
+        .lazyload(Attachment.guest),
+    )
+
+
+def _sorted_medical_events(events) -> Tuple[MedicalEvent, ...]:
+    """Order by status, planned date (empty first), completion date (latest first) and newest id."""
+    status_rank = {status: index for index, status in enumerate(MEDICAL_EVENT_STATUS_ORDER)}
+    events = sorted(events, key=lambda event: event.id, reverse=True)
+    events.sort(key=lambda event: event.completed_on or date.min, reverse=True)
+    events.sort(key=lambda event: event.planned_for or date.min)
+    events.sort(key=lambda event: status_rank.get(event.status, len(status_rank)))
+    return tuple(events)
+
+
+def _visible_fields(model_name: str) -> Tuple[Mapping[str, object], ...]:
+    """Registry fields the current user may see, in display order, as template-ready mappings."""
+    return tuple(
+        MappingProxyType(
+            {
+                "name": field.field_name,
+                "label": field.ui_label or field.field_name,
+                "show_inline": field.show_inline,
+                "order": field.display_order,
+            }
+        )
+        for field in registry_fields(model_name)
+        if user_has_access(field.visibility_level)
+    )
+
+
+def load_guest_detail(guest_id: str, locations_enabled: bool = False) -> Optional[GuestDetail]:
+    """Load a guest with all child collections in a fixed number of queries; None if the guest is unknown."""
+    # populate_existing refreshes rows and collections the session may already hold from earlier work.
+    guest = (
+        _guest_detail_query()
+        .filter(Guest.id == guest_id)
+        .execution_options(populate_existing=True)
+        .one_or_none()
+    )
+    if guest is None:
+        return None
+
+    animals = tuple(guest.animals)
+    representative = guest.representative[0] if guest.representative else None
+    medical_events = _sorted_medical_events(guest.medical_events)
+    medical_events_by_attachment = {}
+    for event in medical_events:
+        for link in event.attachment_links:
+            medical_events_by_attachment.setdefault(link.attachment_id, []).append(event)
+
+    dispense_locations = ()
+    if locations_enabled:
+        dispense_locations = tuple(
+            DropOffLocation.query.filter_by(is_dispense_location=True, active=True)
+            .order_by(DropOffLocation.name.asc())
+            .all()
+        )
+
+    return GuestDetail(
+        guest=guest,
+        animals=animals,
+        representative=representative,
+        messages=tuple(guest.messages),
+        guest_documents=tuple(guest.attachments),
+        feed_history=tuple(guest.food_history),
+        accessories_history=tuple(guest.accessories_history),
+        changelog=tuple(guest.changelog),
+        payments=tuple(guest.payments),
+        medical_events=medical_events,
+        planned_medical_events=tuple(event for event in medical_events if event.status == "Geplant"),
+        active_medical_events=tuple(event for event in medical_events if event.status == "Aktiv"),
+        past_medical_events=tuple(
+            event for event in medical_events if event.status in ("Abgeschlossen", "Abgesagt")
+        ),
+        medical_events_by_attachment=MappingProxyType(
+            {attachment_id: tuple(events) for attachment_id, events in medical_events_by_attachment.items()}
+        ),
+        all_tags=tuple(db.session.query(FoodTag).all()),
+        visible_fields_guest=_visible_fields("Guest"),
+        visible_fields_animal=_visible_fields("Animal"),
+        visible_fields_representative=_visible_fields("Representative"),
+        reminder_alerts=tuple(
+            build_reminder_alerts(guest, animals=list(animals), representative=representative)
+        ),
+        dispense_locations=dispense_locations,
+    )
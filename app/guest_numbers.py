@@ -0,0 +1,122 @@
+import re
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from .models import db, Guest, GuestNumberSequence, Setting
+
+DEFAULT_GUEST_NUMBER_FORMAT = "YYMM-NNNN"
+
+
+class GuestNumberPattern(NamedTuple):
+    """The guest number format with its date placeholders expanded for one month."""
+
+    prefix: str
+    digits: int
+    suffix: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.prefix}{'#' * self.digits}{self.suffix}"
+
+    def format(self, counter: int) -> str:
+        return f"{self.prefix}{str(counter).zfill(self.digits)}{self.suffix}"
+
+    def counter_of(self, number: Optional[str]) -> Optional[int]:
+        """The counter of a number following this pattern, None for any other number."""
+        if not number:
+            return None
+        match = re.match(
+            r"^" + re.escape(self.prefix) + r"(\d{" + str(self.digits) + r"})" + re.escape(self.suffix) + r"$",
+            number,
+        )
+        return int(match.group(1)) if match else None
+
+
+def current_guest_number_pattern(now: Optional[datetime] = None) -> GuestNumberPattern:
+    """Read the `guestNumberFormat` setting and expand it for the current month."""
+    now = now or datetime.now()
+    setting = Setting.query.filter_by(setting_key="guestNumberFormat").first()
+    format_str = setting.value if setting else DEFAULT_GUEST_NUMBER_FORMAT
+
+    def _expand_date_placeholders(template: str) -> str:
+        return (
+            template.replace("YYYY", now.strftime("%Y"))
+            .replace("YY", now.strftime("%y"))
+            .replace("MM", now.strftime("%m"))
+        )
+
+    digit_blocks = list(re.finditer(r"(N+|0+)", format_str))
+    if not digit_blocks:
+        raise ValueError("Das Format muss mindestens einen Zahlen-Block enthalten (z.B. NNN oder 000).")
+
+    # Use the *last* digit block so formats like "GTNN00NN00" can keep earlier N/0 as literal text.
+    digit_block = digit_blocks[-1]
+    return GuestNumberPattern(
+        prefix=_expand_date_placeholders(format_str[:digit_block.start()]),
+        digits=len(digit_block.group()),
+        suffix=_expand_date_placeholders(format_str[digit_block.end():]),
+    )
+
+
+def _highest_existing_counter(pattern: GuestNumberPattern) -> int:
+    q = Guest.query.with_entities(Guest.number).filter(Guest.number.like(f"{pattern.prefix}%"))
+    if pattern.suffix:
+        q = q.filter(Guest.number.like(f"%{pattern.suffix}"))
+    counters = (pattern.counter_of(number) for (number,) in q.all())
+    return max((counter for counter in counters if counter is not None), default=0)
+
+
+def _ensure_sequence(pattern: GuestNumberPattern) -> None:
+    """Create the counter of a pattern on first use, seeded from the numbers already in the database."""
+    table = GuestNumberSequence.__table__
+    if db.session.execute(select(table.c.key).where(table.c.key == pattern.key)).first():
+        return
+    seed = _highest_existing_counter(pattern)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                table.insert().values(key=pattern.key, value=seed, updated_on=datetime.utcnow())
+            )
+    except IntegrityError:
+        pass  # another worker created it first
+
+
+def allocate_guest_numbers(count: int, pattern: Optional[GuestNumberPattern] = None) -> List[str]:
+    """
+    Take the next `count` guest numbers of a pattern.
+    The counter row stays locked until the surrounding transaction ends, so concurrent
+    registrations queue up instead of handing out the same number.
+    """
+    if count <= 0:
+        return []
+    pattern = pattern or current_guest_number_pattern()
+    _ensure_sequence(pattern)
+    table = GuestNumberSequence.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.key == pattern.key)
+        .values(value=table.c.value + count, updated_on=datetime.utcnow())
+    )
+    last = db.session.execute(select(table.c.value).where(table.c.key == pattern.key)).scalar_one()
+    return [pattern.format(counter) for counter in range(last - count + 1, last + 1)]
+
+
+def reserve_guest_numbers(numbers: Iterable[str], pattern: Optional[GuestNumberPattern] = None) -> None:
+    """Move the counter past numbers assigned elsewhere, e.g. taken over from an import file."""
+    pattern = pattern or current_guest_number_pattern()
+    highest = max(
+        (counter for counter in map(pattern.counter_of, numbers) if counter is not None),
+        default=None,
+    )
+    if highest is None:
+        return
+    _ensure_sequence(pattern)
+    table = GuestNumberSequence.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.key == pattern.key, table.c.value < highest)
+        .values(value=highest, updated_on=datetime.utcnow())
+    )
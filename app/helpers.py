@@ -1,33 +1,26 @@
 import base64
-import io
 import os
-import secrets
-import string
 from datetime import datetime, timedelta, date
 from functools import wraps
 
-import qrcode
-import requests
-from typing import Tuple
+from typing import Optional, Tuple
 from flask import abort, request, current_app
 from flask_login import current_user
 
-from .models import Guest, FieldRegistry
+from .card_assets import qr_code_cache
+from .code_allocator import guest_codes
+from .field_registry_cache import get_field_registry, registry_fields
+from .models import Guest
 
 
 def generate_unique_code(length=6):
+    return guest_codes.reserve(1, verify=True, length=length)[0]
 
-    allowed_chars = (
-        "".join(c for c in string.ascii_uppercase if c not in "IO")
-        + "".join(c for c in string.ascii_lowercase if c not in "lo")
-        + "".join(c for c in string.digits if c not in "01")
-    )
 
-    while True:
-        code = "".join(secrets.choice(allowed_chars) for _ in range(length))
-        exists = Guest.query.filter_by(id=code).first()
-        if not exists:
-            return code
+def generate_unique_codes(count: int, length: int = 6) -> list:
+    """Reserve `count` distinct unused guest codes, verified against the database in one query per round."""
+    return guest_codes.reserve(count, verify=True, length=length)
+
 
 def get_all_settings():
     from .db import db_cursor
@@ -73,10 +66,7 @@ def get_food_history(guest_id):
 
 def get_visible_fields(model):
     """Returns a list of field names marked as globally visible for the given model."""
-    from .models import FieldRegistry
-
-    model_name = model.__name__
-    entries = FieldRegistry.query.filter_by(model_name=model_name, globally_visible=True).all()
+    entries = registry_fields(model.__name__, visible_only=True)
     return [entry.field_name for entry in entries]
 
 
@@ -131,59 +121,9 @@ def is_different(new_value, old_value):
 
 def generate_guest_number() -> str:
     """Generate the next guest number based on the configured format."""
-    from .models import Setting, Guest
-    import re
-
-    now = datetime.now()
-    year_short = now.strftime("%y")
-    year_long = now.strftime("%Y")
-    month = now.strftime("%m")
-
-    setting = Setting.query.filter_by(setting_key="guestNumberFormat").first()
-    format_str = setting.value if setting else "YYMM-NNNN"
-
-    def _expand_date_placeholders(template: str) -> str:
-        return (
-            template.replace("YYYY", year_long)
-            .replace("YY", year_short)
-            .replace("MM", month)
-        )
-
-    digit_blocks = list(re.finditer(r"(N+|0+)", format_str))
-    if not digit_blocks:
-        raise ValueError("Das Format muss mindestens einen Zahlen-Block enthalten (z.B. NNN oder 000).")
-
-    # Use the *last* digit block so formats like "GTNN00NN00" can keep earlier N/0 as literal text.
-    digit_block = digit_blocks[-1]
-    digit_len = len(digit_block.group())
+    from .guest_numbers import allocate_guest_numbers
 
-    prefix_template = format_str[:digit_block.start()]
-    suffix_template = format_str[digit_block.end():]
-
-    prefix = _expand_date_placeholders(prefix_template)
-    suffix = _expand_date_placeholders(suffix_template)
-
-    # Find the last used number matching this (prefix + digits + suffix) pattern.
-    pattern = re.compile(
-        r"^" + re.escape(prefix) + r"(\d{" + str(digit_len) + r"})" + re.escape(suffix) + r"$"
-    )
-
-    q = Guest.query.with_entities(Guest.number).filter(Guest.number.like(f"{prefix}%"))
-    if suffix:
-        q = q.filter(Guest.number.like(f"%{suffix}"))
-    rows = q.order_by(Guest.number.desc()).limit(500).all()
-
-    last_number = 0
-    for (number,) in rows:
-        if not number:
-            continue
-        m = pattern.match(number)
-        if m:
-            last_number = int(m.group(1))
-            break
-
-    number_part = str(last_number + 1).zfill(digit_len)
-    return f"{prefix}{number_part}{suffix}"
+    return allocate_guest_numbers(1)[0]
 
 
 def get_guest_list_sort_args(args, allowed_sorts=None):
@@ -214,6 +154,21 @@ def guest_list_sort_order(sort_by, sort_direction):
     return [column.desc() if descending else column.asc() for column in columns]
 
 
+def keyset_filter(columns, directions, values):
+    """
+    Build a WHERE clause selecting rows strictly after `values` in the given ordering.
+    Each column is compared ascending or descending according to `directions`.
+    """
+    from sqlalchemy import and_, or_
+
+    clauses = []
+    for index, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(index)]
+        step = column < values[index] if directions[index] == "desc" else column > values[index]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
 def build_reminder_alerts(guest, animals=None, representative=None):
     """
     Return a list of reminder alerts for the given guest context.
@@ -221,7 +176,7 @@ def build_reminder_alerts(guest, animals=None, representative=None):
     """
     animals = animals or []
     alerts = []
-    reminder_fields = FieldRegistry.query.filter_by(remindable=True).all()
+    reminder_fields = get_field_registry().remindable
     if not guest or not reminder_fields:
         return alerts
 
@@ -449,25 +404,24 @@ def _build_guest_card_email_html(settings: dict, guest: Guest, body_html: str) -
 """
 
 
-def send_guest_card_email(guest: Guest, settings: dict) -> Tuple[bool, str]:
+def build_guest_card_email(guest: Guest, settings: dict) -> Tuple[Optional[dict], str]:
     """
-    Send a guest card email with an embedded QR code via Brevo (Sendinblue) SMTP API.
-    Returns (success, message).
+    Build the Brevo (Sendinblue) SMTP API payload of a guest card email with an embedded QR code.
+    Returns (payload, message); payload is None if the email cannot be sent.
     """
     if not guest.email:
-        return False, "Keine E-Mail-Adresse hinterlegt."
+        return None, "Keine E-Mail-Adresse hinterlegt."
 
-    api_key = os.environ.get("MAIL_KEY")
-    if not api_key:
-        return False, "MAIL_KEY (Brevo API Key) nicht gesetzt."
+    if not os.environ.get("MAIL_KEY"):
+        return None, "MAIL_KEY (Brevo API Key) nicht gesetzt."
 
     reply_to_email = os.environ.get("REPLY_TO")
     if not reply_to_email:
-        return False, "REPLY_TO (Antwortadresse) nicht gesetzt."
+        return None, "REPLY_TO (Antwortadresse) nicht gesetzt."
 
     sender_email = settings.get("adminEmail", {}).get("value")
     if not sender_email:
-        return False, "Absenderadresse fehlt (Admin-E-Mail)."
+        return None, "Absenderadresse fehlt (Admin-E-Mail)."
 
     sender_name = settings.get("name", {}).get("value") or "PfotenRegister"
 
@@ -481,42 +435,39 @@ def send_guest_card_email(guest: Guest, settings: dict) -> Tuple[bool, str]:
     subject = _render_guest_card_template(subject_template, guest)
     body_html = _render_guest_card_template(body_template, guest)
 
-    qr_img = qrcode.make(str(guest.id))
-    buffer = io.BytesIO()
-    qr_img.save(buffer, format="PNG")
-    qr_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    qr_png = qr_code_cache.png(str(guest.id), disk_dir=current_app.config.get("GUEST_CARD_QR_CACHE_DIR"))
+    qr_b64 = base64.b64encode(qr_png).decode("utf-8")
 
     html = _build_guest_card_email_html(settings, guest, body_html)
 
-    try:
-        payload = {
-            "sender": {"name": sender_name, "email": sender_email},
-            "to": [{"email": guest.email}],
-            "replyTo": {"email": reply_to_email},
-            "subject": subject,
-            "htmlContent": html,
-            "attachment": [
-                {
-                    "content": qr_b64,
-                    "name": f"guest-card-{guest.id}.png",
-                }
-            ],
-        }
+    payload = {
+        "sender": {"name": sender_name, "email": sender_email},
+        "to": [{"email": guest.email}],
+        "replyTo": {"email": reply_to_email},
+        "subject": subject,
+        "htmlContent": html,
+        "attachment": [
+            {
+                "content": qr_b64,
+                "name": f"guest-card-{guest.id}.png",
+            }
+        ],
+    }
+    return payload, "E-Mail vorbereitet."
 
-        resp = requests.post(
-            "https://api.brevo.com/v3/smtp/email",
-            json=payload,
-            headers={
-                "api-key": api_key,
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            },
-            timeout=30,
-        )
-        if resp.status_code in (200, 201, 202):
-            return True, "E-Mail versendet."
-        current_app.logger.error("Brevo send failed (%s): %s", resp.status_code, resp.text)
-        return False, f"Versand fehlgeschlagen: {resp.status_code} {resp.text}"
+
+def send_guest_card_email(guest: Guest, settings: dict) -> Tuple[bool, str]:
+    """
+    Send a guest card email through the app's email transport (Brevo by default).
+    Returns (success, message).
+    """
+    payload, msg = build_guest_card_email(guest, settings)
+    if payload is None:
+        return False, msg
+
+    try:
+        current_app.email_transport.send(payload)
+        return True, "E-Mail versendet."
     except Exception as exc:  # noqa: BLE001
         current_app.logger.exception("E-Mail Versand fehlgeschlagen: %s", exc)
         return False, f"Versand fehlgeschlagen: {exc}"
@@ -526,23 +477,22 @@ from uuid import uuid4
 from flask import current_app
 
 
+def attachment_blob_path(owner_id: str, filename: str) -> str:
+    """Object name for a new attachment: guest/{owner_id}/{uuid4()}.{file_ext}."""
+    ext = "" if "." not in filename else filename.rsplit(".", 1)[1]
+    name = f"{uuid4()}.{ext}" if ext else str(uuid4())
+    return f"guest/{owner_id}/{name}"
+
+
 def upload_file(file_storage, owner_id: str) -> str:
     """
-    Uploads a Werkzeug FileStorage (from request.files) to GCS under
-    {owner_type}/{owner_id}/{uuid4()}{file_ext}.
+    Uploads a Werkzeug FileStorage (from request.files) to the attachment storage
+    under guest/{owner_id}/{uuid4()}{file_ext}.
     Returns the full GCS path (object name).
     """
-    ext = "" if "." not in file_storage.filename else file_storage.filename.rsplit(".", 1)[1]
-    filename = f"{uuid4()}.{ext}" if ext else str(uuid4())
-    blob_path = f"guest/{owner_id}/{filename}"
-
-    bucket = current_app.bucket  # from create_app()
-    blob = bucket.blob(blob_path)
+    blob_path = attachment_blob_path(owner_id, file_storage.filename)
     # stream directly from the uploaded file
-    blob.upload_from_file(
-        file_storage.stream,
-        content_type=file_storage.mimetype
-    )
+    current_app.storage.put(blob_path, file_storage.stream, content_type=file_storage.mimetype)
     return blob_path
 
 
@@ -556,10 +506,8 @@ def generate_download_url(blob_path: str, expires_minutes: int = 10) -> str:
 
 
 def delete_blob(blob_path: str):
-    """Deletes the given object from GCS."""
-    bucket = current_app.bucket
-    blob = bucket.blob(blob_path)
-    blob.delete()
+    """Deletes the given object from the attachment storage."""
+    current_app.storage.delete(blob_path)
 
 def is_active(setting: str, app=None):
     """Check if a setting is active based on the app config."""
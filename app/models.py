@@ -66,6 +66,11 @@ class Guest(DictMixin, db.Model):
     )
     dispense_location = db.relationship("DropOffLocation", foreign_keys=[dispense_location_id])
 
+    __table_args__ = (
+        db.Index("ix_guests_list_name", "lifecycle_status", "lastname", "firstname"),
+        db.Index("ix_guests_list_number", "lifecycle_status", "number"),
+    )
+
     @property
     def status_group(self):
         """Return the three-state guest status used by list and planning views."""
@@ -95,6 +100,19 @@ class Guest(DictMixin, db.Model):
         viewonly=True
     )
 
+    # Read-only collections for the guest detail page; writes go through the child models.
+    messages = db.relationship("Message", order_by="Message.id", viewonly=True)
+    payments = db.relationship("Payment", order_by="Payment.created_on.desc()", viewonly=True)
+    food_history = db.relationship(
+        "FoodHistory", order_by="FoodHistory.distributed_on.desc()", viewonly=True
+    )
+    accessories_history = db.relationship(
+        "AccessoriesHistory", order_by="AccessoriesHistory.distributed_on.desc()", viewonly=True
+    )
+    changelog = db.relationship(
+        "ChangeLog", order_by="ChangeLog.change_timestamp.desc()", viewonly=True
+    )
+
 
 class Representative(DictMixin, db.Model):
     __tablename__ = 'representative'
@@ -579,3 +597,161 @@ class FoodPlanGuest(DictMixin, db.Model):
     __table_args__ = (
         db.UniqueConstraint("food_plan_id", "guest_id", name="uq_food_plan_guests"),
     )
+
+
+class SearchIndexChange(db.Model):
+    __tablename__ = "search_index_changes"
+
+    # Only the latest row per guest is kept. `revision` is the shell search index revision,
+    # taken from the "search_index" cache revision right before the writing transaction commits.
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    guest_id = db.Column(db.String(255), nullable=False, index=True)
+    revision = db.Column(db.Integer, index=True)
+    changed_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class CacheRevision(db.Model):
+    __tablename__ = "cache_revisions"
+
+    # One counter row per cached data set (e.g. "settings"), bumped whenever that data changes.
+    name = db.Column(db.String(64), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    updated_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GuestNumberSequence(db.Model):
+    __tablename__ = "guest_number_sequences"
+
+    # One counter per expanded number pattern, e.g. "2610-####" for the format YYMM-NNNN in October 2026.
+    key = db.Column(db.String(255), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class EmailJob(db.Model):
+    __tablename__ = "email_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False, default="guest_card")
+    # queued -> running -> done / failed
+    status = db.Column(db.String(16), nullable=False, default="queued", index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    sent = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_by_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", name="fk_email_jobs_created_by_id"),
+    )
+    created_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_on = db.Column(db.DateTime)
+    # Refreshed while emails are sent; a running job whose heartbeat stops is queued again.
+    heartbeat_on = db.Column(db.DateTime)
+    # Set by the runner that claimed the job; a runner stops once the job carries another token.
+    claim_token = db.Column(db.String(32))
+    finished_on = db.Column(db.DateTime)
+
+    items = db.relationship(
+        "EmailJobItem",
+        back_populates="job",
+        cascade="all, delete-orphan",
+        order_by="EmailJobItem.id",
+    )
+
+
+class EmailJobItem(db.Model):
+    __tablename__ = "email_job_items"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(
+        db.Integer,
+        db.ForeignKey("email_jobs.id", name="fk_email_job_items_job_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    guest_id = db.Column(db.String(255), nullable=False)
+    # pending -> sending -> sent / skipped / failed
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.Text)
+    sent_on = db.Column(db.DateTime)
+
+    job = db.relationship("EmailJob", back_populates="items")
+
+    __table_args__ = (
+        db.Index("ix_email_job_items_job_id_status", "job_id", "status"),
+    )
+
+
+class CardPrintJob(db.Model):
+    __tablename__ = "card_print_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # queued -> running -> done / failed; done -> expired once the PDF was deleted
+    status = db.Column(db.String(16), nullable=False, default="queued", index=True)
+    # JSON list of guest ids in print order.
+    guest_ids = db.Column(db.Text, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    double_sided = db.Column(db.Boolean, nullable=False, default=False)
+    flip_backside = db.Column(db.Boolean, nullable=False, default=False)
+    file_path = db.Column(db.String(1024))
+    error = db.Column(db.Text)
+    created_by_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", name="fk_card_print_jobs_created_by_id"),
+    )
+    created_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_on = db.Column(db.DateTime)
+    finished_on = db.Column(db.DateTime)
+
+
+class AttachmentUpload(db.Model):
+    __tablename__ = "attachment_uploads"
+
+    id = db.Column(db.String(32), primary_key=True)
+    owner_id = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255))
+    size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    # open -> finalizing -> done / failed (failed uploads can be completed again);
+    # open and failed uploads left alone for too long become expired and lose their parts
+    status = db.Column(db.String(16), nullable=False, default="open")
+    gcs_path = db.Column(db.String(512))
+    attachment_id = db.Column(
+        db.Integer,
+        db.ForeignKey("attachments.id", name="fk_attachment_uploads_attachment_id", ondelete="SET NULL"),
+    )
+    error = db.Column(db.Text)
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id", name="fk_attachment_uploads_created_by_id"))
+    created_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finalize_requested_on = db.Column(db.DateTime)
+    finished_on = db.Column(db.DateTime)
+
+    parts = db.relationship(
+        "AttachmentUploadPart",
+        back_populates="upload",
+        cascade="all, delete-orphan",
+        order_by="AttachmentUploadPart.part_number",
+    )
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+
+class AttachmentUploadPart(db.Model):
+    __tablename__ = "attachment_upload_parts"
+
+    upload_id = db.Column(
+        db.String(32),
+        db.ForeignKey("attachment_uploads.id", name="fk_attachment_upload_parts_upload_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    part_number = db.Column(db.Integer, primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    received_on = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    upload = db.relationship("AttachmentUpload", back_populates="parts")
@@ -0,0 +1,107 @@
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import PaymentPackage
+from .settings_cache import RevisionWatch, bump_revision_after_commit
+
+PAYMENT_PACKAGE_REVISION = "payment_packages"
+
+
+@dataclass(frozen=True)
+class CachedPaymentPackage:
+    """Read-only copy of an active payment package for the payment entry modals."""
+
+    id: int
+    name: str
+    category: str
+    amount: Decimal
+    comment: Optional[str]
+    display_order: int
+
+
+class PaymentPackageCache:
+    """
+    Process-wide list of active payment packages, reloaded after invalidation.
+    Edits in other workers are noticed through the shared "payment_packages" revision.
+    """
+
+    def __init__(self, poll_seconds: float = 5.0):
+        self._lock = threading.Lock()
+        self._packages = None
+        self.watch = RevisionWatch(PAYMENT_PACKAGE_REVISION, poll_seconds)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._packages = None
+
+    def get(self) -> Tuple[CachedPaymentPackage, ...]:
+        if self.watch.changed():
+            self.invalidate()
+        packages = self._packages
+        if packages is not None:
+            return packages
+        with self._lock:
+            if self._packages is None:
+                self.watch.loading()
+                rows = (
+                    PaymentPackage.query.filter_by(active=True)
+                    .order_by(PaymentPackage.display_order.asc(), PaymentPackage.name.asc())
+                    .all()
+                )
+                self._packages = tuple(
+                    CachedPaymentPackage(
+                        id=row.id,
+                        name=row.name,
+                        category=row.category,
+                        amount=row.amount,
+                        comment=row.comment,
+                        display_order=row.display_order,
+                    )
+                    for row in rows
+                )
+            return self._packages
+
+
+class LazyPaymentPackages:
+    """Sequence proxy for templates; the cache is only consulted when the packages are used."""
+
+    def __init__(self, cache: PaymentPackageCache):
+        self._cache = cache
+
+    def __iter__(self):
+        return iter(self._cache.get())
+
+    def __len__(self):
+        return len(self._cache.get())
+
+    def __bool__(self):
+        return bool(self._cache.get())
+
+    def __getitem__(self, index):
+        return self._cache.get()[index]
+
+
+payment_package_cache = PaymentPackageCache()
+
+
+def active_payment_packages() -> LazyPaymentPackages:
+    return LazyPaymentPackages(payment_package_cache)
+
+
+def invalidate_payment_packages() -> None:
+    """Drop this worker's package list after packages were added, edited or deleted."""
+    payment_package_cache.invalidate()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_payment_package_revision(session, flush_context):
+    """Other workers reload their package list once the shared revision moved."""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, PaymentPackage):
+            bump_revision_after_commit(session, {PAYMENT_PACKAGE_REVISION})
+            return
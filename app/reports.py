@@ -1,20 +1,23 @@
 import io
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.units import mm
 
-import qrcode
-import requests
 from flask import current_app
 from flask import flash
 from reportlab.lib.units import inch, mm
-from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 
+from .card_assets import load_logo_bytes, load_logo_reader, logo_cache, qr_code_cache, static_logo_path
 from .helpers import format_date
-from .models import Guest, Setting
+from .models import db, Guest, Payment, Setting
 import math
+from typing import NamedTuple
+from sqlalchemy import func
 from flask_login import current_user
 
 GUEST_CARD_FORMAT_KEYS = ("guestCardFormat", "guest_card_format")
@@ -30,171 +33,282 @@ def _get_guest_card_format():
     return GUEST_CARD_FORMAT_DEFAULT
 
 
-def generate_gast_card_pdf(guest_id):
-    return generate_multiple_gast_cards_pdf([guest_id], double_sided=True)
+def _load_guests_in_order(guest_ids):
+    """Fetch all selected guests with one IN query, keyed by id for lookups in selection order."""
+    ids = list(dict.fromkeys(guest_ids))
+    if not ids:
+        return {}
+    return {guest.id: guest for guest in Guest.query.filter(Guest.id.in_(ids)).all()}
 
-def generate_multiple_gast_cards_pdf(guest_ids, double_sided=False, flip_backside=False):
-    card_format = _get_guest_card_format()
-    if card_format == "LP898":
-        return generate_multiple_gast_cards_pdf_LP898(guest_ids, double_sided=double_sided, flip_backside=flip_backside)
-    else:
-        return generate_multiple_gast_cards_pdf_DP839(guest_ids, double_sided=double_sided, flip_backside=flip_backside)
 
-def generate_multiple_gast_cards_pdf_LP898(guest_ids, double_sided=False, flip_backside=False):
-    """
-    Generate an A4 PDF sheet with multiple guest cards laid out for perforated paper.
-    guest_ids: list of integer Guest IDs.
-    Returns a BytesIO buffer containing the PDF.
-    """
+def _card_logo_url():
+    logo_setting = Setting.query.filter_by(setting_key="logourl").first()
+    return logo_setting.value if logo_setting else None
+
+
+def _card_data(guest):
+    """Plain card fields, so card pages can also be rendered outside the app context."""
+    return {
+        "id": str(guest.id),
+        "firstname": guest.firstname,
+        "lastname": guest.lastname,
+        "number": guest.number,
+        "member_since": guest.member_since,
+    }
+
+
+# Layout LP898: 90×54 mm cards, two columns × 5 rows on A4 with 10 mm top/bottom and 15 mm left/right
+LP898_CARD_WIDTH = 90 * mm
+LP898_CARD_HEIGHT = 54 * mm
+LP898_LEFT_MARGIN = 15 * mm
+LP898_BETWEEN_COLS = 0 * mm
+
+
+def _lp898_y_positions():
     from reportlab.lib.pagesizes import A4
     page_width, page_height = A4
-
-    # card and margin sizes; fixed to 90×54 mm with 10 mm top/bottom and 15 mm left/right
-    card_width = 90 * mm
-    card_height = 54 * mm
     top_margin = 10 * mm
-    left_margin = 15 * mm
-    between_cols = 0 * mm
-
     bottom_margin = 10 * mm
-    card_rows = 5  # two columns × 5 rows = 10 cards
+    card_rows = 5
     # vertical gap so cards + margins fill full A4 height
     vertical_gap = (
         page_height
         - top_margin
         - bottom_margin
-        - (card_rows * card_height)
+        - (card_rows * LP898_CARD_HEIGHT)
     ) / (card_rows - 1)
     # compute bottom Y for each row
-    y_positions = [
+    return [
         page_height
         - top_margin
-        - row * (card_height + vertical_gap)
-        - card_height
+        - row * (LP898_CARD_HEIGHT + vertical_gap)
+        - LP898_CARD_HEIGHT
         for row in range(card_rows)
     ]
 
 
+LP898_Y_POSITIONS = _lp898_y_positions()
+
+
+def _draw_card_front_LP898(c, pos, card, qr_reader):
+    card_width = LP898_CARD_WIDTH
+    card_height = LP898_CARD_HEIGHT
+    row = pos // 2
+    col = pos % 2
+
+    x = LP898_LEFT_MARGIN + col * (card_width + LP898_BETWEEN_COLS)
+    y = LP898_Y_POSITIONS[row]
+
+    # Compute center of this card
+    center_x = x + card_width / 2
+    center_y = y + card_height / 2
+
+    # QR-Code im linken Kartenviertel um den Kartenzentrum zentriert
+    qr_size = card_width / 2
+    # Horizontaler Mittelpunkt des linken Viertels
+    qr_center_x = center_x - card_width / 4
+    qr_x = qr_center_x - qr_size / 2
+    qr_y = center_y - qr_size / 2
+    c.drawImage(qr_reader, qr_x, qr_y, width=qr_size, height=qr_size)
+
+    text_x = qr_x + qr_size + 1 * mm
+    # Überschrift zentriert oben mittig
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(center_x, y + card_height - 7 * mm, "Gästekarte")
+
+    # Infozeilen linksbündig in der rechten Spalte
+    c.setFont("Helvetica", 12)
+    info_y = y + card_height - 5 * mm - 26
+    c.drawString(text_x, info_y, f"{card['firstname']}")
+    info_y -= 14
+    c.drawString(text_x, info_y, f"{card['lastname']}")
+    info_y -= 18
+    c.drawString(text_x, info_y, f"Nummer:")
+    info_y -= 14
+    c.drawString(text_x, info_y, f"{card['number']}")
+    info_y -= 18
+    c.drawString(text_x, info_y, f"Mitglied seit:")
+    info_y -= 14
+    c.drawString(text_x, info_y, str(card['member_since'])[:4])
+
+
+def _draw_card_back_LP898(c, pos, logo_reader, small_reader, flip_backside):
+    card_width = LP898_CARD_WIDTH
+    card_height = LP898_CARD_HEIGHT
+    row = pos // 2
+    col = pos % 2
+    if flip_backside:
+        col = 1 - col
+    x = LP898_LEFT_MARGIN + col * (card_width + LP898_BETWEEN_COLS)
+    y = LP898_Y_POSITIONS[row]
+
+    # Logos innerhalb der Kartenränder platzieren
+    inner_margin = 5 * mm
+    small_size = 10 * mm
+    spacing = 1 * mm
+
+    # Großes Logo oben zentriert im inneren Bereich
+    logo_size = min(card_width - 2 * inner_margin,
+                    card_height - 2 * inner_margin - small_size - spacing)
+    logo_x = x + (card_width - logo_size) / 2
+    logo_y = y + card_height - inner_margin - logo_size
+    c.drawImage(logo_reader,
+                logo_x, logo_y,
+                width=logo_size, height=logo_size,
+                preserveAspectRatio=True, mask="auto")
+
+    # Kleines statisches Logo unten zentriert im inneren Bereich
+    small_x = x + (card_width - small_size) / 2
+    small_y = logo_y - small_size - spacing
+    c.drawImage(small_reader,
+                small_x, small_y,
+                width=small_size, height=small_size,
+                preserveAspectRatio=True, mask="auto")
+
+
+# Layout DP839: 85×55 mm cards, two columns × 5 rows on A4
+DP839_CARD_WIDTH = 85 * mm
+DP839_CARD_HEIGHT = 55 * mm
+DP839_LEFT_MARGIN = 15 * mm
+DP839_BETWEEN_COLS = 10 * mm
+DP839_TOP_MARGIN = 10 * mm
+
+
+def _draw_card_front_DP839(c, pos, card, qr_reader):
+    from reportlab.lib.pagesizes import A4
+    page_width, page_height = A4
+    card_width = DP839_CARD_WIDTH
+    card_height = DP839_CARD_HEIGHT
+    row = pos // 2
+    col = pos % 2
+
+    x = DP839_LEFT_MARGIN + col * (card_width + DP839_BETWEEN_COLS)
+    y = page_height - DP839_TOP_MARGIN - (row + 1) * card_height
+
+    # QR Code
+    qr_size = 1.5 * inch
+    qr_x = x + 5
+    qr_y = y + card_height - qr_size - 5
+    c.drawImage(qr_reader, qr_x, qr_y, width=qr_size, height=qr_size)
+
+    # Text Block
+    text_x = qr_x + qr_size + 2 * mm
+    top_align = y + card_height - 30
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(text_x, top_align, "Gästekarte")
+    c.setFont("Helvetica", 8)
+    line_gap = 20
+    line_y = top_align - line_gap
+    fields = [
+        ("Name:", f"{card['firstname']} {card['lastname']}"),
+        ("Nummer:", card['number']),
+        ("Mitglied seit:", card['number'][:4])
+    ]
+    for label, value in fields:
+        c.drawString(text_x, line_y, label)
+        line_y -= 10
+        c.drawString(text_x, line_y, value)
+        line_y -= 14
+
+
+def _draw_card_back_DP839(c, pos, logo_reader, small_reader, flip_backside):
+    from reportlab.lib.pagesizes import A4
+    page_width, page_height = A4
+    card_width = DP839_CARD_WIDTH
+    card_height = DP839_CARD_HEIGHT
+    row = pos // 2
+    col = pos % 2
+    if flip_backside:
+        col = 1 - col
+    x = DP839_LEFT_MARGIN + col * (card_width + DP839_BETWEEN_COLS)
+    y = page_height - DP839_TOP_MARGIN - (row + 1) * card_height
+
+    # Großes Logo zentriert
+    logo_size = min(card_width - 20 * mm, card_height - 20 * mm)
+    lx = x + (card_width - logo_size) / 2
+    ly = y + (card_height - logo_size) / 2
+    c.drawImage(logo_reader, lx, ly, width=logo_size, height=logo_size,
+                preserveAspectRatio=True, mask="auto")
+
+
+CARD_LAYOUTS = {
+    "LP898": (_draw_card_front_LP898, _draw_card_back_LP898),
+    "DP839": (_draw_card_front_DP839, _draw_card_back_DP839),
+}
+CARDS_PER_PAGE = 10
+
+
+def _render_card_pages(card_format, cards, fronts=True, backs=False, flip_backside=False,
+                       logo_reader=None, small_reader=None, qr_cache_dir=None):
+    """
+    Render card fronts and/or backsides onto A4 pages and return the PDF buffer.
+    `cards` follows the selection order; None marks guests that were not found.
+    """
+    from reportlab.lib.pagesizes import A4
+    draw_front, draw_back = CARD_LAYOUTS[card_format]
+
     pdf_buffer = io.BytesIO()
     c = canvas.Canvas(pdf_buffer, pagesize=A4)
 
-    for idx, guest_id in enumerate(guest_ids):
-        # Load Guest object
-        guest = Guest.query.get(guest_id)
-        if not guest:
-            continue
-        if idx > 0 and idx % 10 == 0:
-            c.showPage()
-        pos = idx % 10
-        row = pos // 2
-        col = pos % 2
-
-        x = left_margin + col * (card_width + between_cols)
-        y = y_positions[row]
-
-        # Compute center of this card
-        center_x = x + card_width / 2
-        center_y = y + card_height / 2
-
-
-        # QR-Code im linken Kartenviertel um den Kartenzentrum zentriert
-        qr_size = card_width / 2
-        # Horizontaler Mittelpunkt des linken Viertels
-        qr_center_x = center_x - card_width / 4
-        qr_x = qr_center_x - qr_size / 2
-        qr_y = center_y - qr_size / 2
-        qr_img = qrcode.make(str(guest.id))
-        qr_buffer = io.BytesIO()
-        qr_img.save(qr_buffer, format="PNG")
-        qr_buffer.seek(0)
-        qr_reader = ImageReader(qr_buffer)
-        c.drawImage(qr_reader, qr_x, qr_y, width=qr_size, height=qr_size)
-
-        text_x = qr_x + qr_size + 1 * mm
-        # Überschrift zentriert oben mittig
-        c.setFont("Helvetica-Bold", 16)
-        c.drawCentredString(center_x, y + card_height - 7 * mm, "Gästekarte")
-
-        # Infozeilen linksbündig in der rechten Spalte
-        c.setFont("Helvetica", 12)
-        info_y = y + card_height - 5 * mm - 26
-        c.drawString(text_x, info_y, f"{guest.firstname}")
-        info_y -= 14
-        c.drawString(text_x, info_y, f"{guest.lastname}")
-        info_y -= 18
-        c.drawString(text_x, info_y, f"Nummer:")
-        info_y -= 14
-        c.drawString(text_x, info_y, f"{guest.number}")
-        info_y -= 18
-        c.drawString(text_x, info_y, f"Mitglied seit:")
-        info_y -= 14
-        c.drawString(text_x, info_y, str(guest.member_since)[:4])
+    if fronts:
+        for idx, card in enumerate(cards):
+            if not card:
+                continue
+            if idx > 0 and idx % CARDS_PER_PAGE == 0:
+                c.showPage()
+            draw_front(c, idx % CARDS_PER_PAGE, card, qr_code_cache.reader(card["id"], disk_dir=qr_cache_dir))
 
-    if double_sided:
+    if backs:
         # Rückseiten drucken
-        c.showPage()
-        # Logo-Einstellungen einmalig laden
-        logo_setting = Setting.query.filter_by(setting_key="logourl").first()
-        logo_url = logo_setting.value if logo_setting else None
-
-        # Funktion zum Laden eines Logos
-        def load_logo(url):
-            if not url or url == "/static/logo.png":
-                path = os.path.join(current_app.root_path, "static", "logo.png")
-                return ImageReader(path)
-            if url.startswith("http"):
-                resp = requests.get(url)
-                resp.raise_for_status()
-                return ImageReader(io.BytesIO(resp.content))
-            # lokaler Pfad relativ zum static-Ordner
-            path = os.path.join(current_app.root_path, "static", url)
-            return ImageReader(path)
-
-        logo_reader = load_logo(logo_url)
-
-        for idx, guest_id in enumerate(guest_ids):
-            if idx > 0 and idx % 10 == 0:
+        if fronts:
+            c.showPage()
+        for idx in range(len(cards)):
+            if idx > 0 and idx % CARDS_PER_PAGE == 0:
                 c.showPage()
-            pos = idx % 10
-            row = pos // 2
-            col = pos % 2
-            if flip_backside:
-                col = 1 - col
-            x = left_margin + col * (card_width + between_cols)
-            y = y_positions[row]
-
-            # Logos innerhalb der Kartenränder platzieren
-            inner_margin = 5 * mm
-            small_size = 10 * mm
-            spacing = 1 * mm
-
-            # Großes Logo oben zentriert im inneren Bereich
-            logo_size = min(card_width - 2 * inner_margin,
-                            card_height - 2 * inner_margin - small_size - spacing)
-            logo_x = x + (card_width - logo_size) / 2
-            logo_y = y + card_height - inner_margin - logo_size
-            c.drawImage(logo_reader,
-                        logo_x, logo_y,
-                        width=logo_size, height=logo_size,
-                        preserveAspectRatio=True, mask="auto")
-
-            # Kleines statisches Logo unten zentriert im inneren Bereich
-            small_logo_path = os.path.join(current_app.root_path, "static", "logo.png")
-            small_reader = ImageReader(small_logo_path)
-            small_x = x + (card_width - small_size) / 2
-            small_y = logo_y - small_size - spacing
-            c.drawImage(small_reader,
-                        small_x, small_y,
-                        width=small_size, height=small_size,
-                        preserveAspectRatio=True, mask="auto")
-
-
+            draw_back(c, idx % CARDS_PER_PAGE, logo_reader, small_reader, flip_backside)
 
     c.save()
     pdf_buffer.seek(0)
     return pdf_buffer
 
 
+def _generate_cards_pdf(card_format, guest_ids, double_sided=False, flip_backside=False):
+    guests = _load_guests_in_order(guest_ids)
+    cards = [_card_data(guests[guest_id]) if guest_id in guests else None for guest_id in guest_ids]
+    logo_reader = small_reader = None
+    if double_sided:
+        # Logos einmalig laden; dieselben ImageReader werden für alle Karten genutzt
+        logo_reader = load_logo_reader(_card_logo_url())
+        small_reader = logo_cache.local(static_logo_path())
+    return _render_card_pages(
+        card_format,
+        cards,
+        backs=double_sided,
+        flip_backside=flip_backside,
+        logo_reader=logo_reader,
+        small_reader=small_reader,
+        qr_cache_dir=current_app.config.get("GUEST_CARD_QR_CACHE_DIR"),
+    )
+
+
+def generate_gast_card_pdf(guest_id):
+    return generate_multiple_gast_cards_pdf([guest_id], double_sided=True)
+
+def generate_multiple_gast_cards_pdf(guest_ids, double_sided=False, flip_backside=False):
+    card_format = _get_guest_card_format()
+    if card_format == "LP898":
+        return generate_multiple_gast_cards_pdf_LP898(guest_ids, double_sided=double_sided, flip_backside=flip_backside)
+    else:
+        return generate_multiple_gast_cards_pdf_DP839(guest_ids, double_sided=double_sided, flip_backside=flip_backside)
+
+def generate_multiple_gast_cards_pdf_LP898(guest_ids, double_sided=False, flip_backside=False):
+    """
+    Generate an A4 PDF sheet with multiple guest cards laid out for perforated paper.
+    guest_ids: list of integer Guest IDs.
+    Returns a BytesIO buffer containing the PDF.
+    """
+    return _generate_cards_pdf("LP898", guest_ids, double_sided=double_sided, flip_backside=flip_backside)
+
 
 def generate_multiple_gast_cards_pdf_DP839(guest_ids, double_sided=False, flip_backside=False):
     """
@@ -202,133 +316,174 @@ def generate_multiple_gast_cards_pdf_DP839(guest_ids, double_sided=False, flip_b
     guest_ids: list of integer Guest IDs.
     Returns a BytesIO buffer containing the PDF.
     """
-    from reportlab.lib.pagesizes import A4
-    # card and margin sizes in millimeters
-    card_width = 85 * mm
-    card_height = 55 * mm
-    left_margin = 15 * mm
-    between_cols = 10 * mm
-    top_margin = 10 * mm
+    return _generate_cards_pdf("DP839", guest_ids, double_sided=double_sided, flip_backside=flip_backside)
 
-    page_width, page_height = A4
 
+def _render_card_chunk(card_format, cards, double_sided, flip_backside, logo_data, small_logo_data, qr_cache_dir):
+    """Process pool task: render the front page and, if requested, the backside page of one chunk."""
+    front = None
+    if any(cards):
+        front = _render_card_pages(card_format, cards, qr_cache_dir=qr_cache_dir).getvalue()
+    back = None
+    if double_sided:
+        back = _render_card_pages(
+            card_format,
+            cards,
+            fronts=False,
+            backs=True,
+            flip_backside=flip_backside,
+            logo_reader=logo_cache.from_bytes(logo_data),
+            small_reader=logo_cache.from_bytes(small_logo_data),
+        ).getvalue()
+    return front, back
+
+
+_card_pool = None
+_card_pool_lock = threading.Lock()
+
+
+def _get_card_pool(max_workers):
+    """Return the process pool for card rendering, started on first use and kept for later print runs."""
+    global _card_pool
+    with _card_pool_lock:
+        if _card_pool is None:
+            _card_pool = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _card_pool
+
+
+def generate_multiple_gast_cards_pdf_parallel(guest_ids, double_sided=False, flip_backside=False, max_workers=None):
+    """
+    Render guest cards in page-sized chunks on a process pool and merge the pages into one PDF.
+    Page order matches generate_multiple_gast_cards_pdf: all front pages first, then all backsides.
+    """
+    from pypdf import PdfWriter
+
+    card_format = _get_guest_card_format()
+    if card_format not in CARD_LAYOUTS:
+        card_format = "DP839"
+    guests = _load_guests_in_order(guest_ids)
+    cards = [_card_data(guests[guest_id]) if guest_id in guests else None for guest_id in guest_ids]
+    logo_data = small_logo_data = None
+    if double_sided:
+        logo_data = load_logo_bytes(_card_logo_url())
+        small_logo_data = load_logo_bytes(None)
+    qr_cache_dir = current_app.config.get("GUEST_CARD_QR_CACHE_DIR")
+
+    chunks = [cards[start:start + CARDS_PER_PAGE] for start in range(0, len(cards), CARDS_PER_PAGE)]
+    pool = _get_card_pool(max_workers or current_app.config.get("GUEST_CARD_PDF_WORKERS"))
+    futures = [
+        pool.submit(
+            _render_card_chunk,
+            card_format,
+            chunk,
+            double_sided,
+            flip_backside,
+            logo_data,
+            small_logo_data,
+            qr_cache_dir,
+        )
+        for chunk in chunks
+    ]
+    rendered = [future.result() for future in futures]
+
+    writer = PdfWriter()
+    for part in [front for front, _ in rendered if front] + [back for _, back in rendered if back]:
+        writer.append(io.BytesIO(part))
+    # Every chunk embeds its own copy of the logos; keep only one per document.
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
     pdf_buffer = io.BytesIO()
-    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+    writer.write(pdf_buffer)
+    pdf_buffer.seek(0)
+    return pdf_buffer
 
-    for idx, guest_id in enumerate(guest_ids):
-        # Load Guest object
-        guest = Guest.query.get(guest_id)
-        if not guest:
-            continue
-        if idx > 0 and idx % 10 == 0:
-            c.showPage()
-        pos = idx % 10
-        row = pos // 2
-        col = pos % 2
-
-        x = left_margin + col * (card_width + between_cols)
-        y = page_height - top_margin - (row + 1) * card_height
-
-
-
-        # QR Code
-        qr_img = qrcode.make(str(guest.id))
-        qr_buffer = io.BytesIO()
-        qr_img.save(qr_buffer, format="PNG")
-        qr_buffer.seek(0)
-        qr_reader = ImageReader(qr_buffer)
-        qr_size = 1.5 * inch
-        qr_x = x + 5
-        qr_y = y + card_height - qr_size - 5
-        c.drawImage(qr_reader, qr_x, qr_y, width=qr_size, height=qr_size)
-
-        # Text Block
-        text_x = qr_x + qr_size + 2 * mm
-        top_align = y + card_height - 30
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(text_x, top_align, "Gästekarte")
-        issue_date = format_date(datetime.now())[-4:]
-        c.setFont("Helvetica", 8)
-        line_gap = 20
-        line_y = top_align - line_gap
-        fields = [
-            ("Name:", f"{guest.firstname} {guest.lastname}"),
-            ("Nummer:", guest.number),
-            ("Mitglied seit:", guest.number[:4])
-        ]
-        for label, value in fields:
-            c.drawString(text_x, line_y, label)
-            line_y -= 10
-            c.drawString(text_x, line_y, value)
-            line_y -= 14
 
-    if double_sided:
-        # Rückseiten drucken
-        c.showPage()
-        # Logo-Einstellungen einmalig laden
-        logo_setting = Setting.query.filter_by(setting_key="logourl").first()
-        logo_url = logo_setting.value if logo_setting else None
-
-        # Funktion zum Laden eines Logos
-        def load_logo(url):
-            if not url or url == "/static/logo.png":
-                path = os.path.join(current_app.root_path, "static", "logo.png")
-                return ImageReader(path)
-            if url.startswith("http"):
-                resp = requests.get(url)
-                resp.raise_for_status()
-                return ImageReader(io.BytesIO(resp.content))
-            # lokaler Pfad relativ zum static-Ordner
-            path = os.path.join(current_app.root_path, "static", url)
-            return ImageReader(path)
-
-        logo_reader = load_logo(logo_url)
-
-        for idx, guest_id in enumerate(guest_ids):
-            if idx > 0 and idx % 10 == 0:
-                c.showPage()
-            pos = idx % 10
-            row = pos // 2
-            col = pos % 2
-            if flip_backside:
-                col = 1 - col
-            x = left_margin + col * (card_width + between_cols)
-            y = page_height - top_margin - (row + 1) * card_height
+PAYMENT_REPORT_ROWS_PER_PAGE = 25
+PAYMENT_REPORT_FETCH_ROWS = 500
+
+
+def payment_report_query(from_date, to_date):
+    """Payments of the reporting period with guest details, in report order."""
+    return (
+        db.session.query(
+            Payment.paid_on,
+            Guest.number,
+            Guest.firstname,
+            Guest.lastname,
+            Payment.food_amount,
+            Payment.other_amount,
+            Payment.comment
+        )
+        .join(Guest, Payment.guest_id == Guest.id)
+        .filter(Payment.paid_on.between(from_date, to_date))
+        .order_by(Payment.paid_on.asc(), Payment.id.asc())
+    )
 
 
-            # Großes Logo zentriert
-            logo_size = min(card_width - 20 * mm, card_height - 20 * mm)
-            lx = x + (card_width - logo_size) / 2
-            ly = y + (card_height - logo_size) / 2
-            c.drawImage(logo_reader, lx, ly, width=logo_size, height=logo_size,
-                        preserveAspectRatio=True, mask="auto")
+class PaymentTotals(NamedTuple):
+    count: int
+    food: float
+    other: float
+    by_day: dict
+    by_guest: list
 
 
+def payment_report_totals(from_date, to_date) -> PaymentTotals:
+    """
+    Entry count and amounts of the reporting period, per day and per guest, summed by the database.
+    The grand total is added up from the per-day groups rather than with ROLLUP, which SQLite and
+    MySQL spell differently.
+    """
+    count = func.count(Payment.id).label("count")
+    food = func.coalesce(func.sum(Payment.food_amount), 0).label("food")
+    other = func.coalesce(func.sum(Payment.other_amount), 0).label("other")
+    in_period = Payment.paid_on.between(from_date, to_date)
+
+    days = (
+        db.session.query(Payment.paid_on, count, food, other)
+        .join(Guest, Payment.guest_id == Guest.id)
+        .filter(in_period)
+        .group_by(Payment.paid_on)
+        .all()
+    )
+    guests = (
+        db.session.query(Guest.id, Guest.number, Guest.firstname, Guest.lastname, count, food, other)
+        .join(Payment, Payment.guest_id == Guest.id)
+        .filter(in_period)
+        .group_by(Guest.id, Guest.number, Guest.firstname, Guest.lastname)
+        .order_by(Guest.number.asc(), Guest.lastname.asc())
+        .all()
+    )
+    return PaymentTotals(
+        count=sum(day.count for day in days),
+        food=sum(day.food for day in days),
+        other=sum(day.other for day in days),
+        by_day={day.paid_on: day for day in days},
+        by_guest=guests,
+    )
 
-    c.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer
 
-def generate_payment_report(records, from_date, to_date):
+def _format_amount(value: float) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def generate_payment_report(records, from_date, to_date, target=None):
     """
     Generate an A4 PDF report of payments, matching the HTML layout:
     header with logo and metadata, report title, date range,
     entry count, and a table with totals in the footer.
+    Pages hold 25 rows; totals are carried forward, so every record is visited once.
+    The PDF is written into `target` (a new BytesIO by default), which is returned rewound.
     """
     from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+    from reportlab.platypus import SimpleDocTemplate
     from reportlab.lib import colors
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import mm
     from flask_login import current_user
-    from .models import Setting
-    from flask import current_app
-    import requests
-
-    def f_n(n):
-        return f"{n:.2f}".replace(".", ",")
 
-    buffer = io.BytesIO()
+    buffer = target if target is not None else io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
         pagesize=A4,
@@ -342,31 +497,21 @@ def generate_payment_report(records, from_date, to_date):
     footer_style = ParagraphStyle('footer', parent=styles['Normal'], fontSize=9, leading=11, alignment=1)
     title_style = styles['Heading1']
 
-    elements = []
-
-    # Load logo
+    # Both logos are loaded once and the same flowables are placed on every page;
+    # reportlab embeds each image a single time.
     logo_setting = Setting.query.filter_by(setting_key="logourl").first()
-    logo_url = logo_setting.value if logo_setting else None
-    def load_logo(url):
-        if not url or url == "/static/logo.png":
-            return os.path.join(current_app.root_path, "static", "logo.png")
-        if url.startswith("http"):
-            resp = requests.get(url)
-            resp.raise_for_status()
-            tmp = io.BytesIO(resp.content)
-            return tmp
-        return os.path.join(current_app.root_path, "static", url)
-    logo_src = load_logo(logo_url)
-
-    # Pagination: split into pages of 25 rows
-    page_size = 25
-    chunks = [records[i:i+page_size] for i in range(0, len(records), page_size)]
-    total_pages = len(chunks)
-
-    for page_index, chunk in enumerate(chunks):
-        # Logo zentriert oben auf jeder Seite
-        logo_img = Image(logo_src, width=35*mm, height=25*mm)
-        logo_img.hAlign = 'CENTER'
+    logo_img = Image(io.BytesIO(load_logo_bytes(logo_setting.value if logo_setting else None)),
+                     width=35 * mm, height=25 * mm)
+    logo_img.hAlign = 'CENTER'
+    footer_logo = Image(static_logo_path(), width=15 * mm, height=15 * mm)
+
+    header = ['Datum', 'Gastnummer', 'Name', 'Futter (€)', 'Zubehör (€)', 'Kommentar']
+    page_size = PAYMENT_REPORT_ROWS_PER_PAGE
+    total_pages = math.ceil(len(records) / page_size)
+    food_total = other_total = 0.0
+
+    elements = []
+    for page_index in range(total_pages):
         elements.append(logo_img)
         elements.append(Spacer(1, 6))
 
@@ -378,55 +523,36 @@ def generate_payment_report(records, from_date, to_date):
             elements.append(Paragraph(f"Anzahl Einträge: {len(records)}", header_style))
             elements.append(Spacer(1, 6))
 
-
-        # Compute sums of all previous pages
-        prev_records = [r for rec_chunk in chunks[:page_index] for r in rec_chunk]
-        prev_food = sum(float(getattr(r, 'food_amount', getattr(r, 'futter_betrag', 0))) for r in prev_records)
-        prev_other = sum(float(getattr(r, 'other_amount', getattr(r, 'zubehoer_betrag', 0))) for r in prev_records)
-
-
-
-        # Table data for this page
-        data = [['Datum', 'Gastnummer', 'Name', 'Futter (€)', 'Zubehör (€)', 'Kommentar']]
+        data = [header]
         # Carry-over-Zeile für alle Seiten außer der ersten
         if page_index > 0:
             data.append([
                 'Übertrag', '', '',
-                f_n(prev_food),
-                f_n(prev_other),
-                f_n(prev_other+prev_food),
+                _format_amount(food_total),
+                _format_amount(other_total),
+                _format_amount(food_total + other_total),
             ])
-        for r in chunk:
+        for r in records[page_index * page_size:(page_index + 1) * page_size]:
+            food = float(r.food_amount or 0)
+            other = float(r.other_amount or 0)
+            food_total += food
+            other_total += other
             data.append([
                 r.paid_on.strftime('%d.%m.%Y'),
-                getattr(r, 'number', getattr(r, 'guest_number', '')),
-                f"{getattr(r, 'firstname')} {getattr(r, 'lastname')}",
-                f_n(float(getattr(r, 'food_amount', getattr(r, 'futter_betrag', 0)))),
-                f_n(float(getattr(r, 'other_amount', getattr(r, 'zubehoer_betrag', 0)))),
-                getattr(r, 'comment') or ''
-            ])
-        # Zwischensumme inklusive Übertrag
-        # Subtotal including carry-over
-        page_food = sum(float(getattr(r, 'food_amount', getattr(r, 'futter_betrag', 0))) for r in chunk)
-        page_other = sum(float(getattr(r, 'other_amount', getattr(r, 'zubehoer_betrag', 0))) for r in chunk)
-        cumulative_food = prev_food + page_food
-        cumulative_other = prev_other + page_other
-        if page_index+1 == total_pages:
-            data.append([
-                'Gesamtsumme', '', '',
-                f_n(cumulative_food),
-                f_n(cumulative_other),
-                f_n(cumulative_food + cumulative_other),
-            ])
-        else:
-            data.append([
-                'Zwischensumme', '', '',
-                f_n(cumulative_food),
-                f_n(cumulative_other),
-                f_n(cumulative_food + cumulative_other),
+                r.number or '',
+                f"{r.firstname} {r.lastname}",
+                _format_amount(food),
+                _format_amount(other),
+                r.comment or '',
             ])
+        # Zwischensumme inklusive Übertrag, auf der letzten Seite Gesamtsumme
+        data.append([
+            'Gesamtsumme' if page_index + 1 == total_pages else 'Zwischensumme', '', '',
+            _format_amount(food_total),
+            _format_amount(other_total),
+            _format_amount(food_total + other_total),
+        ])
 
-        # Build table and apply base style
         table = Table(data, repeatRows=1)
         style = TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -434,37 +560,28 @@ def generate_payment_report(records, from_date, to_date):
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
         ])
-
         # Bold "Übertrag" row if present (always at index 1 when page_index > 0)
         if page_index > 0:
             style.add('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold')
-
         # Bold the last row (subtotal or total)
-        last_row = len(data) - 1
-        style.add('FONTNAME', (0, last_row), (-1, last_row), 'Helvetica-Bold')
-
+        style.add('FONTNAME', (0, len(data) - 1), (-1, len(data) - 1), 'Helvetica-Bold')
         table.setStyle(style)
         elements.append(table)
         elements.append(Spacer(1, 6))
 
-
-
         # Footer with page number
         elements.append(Spacer(1, 12))
         elements.append(Paragraph(f"Seite {page_index+1} von {total_pages}", footer_style))
         elements.append(Spacer(1, 8))
         # Pfotenregister-Logo und Text im Footer
-        logo_path = os.path.join(current_app.root_path, 'static', 'logo.png')
-        elements.append(Image(logo_path, width=15 * mm, height=15 * mm))
+        elements.append(footer_logo)
         elements.append(Spacer(1, 4))
-
         elements.append(Paragraph("Erstellt mit Pfotenregister", footer_style))
         elements.append(Spacer(1, 6))
 
         if page_index < total_pages - 1:
             elements.append(PageBreak())
 
-    # Build document
     doc.build(elements)
     buffer.seek(0)
     return buffer
@@ -1,7 +1,7 @@
+import os
 from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-import re
 
 from flask import (
     Blueprint,
@@ -10,29 +10,39 @@ from flask import (
     redirect,
     url_for,
     flash,
-    current_app, send_file,
+    current_app, send_file, jsonify, stream_template,
 )
 from flask_login import current_user, login_required
 from sqlalchemy.sql.sqltypes import Date, DateTime
 from werkzeug.security import generate_password_hash
 
 from ...auth import get_user_by_username
-from ...helpers import roles_required, get_form_value, send_guest_card_email
+from ...card_print_jobs import card_print_job_progress, create_card_print_job
+from ...dashboard_stats import dashboard_stats
+from ...exports import EXPORT_SPOOL_MAX_BYTES, new_export_spool
+from ...email_jobs import create_guest_card_job, job_progress
+from ...field_registry_cache import invalidate_field_registry
+from ...payment_package_cache import invalidate_payment_packages
+from ...helpers import roles_required, get_form_value
 from ...models import (
     db,
+    CardPrintJob,
+    EmailJob,
     Guest,
     Animal,
-    MedicalEvent,
     User,
-    FoodHistory,
-    Payment,
     PaymentPackage,
     FieldRegistry,
     Setting,
     FoodTag,
     Representative,
 )
-from ...reports import generate_multiple_gast_cards_pdf, generate_payment_report
+from ...reports import (
+    generate_payment_report,
+    payment_report_query,
+    payment_report_totals,
+    PAYMENT_REPORT_FETCH_ROWS,
+)
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -128,142 +138,28 @@ def _get_species_choices():
 @login_required
 @roles_required("admin")
 def dashboard():
-    from datetime import date, timedelta
-
-    total_guests = Guest.query.count()
-    active_guests = Guest.query.filter_by(lifecycle_status="active").count()
-    staging_guests = Guest.query.filter_by(lifecycle_status="staging").count()
-
-    last_30_days = date.today() - timedelta(days=30)
-    recent_guests = (
-        FoodHistory.query.filter(FoodHistory.distributed_on >= last_30_days)
-        .with_entities(FoodHistory.guest_id)
-        .distinct()
-        .count()
-    )
-
-    total_animals = Animal.query.count()
-    total_medical_events = MedicalEvent.query.count()
-    planned_medical_events = MedicalEvent.query.filter_by(status="Geplant").count()
-    active_medical_events = MedicalEvent.query.filter_by(status="Aktiv").count()
-    past_medical_events = MedicalEvent.query.filter(MedicalEvent.status.in_(["Abgeschlossen", "Abgesagt"])).count()
-    upcoming_follow_ups = (
-        MedicalEvent.query.filter(
-            MedicalEvent.follow_up_on.isnot(None),
-            MedicalEvent.follow_up_on >= date.today(),
-            MedicalEvent.follow_up_on <= date.today() + timedelta(days=14),
-        ).count()
-    )
-    total_medical_actual_cost = (
-        db.session.query(db.func.coalesce(db.func.sum(MedicalEvent.actual_cost), 0)).scalar() or 0
-    )
-    animals_by_type = (
-        Animal.query.with_entities(Animal.species, db.func.count().label("count"))
-        .group_by(Animal.species)
-        .all()
-    )
-
-    top_guests_by_visits = (
-        db.session.query(Guest.number, Guest.firstname, Guest.lastname, Guest.id,
-                         db.func.count(FoodHistory.id).label("besuche"))
-        .outerjoin(FoodHistory, Guest.id == FoodHistory.guest_id)
-        .group_by(Guest.id)
-        .order_by(db.desc("besuche"))
-        .limit(10)
-        .all()
-    )
-
-    payment_trends = (
-        db.session.query(
-            FoodHistory.distributed_on,
-            db.func.coalesce(db.func.sum(Payment.food_amount), 0).label("Futtersumme"),
-            db.func.coalesce(db.func.sum(Payment.other_amount), 0).label("Andere"),
-        )
-        .outerjoin(Payment,
-                   (FoodHistory.guest_id == Payment.guest_id) & (Payment.paid_on == FoodHistory.distributed_on))
-        .group_by(FoodHistory.distributed_on)
-        .order_by(FoodHistory.distributed_on.asc())
-        .limit(30)
-        .all()
-    )
-
-    species_tabs = []
-    top_tags_by_species = {}
-    if current_app.config.get("SETTINGS", {}).get("tagsystem", {}).get("value") == "Aktiv":
-        aft = db.metadata.tables.get("animal_food_tags")
-
-        # Build counts for (tag, species) + also derive "associated species" per tag.
-        tag_species_rows = (
-            db.session.query(
-                FoodTag.id.label("tag_id"),
-                FoodTag.name.label("tag_name"),
-                FoodTag.color.label("tag_color"),
-                Animal.species.label("species"),
-                db.func.count(db.distinct(Animal.id)).label("animal_count"),
-            )
-            .join(aft, aft.c.food_tag_id == FoodTag.id)
-            .join(Animal, Animal.id == aft.c.animal_id)
-            .filter(Animal.species.isnot(None))
-            .group_by(FoodTag.id, FoodTag.name, FoodTag.color, Animal.species)
-            .all()
-        )
-
-        associated_species_by_tag = defaultdict(set)
-        for row in tag_species_rows:
-            if row.species:
-                associated_species_by_tag[row.tag_id].add(row.species)
-
-        species_labels = _get_species_choices()
-        for label in species_labels:
-            tab_id = re.sub(r"[^a-z0-9_-]+", "_", str(label).strip().lower()).strip("_") or "unknown"
-            species_tabs.append({"id": tab_id, "label": label})
-
-        # Index counts by species for quick table creation.
-        rows_by_species = defaultdict(list)
-        for row in tag_species_rows:
-            if not row.species:
-                continue
-            rows_by_species[row.species].append(row)
-
-        for tab in species_tabs:
-            species_label = tab["label"]
-            entries = []
-            for row in rows_by_species.get(species_label, []):
-                entries.append(
-                    {
-                        "id": row.tag_id,
-                        "name": row.tag_name,
-                        "color": row.tag_color,
-                        "count": int(row.animal_count or 0),
-                        "associated_species": sorted(associated_species_by_tag.get(row.tag_id, set())),
-                    }
-                )
-            entries.sort(key=lambda e: (-e["count"], e["name"].lower()))
-            top_tags_by_species[tab["id"]] = entries[:10]
+    stats = dashboard_stats.stats()
+    if current_app.config.get("SETTINGS", {}).get("tagsystem", {}).get("value") != "Aktiv":
+        stats.update(species_tabs=[], top_tags_by_species={})
 
     return render_template(
         "admin/dashboard.html",
         current_user=current_user,
-        total_guests=total_guests,
-        active_guests=active_guests,
-        staging_guests=staging_guests,
-        recent_guests=recent_guests,
-        total_animals=total_animals,
-        total_medical_events=total_medical_events,
-        planned_medical_events=planned_medical_events,
-        active_medical_events=active_medical_events,
-        past_medical_events=past_medical_events,
-        upcoming_follow_ups=upcoming_follow_ups,
-        total_medical_actual_cost=total_medical_actual_cost,
-        animals_by_type=animals_by_type,
-        top_guests_by_visits=top_guests_by_visits,
-        payment_trends=payment_trends,
-        species_tabs=species_tabs,
-        top_tags_by_species=top_tags_by_species,
+        **stats,
         title="Dashboard"
     )
 
 
+@admin_bp.route("/dashboard/refresh", methods=["POST"])
+@login_required
+@roles_required("admin")
+def refresh_dashboard():
+    """Recompute all materialized dashboard statistics from scratch."""
+    dashboard_stats.stats(force=True)
+    flash("Dashboard-Statistiken neu berechnet.", "success")
+    return redirect(url_for("admin.dashboard"))
+
+
 @admin_bp.route("/payment-packages", methods=["GET", "POST"])
 @login_required
 @roles_required("admin")
@@ -299,6 +195,7 @@ def payment_packages():
         )
         db.session.add(package)
         db.session.commit()
+        invalidate_payment_packages()
         flash("Zahlungspaket angelegt.", "success")
         return redirect(url_for("admin.payment_packages"))
 
@@ -344,6 +241,7 @@ def update_payment_package(package_id):
     package.display_order = display_order
     package.updated_on = datetime.utcnow()
     db.session.commit()
+    invalidate_payment_packages()
     flash("Zahlungspaket aktualisiert.", "success")
     return redirect(url_for("admin.payment_packages"))
 
@@ -356,6 +254,7 @@ def delete_payment_package(package_id):
     package = PaymentPackage.query.get_or_404(package_id)
     db.session.delete(package)
     db.session.commit()
+    invalidate_payment_packages()
     flash("Zahlungspaket gelöscht.", "success")
     return redirect(url_for("admin.payment_packages"))
 
@@ -440,6 +339,7 @@ def update_field_visibility():
             except ValueError:
                 pass
     db.session.commit()
+    invalidate_field_registry()
     flash("Feldsichtbarkeit wurde aktualisiert.", "success")
     return redirect(url_for("admin.edit_settings", tab="fields"))
 
@@ -572,6 +472,7 @@ def reminder_settings():
         else:
             field.reminder_species = None
     db.session.commit()
+    invalidate_field_registry()
     flash("Erinnerungseinstellungen gespeichert.", "success")
     return redirect(url_for("admin.edit_settings", tab="reminders"))
 
@@ -641,34 +542,14 @@ def export_transactions():
         flash("Ungültiges Datumsformat.", "danger")
         return redirect(url_for("admin.dashboard"))
 
-    # Load transactions via SQLAlchemy
-    records = (
-        db.session.query(
-            Payment.paid_on,
-            Guest.number,
-            Guest.firstname,
-            Guest.lastname,
-            Payment.food_amount,
-            Payment.other_amount,
-            Payment.comment
-        )
-        .join(Guest, Payment.guest_id == Guest.id)
-        .filter(Payment.paid_on.between(from_dt, to_dt))
-        .order_by(Payment.paid_on.asc())
-        .all()
-    )
-    # Compute totals
-    total_food = sum(r.food_amount for r in records)
-    total_other = sum(r.other_amount for r in records)
-
-    return render_template(
+    # Totals come from GROUP BY queries; the detail rows are streamed into the page in batches.
+    return stream_template(
         "reports/transaction_report.html",
-        transactions=records,
+        transactions=payment_report_query(from_dt, to_dt).yield_per(PAYMENT_REPORT_FETCH_ROWS),
+        totals=payment_report_totals(from_dt, to_dt),
         current_user=current_user,
         from_date=from_dt.strftime('%d.%m.%Y'),
         to_date=to_dt.strftime('%d.%m.%Y'),
-        total_food=total_food,
-        total_other=total_other,
         now = datetime.today(),
         title="Zahlungsbericht"
     )
@@ -686,24 +567,10 @@ def print_export_transactions():
     except (TypeError, ValueError):
         flash("Ungültiges Datumsformat.", "danger")
         return redirect(url_for('admin.export_transactions'))
-    # Load transactions via SQLAlchemy
-    records = (
-        db.session.query(
-            Payment.paid_on,
-            Guest.number,
-            Guest.firstname,
-            Guest.lastname,
-            Payment.food_amount,
-            Payment.other_amount,
-            Payment.comment
-        )
-        .join(Guest, Payment.guest_id == Guest.id)
-        .filter(Payment.paid_on.between(from_dt, to_dt))
-        .order_by(Payment.paid_on.asc())
-        .all()
-    )
-    # Generate PDF
-    pdf_buffer = generate_payment_report(records, from_dt, to_dt)
+    records = payment_report_query(from_dt, to_dt).all()
+    # Generate PDF; a long reporting period spills to disk instead of staying in memory
+    spool = new_export_spool(current_app.config.get("EXPORT_SPOOL_MAX_BYTES", EXPORT_SPOOL_MAX_BYTES))
+    pdf_buffer = generate_payment_report(records, from_dt, to_dt, target=spool)
     filename = f"zahlungsexport_{from_dt.isoformat()}_bis_{to_dt.isoformat()}.pdf"
     return send_file(
         pdf_buffer,
@@ -722,13 +589,58 @@ def guest_cards():
     Admin-View: Liste aller Gäste zum Auswählen für die Gästekarten-Erstellung.
     """
     guests = Guest.query.order_by(Guest.lastname.asc(), Guest.firstname.asc()).all()
+    email_job = db.session.get(EmailJob, request.args.get("email_job", type=int) or 0)
+    print_job = db.session.get(CardPrintJob, request.args.get("print_job", type=int) or 0)
     return (render_template(
         "admin/print_guest_cards.html",
         guests=guests,
+        email_job=email_job,
+        print_job=print_job,
         title="Gästekarten erstellen"
     ))
 
 
+@admin_bp.route("/email_jobs/<int:job_id>", methods=["GET"])
+@login_required
+@roles_required("admin")
+def email_job_status(job_id):
+    """Progress of a bulk email job as JSON, polled by the guest card page."""
+    job = db.session.get(EmailJob, job_id)
+    if job is None:
+        return jsonify({"error": "Unbekannter E-Mail-Job."}), 404
+    return jsonify(job_progress(job))
+
+
+@admin_bp.route("/card_print_jobs/<int:job_id>", methods=["GET"])
+@login_required
+@roles_required("admin")
+def card_print_job_status(job_id):
+    """Status of a guest card print job as JSON, polled by the guest card page."""
+    job = db.session.get(CardPrintJob, job_id)
+    if job is None:
+        return jsonify({"error": "Unbekannter Druckauftrag."}), 404
+    progress = card_print_job_progress(job)
+    if job.status == "done":
+        progress["download_url"] = url_for("admin.download_card_print_job", job_id=job.id)
+    return jsonify(progress)
+
+
+@admin_bp.route("/card_print_jobs/<int:job_id>/download", methods=["GET"])
+@login_required
+@roles_required("admin")
+def download_card_print_job(job_id):
+    job = db.session.get(CardPrintJob, job_id)
+    if job is None or job.status != "done" or not job.file_path or not os.path.exists(job.file_path):
+        flash("Die Gästekarten-PDF ist nicht mehr verfügbar, bitte erneut erstellen.", "warning")
+        return redirect(url_for("admin.guest_cards"))
+    return send_file(
+        job.file_path,
+        as_attachment=True,
+        download_name=f"Karten-{job.finished_on:%Y-%m-%d %H-%M-%S}.pdf",
+        mimetype="application/pdf",
+    )
+
+
 
 
 @admin_bp.route("/print_guest_cards", methods=["GET", "POST"])
@@ -748,44 +660,34 @@ def print_guest_cards():
         if email_status.get("value") != "Aktiv":
             flash("E-Mail Versand ist deaktiviert.", "warning")
             return redirect(url_for("admin.guest_cards"))
-        sent = 0
-        skipped = []
-        failed = []
-        for gid in guest_ids:
-            guest = Guest.query.get(gid)
-            if not guest:
-                continue
-            ok, msg = send_guest_card_email(guest, current_app.config.get("SETTINGS", {}))
-            if ok:
-                guest.guest_card_emailed_on = datetime.today()
-                sent += 1
-            else:
-                reason = f"{guest.firstname} {guest.lastname}: {msg}"
-                if "Keine E-Mail" in msg:
-                    skipped.append(reason)
-                else:
-                    failed.append(reason)
-        db.session.commit()
-        flash(f"{sent} E-Mails versendet.", "success" if sent else "warning")
+        job = create_guest_card_job(guest_ids, created_by_id=current_user.id)
+        current_app.email_jobs.submit(job.id)
+        db.session.refresh(job)
+        if job.status not in ("done", "failed"):
+            flash(f"E-Mail-Versand an {job.total} Gäste gestartet.", "info")
+            return redirect(url_for("admin.guest_cards", email_job=job.id))
+        flash(f"{job.sent} E-Mails versendet.", "success" if job.sent else "warning")
+        skipped = [item.message for item in job.items if item.status == "skipped"]
+        failed = [item.message for item in job.items if item.status == "failed"]
         if skipped:
-            flash("Ohne E-Mail-Adresse: " + "; ".join(skipped), "info")
+            flash("Nicht versendet: " + "; ".join(skipped), "info")
         if failed:
             flash("Versand fehlgeschlagen: " + "; ".join(failed), "danger")
         return redirect(url_for("admin.guest_cards"))
 
-    # Default: Print PDF
-    if request.form.get("backside"):
-        flip_backside = request.form.get("flip_backside") in ("1", "on", "true", "True")
-        pdf_bytes = generate_multiple_gast_cards_pdf(guest_ids, double_sided=True, flip_backside=flip_backside)
-    else:
-        pdf_bytes = generate_multiple_gast_cards_pdf(guest_ids)
-    Guest.query \
-        .filter(Guest.id.in_(guest_ids)) \
-        .update({"guest_card_printed_on": datetime.today()}, synchronize_session=False)
-    db.session.commit()
-    return send_file(
-        pdf_bytes,
-        as_attachment=True,
-        download_name=f"Karten-{datetime.today()}.pdf",
-        mimetype="application/pdf",
+    # Default: Print PDF, rendered by a background print job
+    job = create_card_print_job(
+        guest_ids,
+        double_sided=bool(request.form.get("backside")),
+        flip_backside=request.form.get("flip_backside") in ("1", "on", "true", "True"),
+        created_by_id=current_user.id,
     )
+    current_app.card_print_jobs.submit(job.id)
+    db.session.refresh(job)
+    if job.status == "done":
+        return redirect(url_for("admin.download_card_print_job", job_id=job.id))
+    if job.status == "failed":
+        flash(f"Gästekarten konnten nicht erstellt werden: {job.error}", "danger")
+        return redirect(url_for("admin.guest_cards"))
+    flash(f"Gästekarten für {job.total} Gäste werden erstellt.", "info")
+    return redirect(url_for("admin.guest_cards", print_job=job.id))
@@ -1,12 +1,15 @@
+import json
 import os
 from collections import Counter
-from datetime import date, datetime
+from datetime import date, datetime, time
 
 import pandas as pd
 from openpyxl import load_workbook
 from typing import Optional
 from flask import (
     Blueprint,
+    Response,
+    current_app,
     render_template,
     request,
     redirect,
@@ -15,10 +18,22 @@ from flask import (
 )
 from flask_login import login_required
 from werkzeug.utils import secure_filename
-from sqlalchemy import tuple_
-
-from ...helpers import generate_unique_code, roles_required
-from ...models import Animal, Guest, Representative, db
+from sqlalchemy import insert, tuple_
+
+from ...dashboard_stats import mark_dashboard_changed
+from ...exports import (
+    EXPORT_CHUNK_ROWS,
+    EXPORT_FORMATS,
+    EXPORT_SPOOL_MAX_BYTES,
+    build_export_table,
+    iter_spool_chunks,
+    new_export_spool,
+    parquet_available,
+)
+from ...guest_numbers import allocate_guest_numbers, current_guest_number_pattern, reserve_guest_numbers
+from ...helpers import generate_unique_codes, roles_required
+from ...models import Animal, Guest, Message, Payment, Representative, db
+from ...search_index import mark_guests_inserted
 
 admin_io_bp = Blueprint('admin_io', __name__, url_prefix='/admin')
 
@@ -85,6 +100,18 @@ DATE_FIELDS_ANIMALS = [
 ]
 STRING_FIELDS_ANIMALS = list(ANIMAL_DTYPES.keys())
 
+GUEST_COLUMNS = list(GUEST_DTYPES.keys()) + [c for c in DATE_FIELDS_GUESTS if c not in GUEST_DTYPES]
+ANIMAL_COLUMNS = list(ANIMAL_DTYPES.keys()) + [c for c in DATE_FIELDS_ANIMALS if c not in ANIMAL_DTYPES]
+
+# Sheets read from an import file: columns, date fields and string fields per sheet
+IMPORT_SHEETS = {
+    "gaeste": (GUEST_COLUMNS, DATE_FIELDS_GUESTS, STRING_FIELDS_GUESTS),
+    "tiere": (ANIMAL_COLUMNS, DATE_FIELDS_ANIMALS, STRING_FIELDS_ANIMALS),
+}
+PARSED_IMPORT_VERSION = 2
+# Rows per executemany INSERT when confirming an import
+IMPORT_INSERT_BATCH_SIZE = 1000
+
 TRUE_VALUES = {"1", "ja", "true", "wahr", "y", "yes", "aktiv", "active", "x"}
 FALSE_VALUES = {"0", "nein", "false", "falsch", "n", "no", "inaktiv", "inactive"}
 
@@ -224,6 +251,87 @@ def _iter_excel_records(
         wb.close()
 
 
+def _parsed_import_path(safe_path: str) -> str:
+    return f"{safe_path}.parsed.json"
+
+
+def _json_value(val):
+    """Dates and times left in non-date columns are stored as ISO strings."""
+    if isinstance(val, (date, datetime, time)):
+        return val.isoformat()
+    raise TypeError(f"{type(val).__name__} is not JSON serializable")
+
+
+def _import_source_signature(safe_path: str):
+    stat = os.stat(safe_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _parse_import_file(safe_path: str) -> dict:
+    """
+    Parse both import sheets once and store them next to the upload as normalized columns in JSON.
+    Preview and confirm read this file instead of scanning the workbook again.
+    """
+    sheets = {}
+    for sheet_name, (columns, date_fields, string_fields) in IMPORT_SHEETS.items():
+        data = {column: [] for column in columns}
+        rownums = []
+        for record in _iter_excel_records(
+            safe_path,
+            sheet_name=sheet_name,
+            expected_columns=columns,
+            date_fields=date_fields,
+            string_fields=string_fields,
+        ):
+            for column in columns:
+                data[column].append(record[column])
+            rownums.append(record["_rownum"])
+        sheets[sheet_name] = {"columns": columns, "data": data, "rownums": rownums}
+
+    parsed = {
+        "version": PARSED_IMPORT_VERSION,
+        "source": _import_source_signature(safe_path),
+        "sheets": sheets,
+    }
+    spill_path = _parsed_import_path(safe_path)
+    with open(f"{spill_path}.part", "w", encoding="utf-8") as fh:
+        json.dump(parsed, fh, default=_json_value)
+    os.replace(f"{spill_path}.part", spill_path)
+    return parsed
+
+
+def _load_parsed_import(safe_path: str) -> dict:
+    """Return the parsed import for an upload, parsing the workbook again only if it changed."""
+    try:
+        with open(_parsed_import_path(safe_path), "r", encoding="utf-8") as fh:
+            parsed = json.load(fh)
+        if (
+            parsed.get("version") == PARSED_IMPORT_VERSION
+            and tuple(parsed.get("source") or ()) == _import_source_signature(safe_path)
+        ):
+            for sheet_name, (_columns, date_fields, _string_fields) in IMPORT_SHEETS.items():
+                date_fields_set = {field.lower() for field in date_fields}
+                data = parsed["sheets"][sheet_name]["data"]
+                for column in data:
+                    if column.lower() in date_fields_set:
+                        data[column] = [date.fromisoformat(val) if val else None for val in data[column]]
+            return parsed
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return _parse_import_file(safe_path)
+
+
+def _iter_parsed_records(parsed: dict, sheet_name: str):
+    """Yield the rows of a parsed sheet as dicts, shaped like `_iter_excel_records`."""
+    sheet = parsed["sheets"][sheet_name]
+    columns = sheet["columns"]
+    data = sheet["data"]
+    for index, rownum in enumerate(sheet["rownums"]):
+        record = {column: data[column][index] for column in columns}
+        record["_rownum"] = rownum
+        yield record
+
+
 def _parse_bool(val, default=None):
     if val is None or (isinstance(val, float) and pd.isna(val)):
         return default
@@ -312,6 +420,11 @@ def import_data():
         filepath = os.path.join("tmp", secure_filename(file.filename))
         os.makedirs("tmp", exist_ok=True)
         file.save(filepath)
+        try:
+            _parse_import_file(filepath)
+        except Exception as exc:
+            flash(f"Fehler beim Einlesen der Datei: {exc}", "danger")
+            return redirect(request.url)
 
         return redirect(url_for("admin_io.preview_import", filepath=filepath))
 
@@ -336,32 +449,24 @@ def confirm_import():
     skipped_guest_samples = []
     skipped_animal_samples = []
 
-    BATCH_SIZE = 250
-    batch_counter = 0
-
-    # Pre-scan guest sheet to enforce uniqueness constraints before importing anything.
-    guest_numbers_counter = Counter()
-    name_pairs = set()
     try:
-        for guest in _iter_excel_records(
-            safe_path,
-            sheet_name="gaeste",
-            expected_columns=list(GUEST_DTYPES.keys()) + [c for c in DATE_FIELDS_GUESTS if c not in GUEST_DTYPES],
-            date_fields=DATE_FIELDS_GUESTS,
-            string_fields=STRING_FIELDS_GUESTS,
-            limit=None,
-        ):
-            number = guest.get("nummer")
-            firstname = guest.get("vorname")
-            lastname = guest.get("nachname")
-            if number:
-                guest_numbers_counter[str(number)] += 1
-            if firstname and lastname:
-                name_pairs.add((firstname, lastname))
+        parsed = _load_parsed_import(safe_path)
     except Exception as exc:
         flash(f"Fehler beim Einlesen der Datei: {exc}", "danger")
         return redirect(url_for("admin_io.import_data"))
 
+    # Pre-scan guest columns to enforce uniqueness constraints before importing anything.
+    guest_columns = parsed["sheets"]["gaeste"]["data"]
+    guest_numbers_counter = Counter()
+    name_pairs = set()
+    for number, firstname, lastname in zip(
+        guest_columns["nummer"], guest_columns["vorname"], guest_columns["nachname"]
+    ):
+        if number:
+            guest_numbers_counter[str(number)] += 1
+        if firstname and lastname:
+            name_pairs.add((firstname, lastname))
+
     duplicate_numbers = [n for n, c in guest_numbers_counter.items() if c > 1]
     if duplicate_numbers:
         flash(
@@ -406,91 +511,87 @@ def confirm_import():
 
     try:
         # Guests (and representatives)
+        importable_guests = []
         seen_numbers_in_import = set()
-        for guest in _iter_excel_records(
-            safe_path,
-            sheet_name="gaeste",
-            expected_columns=list(GUEST_DTYPES.keys()) + [c for c in DATE_FIELDS_GUESTS if c not in GUEST_DTYPES],
-            date_fields=DATE_FIELDS_GUESTS,
-            string_fields=STRING_FIELDS_GUESTS,
-            limit=None,
-        ):
+        for guest in _iter_parsed_records(parsed, "gaeste"):
             number = guest.get("nummer")
             firstname = guest.get("vorname")
             lastname = guest.get("nachname")
-            if not number or not firstname or not lastname:
+            if not firstname or not lastname:
                 skipped_guests += 1
                 if len(skipped_guest_samples) < 20:
                     skipped_guest_samples.append(number or "(ohne Nummer)")
                 continue
-            number_str = str(number)
-            if number_str in seen_numbers_in_import:
+            number_str = str(number) if number else None
+            label = number_str or f"{firstname} {lastname}"
+            if number_str and number_str in seen_numbers_in_import:
                 skipped_guests += 1
                 if len(skipped_guest_samples) < 20:
                     skipped_guest_samples.append(f"{number_str} (doppelt)")
                 continue
-            seen_numbers_in_import.add(number_str)
+            if number_str:
+                seen_numbers_in_import.add(number_str)
             if (firstname, lastname) in existing_name_pairs:
                 skipped_guests += 1
                 if len(skipped_guest_samples) < 20:
-                    skipped_guest_samples.append(f"{number_str} ({firstname} {lastname} existiert)")
+                    skipped_guest_samples.append(f"{label} ({firstname} {lastname} existiert)")
                 continue
+            importable_guests.append(guest)
+
+        # Guests without a number continue the configured number sequence after the numbers in the file.
+        number_pattern = current_guest_number_pattern()
+        reserve_guest_numbers(seen_numbers_in_import, number_pattern)
+        new_numbers = iter(
+            allocate_guest_numbers(sum(1 for guest in importable_guests if not guest.get("nummer")), number_pattern)
+        )
 
-            guest_id = generate_unique_code()
+        guest_rows = []
+        representative_rows = []
+        for guest, guest_id in zip(importable_guests, generate_unique_codes(len(importable_guests))):
+            number_str = str(guest["nummer"]) if guest.get("nummer") else next(new_numbers)
             guest_map[number_str] = guest_id
-            db.session.add(
-                Guest(
-                    id=guest_id,
-                    number=number_str,
-                    firstname=firstname,
-                    lastname=lastname,
-                    address=guest.get("adresse"),
-                    city=guest.get("ort"),
-                    zip=guest.get("plz"),
-                    phone=guest.get("festnetz"),
-                    mobile=guest.get("mobil"),
-                    email=guest.get("email"),
-                    birthdate=guest.get("geburtsdatum"),
-                    gender=_map_gender(guest.get("geschlecht")),
-                    member_since=guest.get("eintritt") or today,
-                    member_until=guest.get("austritt"),
-                    status=_parse_bool(guest.get("status"), default=True),
-                    indigence=guest.get("beduerftigkeit"),
-                    indigent_until=guest.get("beduerftig_bis"),
-                    documents=guest.get("dokumente"),
-                    notes=guest.get("notizen"),
-                    created_on=guest.get("erstellt_am") or today,
-                    updated_on=guest.get("aktualisiert_am") or today,
-                )
+            guest_rows.append(
+                {
+                    "id": guest_id,
+                    "number": number_str,
+                    "firstname": guest["vorname"],
+                    "lastname": guest["nachname"],
+                    "address": guest.get("adresse"),
+                    "city": guest.get("ort"),
+                    "zip": guest.get("plz"),
+                    "phone": guest.get("festnetz"),
+                    "mobile": guest.get("mobil"),
+                    "email": guest.get("email"),
+                    "birthdate": guest.get("geburtsdatum"),
+                    "gender": _map_gender(guest.get("geschlecht")),
+                    "member_since": guest.get("eintritt") or today,
+                    "member_until": guest.get("austritt"),
+                    "status": _parse_bool(guest.get("status"), default=True),
+                    "indigence": guest.get("beduerftigkeit"),
+                    "indigent_until": guest.get("beduerftig_bis"),
+                    "documents": guest.get("dokumente"),
+                    "notes": guest.get("notizen"),
+                    "created_on": guest.get("erstellt_am") or today,
+                    "updated_on": guest.get("aktualisiert_am") or today,
+                }
             )
             if any(
                 guest.get(key)
                 for key in ("vertreter_name", "vertreter_telefon", "vertreter_email", "vertreter_adresse")
             ):
-                db.session.add(
-                    Representative(
-                        guest_id=guest_id,
-                        name=guest.get("vertreter_name"),
-                        phone=guest.get("vertreter_telefon"),
-                        email=guest.get("vertreter_email"),
-                        address=guest.get("vertreter_adresse"),
-                    )
+                representative_rows.append(
+                    {
+                        "guest_id": guest_id,
+                        "name": guest.get("vertreter_name"),
+                        "phone": guest.get("vertreter_telefon"),
+                        "email": guest.get("vertreter_email"),
+                        "address": guest.get("vertreter_adresse"),
+                    }
                 )
 
-            batch_counter += 1
-            if batch_counter % BATCH_SIZE == 0:
-                db.session.flush()
-                db.session.expunge_all()
-
         # Animals
-        for animal in _iter_excel_records(
-            safe_path,
-            sheet_name="tiere",
-            expected_columns=list(ANIMAL_DTYPES.keys()) + [c for c in DATE_FIELDS_ANIMALS if c not in ANIMAL_DTYPES],
-            date_fields=DATE_FIELDS_ANIMALS,
-            string_fields=STRING_FIELDS_ANIMALS,
-            limit=None,
-        ):
+        animal_rows = []
+        for animal in _iter_parsed_records(parsed, "tiere"):
             guest_id = guest_map.get(str(animal.get("gast_nummer") or ""))
             if not guest_id:
                 skipped_animals += 1
@@ -498,37 +599,40 @@ def confirm_import():
                     skipped_animal_samples.append(animal.get("name") or "(Tier ohne Name)")
                 continue
 
-            db.session.add(
-                Animal(
-                    guest_id=guest_id,
-                    species=_map_species(animal.get("art")),
-                    breed=animal.get("rasse"),
-                    name=animal.get("name"),
-                    sex=_map_animal_sex(animal.get("geschlecht")),
-                    color=animal.get("farbe"),
-                    castrated=_map_yes_no_unknown(animal.get("kastriert")),
-                    identification=animal.get("identifikation"),
-                    birthdate=animal.get("geburtsdatum"),
-                    weight_or_size=animal.get("gewicht_oder_groesse"),
-                    illnesses=animal.get("krankheiten"),
-                    allergies=animal.get("unvertraeglichkeiten"),
-                    food_type=_map_food_type(animal.get("futter")),
-                    complete_care=_map_yes_no_unknown(animal.get("vollversorgung")),
-                    last_seen=animal.get("zuletzt_gesehen"),
-                    veterinarian=animal.get("tierarzt"),
-                    food_amount_note=animal.get("futtermengeneintrag"),
-                    note=animal.get("notizen"),
-                    status=_parse_bool(animal.get("active"), default=True),
-                    tax_until=animal.get("steuerbescheid_bis"),
-                    created_on=animal.get("erstellt_am") or today,
-                    updated_on=animal.get("aktualisiert_am") or today,
-                )
+            animal_rows.append(
+                {
+                    "guest_id": guest_id,
+                    "species": _map_species(animal.get("art")),
+                    "breed": animal.get("rasse"),
+                    "name": animal.get("name"),
+                    "sex": _map_animal_sex(animal.get("geschlecht")),
+                    "color": animal.get("farbe"),
+                    "castrated": _map_yes_no_unknown(animal.get("kastriert")),
+                    "identification": animal.get("identifikation"),
+                    "birthdate": animal.get("geburtsdatum"),
+                    "weight_or_size": animal.get("gewicht_oder_groesse"),
+                    "illnesses": animal.get("krankheiten"),
+                    "allergies": animal.get("unvertraeglichkeiten"),
+                    "food_type": _map_food_type(animal.get("futter")),
+                    "complete_care": _map_yes_no_unknown(animal.get("vollversorgung")),
+                    "last_seen": animal.get("zuletzt_gesehen"),
+                    "veterinarian": animal.get("tierarzt"),
+                    "food_amount_note": animal.get("futtermengeneintrag"),
+                    "note": animal.get("notizen"),
+                    "status": _parse_bool(animal.get("active"), default=True),
+                    "tax_until": animal.get("steuerbescheid_bis"),
+                    "created_on": animal.get("erstellt_am") or today,
+                    "updated_on": animal.get("aktualisiert_am") or today,
+                }
             )
-            batch_counter += 1
-            if batch_counter % BATCH_SIZE == 0:
-                db.session.flush()
-                db.session.expunge_all()
 
+        # Bulk inserts skip the mapper and flush hooks, so the caches are stamped explicitly.
+        for model, rows in ((Guest, guest_rows), (Representative, representative_rows), (Animal, animal_rows)):
+            for i in range(0, len(rows), IMPORT_INSERT_BATCH_SIZE):
+                db.session.execute(insert(model), rows[i:i + IMPORT_INSERT_BATCH_SIZE])
+        if guest_rows:
+            mark_guests_inserted(row["id"] for row in guest_rows)
+            mark_dashboard_changed(Guest, Representative, Animal)
         db.session.commit()
     except Exception as exc:
         db.session.rollback()
@@ -581,34 +685,22 @@ def preview_import():
 
     guest_numbers_counter = Counter()
     guest_numbers_set = set()
+    guests_without_number = 0
 
     try:
-        for guest in _iter_excel_records(
-            safe_path,
-            sheet_name="gaeste",
-            expected_columns=list(GUEST_DTYPES.keys()) + [c for c in DATE_FIELDS_GUESTS if c not in GUEST_DTYPES],
-            date_fields=DATE_FIELDS_GUESTS,
-            string_fields=STRING_FIELDS_GUESTS,
-            limit=None,
-        ):
+        parsed = _load_parsed_import(safe_path)
+        for guest in _iter_parsed_records(parsed, "gaeste"):
             guest_count += 1
             nummer = guest.get("nummer")
             if nummer:
                 guest_numbers_counter[str(nummer)] += 1
                 guest_numbers_set.add(str(nummer))
+            else:
+                guests_without_number += 1
             if len(guest_preview) < PREVIEW_LIMIT:
                 guest_preview.append(guest)
 
-        for idx, row in enumerate(
-            _iter_excel_records(
-                safe_path,
-                sheet_name="tiere",
-                expected_columns=list(ANIMAL_DTYPES.keys()) + [c for c in DATE_FIELDS_ANIMALS if c not in ANIMAL_DTYPES],
-                date_fields=DATE_FIELDS_ANIMALS,
-                string_fields=STRING_FIELDS_ANIMALS,
-                limit=None,
-            )
-        ):
+        for idx, row in enumerate(_iter_parsed_records(parsed, "tiere")):
             animal_count += 1
             guest_number = row.get("gast_nummer")
             rownum = row.get("_rownum") or (idx + 2)
@@ -668,6 +760,13 @@ def preview_import():
             "warning",
         )
 
+    if guests_without_number:
+        flash(
+            f"{guests_without_number} Gäste ohne Gastnummer erhalten beim Import eine neue Nummer "
+            "im eingestellten Format.",
+            "info",
+        )
+
     if missing_guest_number:
         flash(
             f"Einige Tiere haben keine gültige Gastnummer (z. B. Zeilen: {', '.join(map(str, missing_guest_number))}"
@@ -696,169 +795,161 @@ def preview_import():
     )
 
 
+# Map from UI field keys -> ORM attribute names (identity mapping, English names)
+FIELD_MAP = {
+    "guests": {
+        "address": "address",
+        "birthdate": "birthdate",
+        "city": "city",
+        "created_on": "created_on",
+        "documents": "documents",
+        "email": "email",
+        "firstname": "firstname",
+        "gender": "gender",
+        "guest_card_printed_on": "guest_card_printed_on",
+        "guest_card_emailed_on": "guest_card_emailed_on",
+        "id": "id",
+        "indigence": "indigence",
+        "indigent_until": "indigent_until",
+        "lastname": "lastname",
+        "member_since": "member_since",
+        "member_until": "member_until",
+        "mobile": "mobile",
+        "notes": "notes",
+        "number": "number",
+        "phone": "phone",
+        "status": "status",
+        "updated_on": "updated_on",
+        "zip": "zip",
+    },
+    "animals": {
+        "allergies": "allergies",
+        "birthdate": "birthdate",
+        "breed": "breed",
+        "castrated": "castrated",
+        "color": "color",
+        "complete_care": "complete_care",
+        "created_on": "created_on",
+        "died_on": "died_on",
+        "food_amount_note": "food_amount_note",
+        "food_type": "food_type",
+        "guest_id": "guest_id",
+        "id": "id",
+        "identification": "identification",
+        "illnesses": "illnesses",
+        "last_seen": "last_seen",
+        "name": "name",
+        "note": "note",
+        "pet_registry": "pet_registry",
+        "sex": "sex",
+        "species": "species",
+        "status": "status",
+        "tax_until": "tax_until",
+        "updated_on": "updated_on",
+        "veterinarian": "veterinarian",
+        "weight_or_size": "weight_or_size",
+    },
+    "payments": {
+        "comment": "comment",
+        "created_on": "created_on",
+        "food_amount": "food_amount",
+        "guest_id": "guest_id",
+        "id": "id",
+        "other_amount": "other_amount",
+        "paid": "paid",
+        "paid_on": "paid_on",
+    },
+    "messages": {
+        "completed": "completed",
+        "content": "content",
+        "created_by": "created_by",
+        "created_on": "created_on",
+        "guest_id": "guest_id",
+        "id": "id",
+    },
+    "representatives": {
+        "address": "address",
+        "email": "email",
+        "guest_id": "guest_id",
+        "id": "id",
+        "name": "name",
+        "phone": "phone",
+    },
+}
+# Exported tables and their sheet names, in sheet order
+TABLE_MODEL = {
+    "guests": (Guest, "guests"),
+    "animals": (Animal, "animals"),
+    "payments": (Payment, "payments"),
+    "messages": (Message, "messages"),
+    "representatives": (Representative, "representatives"),
+}
+
+
+def _render_export_form():
+    return render_template(
+        "admin/export.html",
+        title="Daten exportieren",
+        parquet_available=parquet_available(),
+    )
+
+
 @admin_io_bp.route("/export", methods=["GET", "POST"])
 @roles_required("admin")
 @login_required
 def export_data():
-    """Render export UI (GET) or generate an Excel export (POST) using SQLAlchemy.
-    - Each selected table is exported to its own sheet.
+    """Render export UI (GET) or generate an export file (POST) using SQLAlchemy.
+    - `format` selects an Excel workbook (default), a zip of CSV files or a zip of Parquet files.
+    - Each selected table is exported to its own sheet or file.
     - Selected columns are respected; unknown columns are ignored safely.
-    - Uses ORM models and `load_only` for efficient column selection.
+    - Rows are streamed column-only into the output, spooled to disk for large exports.
     """
-    from flask import send_file
-    from io import BytesIO
-    from sqlalchemy.orm import load_only
-    from datetime import date
-    from ...models import Guest, Animal, Payment, Message, Representative, db
-
     if request.method == "GET":
-        return render_template("admin/export.html", title="Daten exportieren")
+        return _render_export_form()
 
     # POST: collect selection from the form
     include_header = request.form.get("include_header") is not None
-    selections = {
-        "guests": request.form.getlist("fields[guests][]"),
-        "animals": request.form.getlist("fields[animals][]"),
-        "payments": request.form.getlist("fields[payments][]"),
-        "messages": request.form.getlist("fields[messages][]"),
-        "representatives": request.form.getlist("fields[representatives][]"),
-    }
+    export_format = request.form.get("format", "xlsx")
+    if export_format not in EXPORT_FORMATS:
+        flash("Unbekanntes Exportformat.", "warning")
+        return _render_export_form()
+    if export_format == "parquet" and not parquet_available():
+        flash("Parquet-Export ist nicht verfügbar, da pyarrow nicht installiert ist.", "warning")
+        return _render_export_form()
+    selections = {key: request.form.getlist(f"fields[{key}][]") for key in TABLE_MODEL}
     if not any(selections.values()):
         flash("Bitte wähle mindestens eine Spalte aus.", "warning")
-        return render_template("admin/export.html", title="Daten exportieren")
-    # Map from UI field keys -> ORM attribute names (identity mapping, English names)
-    FIELD_MAP = {
-        "guests": {
-            "address": "address",
-            "birthdate": "birthdate",
-            "city": "city",
-            "created_on": "created_on",
-            "documents": "documents",
-            "email": "email",
-            "firstname": "firstname",
-            "gender": "gender",
-            "guest_card_printed_on": "guest_card_printed_on",
-            "guest_card_emailed_on": "guest_card_emailed_on",
-            "id": "id",
-            "indigence": "indigence",
-            "indigent_until": "indigent_until",
-            "lastname": "lastname",
-            "member_since": "member_since",
-            "member_until": "member_until",
-            "mobile": "mobile",
-            "notes": "notes",
-            "number": "number",
-            "phone": "phone",
-            "status": "status",
-            "updated_on": "updated_on",
-            "zip": "zip",
-        },
-        "animals": {
-            "allergies": "allergies",
-            "birthdate": "birthdate",
-            "breed": "breed",
-            "castrated": "castrated",
-            "color": "color",
-            "complete_care": "complete_care",
-            "created_on": "created_on",
-            "died_on": "died_on",
-            "food_amount_note": "food_amount_note",
-            "food_type": "food_type",
-            "guest_id": "guest_id",
-            "id": "id",
-            "identification": "identification",
-            "illnesses": "illnesses",
-            "last_seen": "last_seen",
-            "name": "name",
-            "note": "note",
-            "pet_registry": "pet_registry",
-            "sex": "sex",
-            "species": "species",
-            "status": "status",
-            "tax_until": "tax_until",
-            "updated_on": "updated_on",
-            "veterinarian": "veterinarian",
-            "weight_or_size": "weight_or_size",
-        },
-        "payments": {
-            "comment": "comment",
-            "created_on": "created_on",
-            "food_amount": "food_amount",
-            "guest_id": "guest_id",
-            "id": "id",
-            "other_amount": "other_amount",
-            "paid": "paid",
-            "paid_on": "paid_on",
-        },
-        "messages": {
-            "completed": "completed",
-            "content": "content",
-            "created_by": "created_by",
-            "created_on": "created_on",
-            "guest_id": "guest_id",
-            "id": "id",
-        },
-        "representatives": {
-            "address": "address",
-            "email": "email",
-            "guest_id": "guest_id",
-            "id": "id",
-            "name": "name",
-            "phone": "phone",
-        },
-    }
-    TABLE_MODEL = {
-        "guests": (Guest, "guests"),
-        "animals": (Animal, "animals"),
-        "payments": (Payment, "payments"),
-        "messages": (Message, "messages"),
-        "representatives": (Representative, "representatives"),
-    }
-
-    # Helper: build DataFrame from ORM query
-    def rows_to_df(model, cols_ui, table_key):
-        if model is None or not cols_ui:
-            return None
-        ui_to_attr = FIELD_MAP.get(table_key, {})
-        attr_names = [ui_to_attr.get(c) for c in cols_ui]
-        attr_names = [a for a in attr_names if a and hasattr(model, a)]
-        if not attr_names:
-            return None
-        load_columns = [getattr(model, a) for a in attr_names]
-        q = db.session.query(model).options(load_only(*load_columns))
-        results = q.all()
-        rows = []
-        for obj in results:
-            row = []
-            for ui_col in cols_ui:
-                attr = ui_to_attr.get(ui_col)
-                val = getattr(obj, attr, None) if attr and hasattr(obj, attr) else None
-                if hasattr(val, "isoformat"):
-                    try:
-                        val = val.isoformat()
-                    except Exception:
-                        pass
-                row.append(val)
-            rows.append(row)
-        headers = cols_ui if include_header else None
-        df = pd.DataFrame(rows, columns=headers if headers else None)
-        return df
-
-    # Build the Excel in-memory
-    output = BytesIO()
-    any_sheet = False
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        for key, (model, sheet_name) in TABLE_MODEL.items():
-            cols = selections.get(key) or []
-            df = rows_to_df(model, cols, key)
-            if df is None:
-                continue
-            df.to_excel(writer, sheet_name=sheet_name, index=False, header=include_header)
-            any_sheet = True
-    if not any_sheet:
+        return _render_export_form()
+
+    tables = []
+    for key, (model, sheet_name) in TABLE_MODEL.items():
+        table = build_export_table(sheet_name, model, selections.get(key) or [], FIELD_MAP.get(key, {}))
+        if table is not None:
+            tables.append(table)
+    if not tables:
         flash("Bitte wähle mindestens eine Spalte aus.", "warning")
-        return render_template("admin/export.html", title="Daten exportieren")
+        return _render_export_form()
 
-    output.seek(0)
-    filename = f"pfotenregister_export_{date.today().isoformat()}.xlsx"
-    return send_file(output, download_name=filename, as_attachment=True)
+    writer = EXPORT_FORMATS[export_format]
+    spool = new_export_spool(current_app.config.get("EXPORT_SPOOL_MAX_BYTES", EXPORT_SPOOL_MAX_BYTES))
+    try:
+        writer.write(
+            tables,
+            include_header,
+            spool,
+            chunk_size=current_app.config.get("EXPORT_CHUNK_ROWS", EXPORT_CHUNK_ROWS),
+        )
+        size = spool.tell()
+    except Exception:
+        spool.close()
+        raise
+
+    filename = f"pfotenregister_export_{date.today().isoformat()}{writer.suffix}"
+    return Response(
+        iter_spool_chunks(spool),
+        mimetype=writer.mimetype,
+        headers={
+            "Content-Length": str(size),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
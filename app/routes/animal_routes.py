@@ -13,7 +13,8 @@ from ..helpers import (
     get_guest_list_sort_args,
     guest_list_sort_order,
 )
-from ..models import db, Guest, Animal, FieldRegistry, FoodTag
+from ..field_registry_cache import registry_fields
+from ..models import db, Guest, Animal, FoodTag
 
 animal_bp = Blueprint("animal", __name__, url_prefix="/animals")
 
@@ -93,13 +94,7 @@ ANIMAL_EDIT_SECTION_LAYOUT = [
 
 def _get_animal_registry_fields():
     """Return visible animal registry fields in display order."""
-    fields = (
-        FieldRegistry.query
-        .filter(FieldRegistry.model_name == "Animal")
-        .filter(FieldRegistry.globally_visible == True)
-        .order_by(FieldRegistry.display_order.asc(), FieldRegistry.field_name.asc())
-        .all()
-    )
+    fields = registry_fields("Animal", visible_only=True)
     visible_fields = []
     for field in fields:
         can_view = user_has_access(field.visibility_level)
@@ -334,12 +329,7 @@ def update_animal(animal_id):
         flash("Tier nicht gefunden.", "danger")
         return redirect(url_for("guest.view_guest", guest_id=guest_id))
 
-    fields = (
-        FieldRegistry.query
-        .filter(FieldRegistry.model_name == "Animal")
-        .filter(FieldRegistry.globally_visible == True)
-        .all()
-    )
+    fields = registry_fields("Animal", visible_only=True)
 
     changes = []
 
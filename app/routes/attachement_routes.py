@@ -1,14 +1,22 @@
 from datetime import datetime
-from io import BytesIO
+from urllib.parse import quote
 
 from flask import (
-    Blueprint, request, redirect, flash, render_template, current_app, send_file, url_for
+    Blueprint, request, redirect, flash, render_template, current_app, url_for, jsonify, Response, abort
 )
-from flask_login import login_required
-from google.api_core.exceptions import NotFound
+from flask_login import login_required, current_user
 
-from ..helpers import upload_file, delete_blob, get_form_value, get_guest_list_sort_args, guest_list_sort_order
-from ..models import Attachment, Guest, MedicalEventAttachment, db, Animal
+from ..attachment_uploads import (
+    UploadError, request_finalize, signed_part_urls, start_upload, store_part, sync_stored_parts, upload_progress
+)
+from ..helpers import (
+    upload_file, delete_blob, generate_download_url, get_form_value, get_guest_list_sort_args, guest_list_sort_order
+)
+from ..thumbnails import (
+    THUMBNAIL_FORMATS, THUMBNAIL_SIZES, ThumbnailError, ensure_thumbnail, is_image_filename, thumbnail_etag,
+    thumbnail_paths
+)
+from ..models import Attachment, AttachmentUpload, Guest, MedicalEventAttachment, db, Animal
 
 att_bp = Blueprint("attachment", __name__, url_prefix="/attachment")
 
@@ -39,22 +47,176 @@ def upload_attachment(owner_id):
     return redirect(request.referrer)
 
 
+def _direct_uploads() -> bool:
+    return current_app.config.get("ATTACHMENT_UPLOAD_MODE", "direct") == "direct"
+
+
+def _upload_state(upload):
+    """
+    Progress of an upload; in direct mode with signed URLs (``part_urls``) for the missing parts,
+    so only starting, polling and completing the upload go through a request thread.
+    """
+    progress = upload_progress(upload)
+    part_urls = {}
+    if _direct_uploads() and upload.status in ("open", "failed"):
+        part_urls = signed_part_urls(
+            current_app.storage,
+            upload,
+            progress["missing_parts"],
+            current_app.config.get("ATTACHMENT_UPLOAD_URL_MINUTES", 60),
+        )
+    progress["part_urls"] = part_urls
+    # Parts sent through the app occupy a request thread each, so they go one at a time.
+    progress["parallel_parts"] = (
+        current_app.config.get("ATTACHMENT_PARALLEL_PARTS", 4)
+        if part_urls and upload.size >= current_app.config.get("ATTACHMENT_PARALLEL_MIN_BYTES", 32 * 1024 * 1024)
+        else 1
+    )
+    return progress
+
+
+@att_bp.route("/<owner_id>/uploads", methods=["POST"])
+@login_required
+def start_chunked_upload(owner_id):
+    """
+    Starts a chunked upload. Expects JSON {filename, size, content_type}; the parts are then
+    sent with PUT to their signed URL in ``part_urls`` (or to /uploads/<id>/parts/<n>) and
+    assembled in the background after /complete.
+    """
+    Guest.query.get_or_404(owner_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        size = int(data.get("size"))
+        upload = start_upload(
+            owner_id,
+            filename=data.get("filename"),
+            size=size,
+            chunk_size=current_app.config.get("ATTACHMENT_CHUNK_BYTES", 8 * 1024 * 1024),
+            content_type=data.get("content_type"),
+            created_by_id=current_user.id,
+        )
+    except (TypeError, ValueError):
+        return jsonify({"error": "Ungültige Dateigröße."}), 400
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(_upload_state(upload)), 201
+
+
+@att_bp.route("/uploads/<upload_id>/parts/<int:part_number>", methods=["PUT"])
+@login_required
+def upload_part(upload_id, part_number):
+    upload = AttachmentUpload.query.get_or_404(upload_id)
+    try:
+        store_part(current_app.storage, upload, part_number, request.stream, request.content_length)
+    except UploadError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"part_number": part_number})
+
+
+@att_bp.route("/uploads/<upload_id>/complete", methods=["POST"])
+@login_required
+def complete_chunked_upload(upload_id):
+    upload = AttachmentUpload.query.get_or_404(upload_id)
+    if _direct_uploads():
+        sync_stored_parts(current_app.storage, upload)
+    if upload.status in ("open", "failed"):
+        if not request_finalize(upload):
+            return jsonify(_upload_state(upload)), 409
+        current_app.upload_finalizer.submit(upload.id)
+        db.session.refresh(upload)
+    return jsonify(upload_progress(upload)), 200 if upload.status == "done" else 202
+
+
+@att_bp.route("/uploads/<upload_id>")
+@login_required
+def chunked_upload_status(upload_id):
+    upload = AttachmentUpload.query.get_or_404(upload_id)
+    if _direct_uploads():
+        sync_stored_parts(current_app.storage, upload)
+    return jsonify(_upload_state(upload))
+
+
 @att_bp.route("/<int:att_id>/download")
 @login_required
 def download_attachment(att_id):
+    """
+    Streams the attachment in fixed-size pieces and answers Range requests with 206,
+    or redirects to a signed URL if ATTACHMENT_DOWNLOAD_MODE is "redirect".
+    """
     att = Attachment.query.get_or_404(att_id)
-    blob = current_app.bucket.blob(att.gcs_path)
+    if current_app.config.get("ATTACHMENT_DOWNLOAD_MODE") == "redirect" and current_app.bucket is not None:
+        return redirect(
+            generate_download_url(att.gcs_path, current_app.config.get("ATTACHMENT_SIGNED_URL_MINUTES", 10))
+        )
+
+    storage = current_app.storage
     try:
-        data = blob.download_as_bytes()
-    except NotFound:
+        info = storage.stat(att.gcs_path)
+    except FileNotFoundError:
         flash("Datei ist nicht mehr verfügbar.", "warning")
         return redirect(request.referrer or url_for("attachment.list_attachments"))
-    return send_file(
-        BytesIO(data),
-        download_name=att.filename,
-        as_attachment=False,
-        mimetype=blob.content_type or 'application/octet-stream'
+
+    etag = info.etag.strip('"')
+    # An If-Range that does not name the current ETag asks for the whole, changed object.
+    if_range = request.if_range
+    range_still_valid = (if_range.etag is None and if_range.date is None) or if_range.etag == etag
+    start, stop, status = 0, info.size, 200
+    if request.range and range_still_valid:
+        byte_range = request.range.range_for_length(info.size)
+        if byte_range is None:
+            response = Response(status=416)
+            response.headers["Content-Range"] = f"bytes */{info.size}"
+            return response
+        start, stop = byte_range
+        status = 206
+
+    chunk_size = current_app.config.get("ATTACHMENT_DOWNLOAD_CHUNK_BYTES", 1024 * 1024)
+    response = Response(
+        storage.iter_range(att.gcs_path, start, stop, info, chunk_size=chunk_size),
+        status=status,
+        mimetype=info.content_type,
+        direct_passthrough=True,
     )
+    response.content_length = stop - start
+    response.accept_ranges = "bytes"
+    response.set_etag(etag)
+    if status == 206:
+        response.content_range.set(start, stop, info.size)
+    response.headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(att.filename)}"
+    return response
+
+
+@att_bp.route("/<int:att_id>/thumbnail")
+@login_required
+def attachment_thumbnail(att_id):
+    """
+    Scaled-down preview of an image attachment (?size=small|medium, ?format=webp|jpeg,
+    by default WebP if the browser accepts it). Rendered on first request and stored next to the original.
+    """
+    att = Attachment.query.get_or_404(att_id)
+    size = request.args.get("size", "small")
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "webp" if any(value == "image/webp" for value, _ in request.accept_mimetypes) else "jpeg"
+    if size not in THUMBNAIL_SIZES or fmt not in THUMBNAIL_FORMATS or not is_image_filename(att.filename):
+        abort(404)
+
+    response = Response(mimetype=THUMBNAIL_FORMATS[fmt].mimetype)
+    response.set_etag(thumbnail_etag(att.gcs_path, size, fmt))
+    # Attachments are never overwritten, so browsers may keep their thumbnails for a year.
+    response.cache_control.private = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    response.vary.add("Accept")
+    if request.if_none_match.contains(response.get_etag()[0]):
+        response.status_code = 304
+        return response
+
+    try:
+        response.set_data(ensure_thumbnail(current_app.storage, att.gcs_path, size, fmt))
+    except (FileNotFoundError, ThumbnailError):
+        abort(404)
+    return response
 
 
 @att_bp.route("/<int:att_id>/delete", methods=["POST"])
@@ -68,6 +230,7 @@ def delete_attachment(att_id):
         flash("Datei ist einem medizinischen Vorgang zugeordnet und kann nicht gelöscht werden.", "warning")
         return redirect(request.referrer)
     delete_blob(att.gcs_path)
+    current_app.storage.delete_many(thumbnail_paths(att.gcs_path))
     db.session.delete(att)
     db.session.commit()
     flash("Datei gelöscht.", "success")
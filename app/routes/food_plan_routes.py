@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import io
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
-from flask import Blueprint, abort, flash, redirect, render_template, request, url_for, current_app
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for, current_app, send_file
 from flask_login import current_user, login_required
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, selectinload
 
+from ..card_assets import load_logo_bytes
+from ..food_plan_cache import FoodPlanCache, food_plan_cache, food_plan_revision
+from ..food_plan_pdf import render_food_plan_pdf
 from ..helpers import get_form_value, roles_required
 from ..models import (
     Animal,
@@ -21,6 +28,9 @@ from ..models import (
 
 food_plan_bp = Blueprint("food_plan", __name__, url_prefix="/food-plans")
 
+# Rendered packing-station PDFs, keyed like the computed plans they are built from.
+food_plan_pdf_cache = FoodPlanCache(max_entries=16)
+
 
 def _foodplans_enabled() -> bool:
     return current_app.config.get("SETTINGS", {}).get("foodplans", {}).get("value") == "Aktiv"
@@ -93,6 +103,24 @@ def _load_plan_or_404(plan_id: int) -> FoodPlan:
     return plan
 
 
+def _plan_cache_key(plan_id: int) -> Tuple:
+    """Plan revisions, day (animal ages) and tag system setting determine a computed plan."""
+    return plan_id, food_plan_revision(plan_id), date.today(), _tagsystem_active()
+
+
+def _computed_plan_or_404(plan_id: int, key: Optional[Tuple] = None) -> Tuple[FoodPlan, Dict]:
+    """
+    The plan and its computed view, memoized under `_plan_cache_key`;
+    only a cache miss loads guests, animals and tags.
+    """
+    plan = db.session.get(FoodPlan, plan_id)
+    if not plan:
+        abort(404)
+    key = key or _plan_cache_key(plan_id)
+    computed = food_plan_cache.get(key, lambda: _compute_plan(_load_plan_or_404(plan_id)))
+    return plan, computed
+
+
 def _normalize_recent_food_filter(value: Optional[str]) -> str:
     cleaned = (value or "").strip()
     return cleaned if cleaned in ("all", "exclude_recent", "only_recent") else "all"
@@ -132,45 +160,71 @@ def _guest_matches_recent_filter(guest_id: str, recent_filter: str) -> bool:
     return exists if recent_filter == "only_recent" else (not exists)
 
 
-def _bulk_add_guests(plan_id: int, guest_ids: List[str]) -> Tuple[int, int]:
-    if not guest_ids:
+def _bulk_add_guests(plan_id: int, eligible, attempts: int = 3) -> Tuple[int, int]:
+    """
+    Add every eligible guest not yet in the plan with one INSERT ... SELECT. New rows get
+    sort_order values after the current maximum, numbered by ROW_NUMBER() in name order.
+    Guests added concurrently make the unique (food_plan_id, guest_id) constraint fail; the
+    insert is then retried. Returns (added, already in plan).
+    """
+    if eligible is None:
+        return 0, 0
+    candidates = eligible.subquery()
+    total = db.session.execute(select(func.count()).select_from(candidates)).scalar() or 0
+    if not total:
         return 0, 0
 
-    existing = {
-        row.guest_id
-        for row in FoodPlanGuest.query.with_entities(FoodPlanGuest.guest_id)
-        .filter(FoodPlanGuest.food_plan_id == plan_id)
-        .all()
-    }
-    to_add = [gid for gid in guest_ids if gid not in existing]
-
-    if not to_add:
-        return 0, len(guest_ids)
-
-    max_sort = (
-        db.session.query(db.func.max(FoodPlanGuest.sort_order))
-        .filter(FoodPlanGuest.food_plan_id == plan_id)
-        .scalar()
+    existing = aliased(FoodPlanGuest)
+    next_sort = (
+        select(func.coalesce(func.max(existing.sort_order), 0))
+        .where(existing.food_plan_id == plan_id)
+        .scalar_subquery()
     )
-    next_sort = int(max_sort or 0) + 1
-
-    rows = [
-        FoodPlanGuest(food_plan_id=plan_id, guest_id=gid, sort_order=next_sort + idx)
-        for idx, gid in enumerate(to_add)
-    ]
-    db.session.add_all(rows)
-    db.session.commit()
-    return len(to_add), len(guest_ids) - len(to_add)
-
-
-def _eligible_guest_ids(
+    new_rows = select(
+        literal(plan_id),
+        candidates.c.id,
+        next_sort + func.row_number().over(
+            order_by=(
+                candidates.c.lastname.asc(),
+                candidates.c.firstname.asc(),
+                candidates.c.number.asc(),
+                candidates.c.id.asc(),
+            )
+        ),
+    ).where(
+        ~select(existing.id)
+        .where(existing.food_plan_id == plan_id, existing.guest_id == candidates.c.id)
+        .exists()
+    )
+    statement = (
+        insert(FoodPlanGuest)
+        .from_select(["food_plan_id", "guest_id", "sort_order"], new_rows)
+        .execution_options(food_plan_id=plan_id)
+    )
+    for attempt in range(1, attempts + 1):
+        try:
+            added = db.session.execute(statement).rowcount or 0
+            db.session.commit()
+            return added, total - added
+        except IntegrityError:
+            # A concurrent bulk add inserted some of the same guests; the retry skips them.
+            db.session.rollback()
+            if attempt == attempts:
+                raise
+
+
+def _eligible_guests_query(
     plan: FoodPlan,
     *,
     recent_food_filter: str = "all",
     require_tagged_animals: bool = False,
     species: Optional[List[str]] = None,
     require_food_amount_note: bool = False,
-) -> List[str]:
+):
+    """
+    Distinct guests (id and name columns) matching the bulk-add filters, as a query to select from;
+    None if the filters require the disabled tag system.
+    """
     query = Guest.query.filter(Guest.status == 1)
     if plan.location_id:
         query = query.filter(Guest.dispense_location_id == plan.location_id)
@@ -191,16 +245,10 @@ def _eligible_guest_ids(
 
     if require_tagged_animals:
         if not _tagsystem_active():
-            return []
+            return None
         query = query.join(animal_food_tags, animal_food_tags.c.animal_id == Animal.id)
 
-    rows = (
-        query.with_entities(Guest.id)
-        .distinct()
-        .order_by(Guest.lastname.asc(), Guest.firstname.asc(), Guest.number.asc(), Guest.id.asc())
-        .all()
-    )
-    return [row.id for row in rows]
+    return query.with_entities(Guest.id, Guest.lastname, Guest.firstname, Guest.number).distinct()
 
 
 def _compute_plan(plan: FoodPlan) -> Dict:
@@ -516,10 +564,10 @@ def bulk_add_guests(plan_id: int):
     recent_food_filter = _normalize_recent_food_filter(get_form_value("recent_food_filter"))
 
     if action == "all_guests":
-        guest_ids = _eligible_guest_ids(plan, recent_food_filter=recent_food_filter)
+        eligible = _eligible_guests_query(plan, recent_food_filter=recent_food_filter)
     elif action == "tagged_animals":
-        guest_ids = _eligible_guest_ids(plan, recent_food_filter=recent_food_filter, require_tagged_animals=True)
-        if not guest_ids and not _tagsystem_active():
+        eligible = _eligible_guests_query(plan, recent_food_filter=recent_food_filter, require_tagged_animals=True)
+        if eligible is None:
             flash("Tagsystem ist deaktiviert.", "warning")
             return redirect(url_for("food_plan.edit_plan", plan_id=plan_id))
     elif action == "species":
@@ -528,14 +576,14 @@ def bulk_add_guests(plan_id: int):
         if not species:
             flash("Keine Tierart ausgewählt.", "warning")
             return redirect(url_for("food_plan.edit_plan", plan_id=plan_id))
-        guest_ids = _eligible_guest_ids(plan, recent_food_filter=recent_food_filter, species=species)
+        eligible = _eligible_guests_query(plan, recent_food_filter=recent_food_filter, species=species)
     elif action == "food_amount_note":
-        guest_ids = _eligible_guest_ids(plan, recent_food_filter=recent_food_filter, require_food_amount_note=True)
+        eligible = _eligible_guests_query(plan, recent_food_filter=recent_food_filter, require_food_amount_note=True)
     else:
         flash("Unbekannte Aktion.", "danger")
         return redirect(url_for("food_plan.edit_plan", plan_id=plan_id))
 
-    added, already = _bulk_add_guests(plan_id, guest_ids)
+    added, already = _bulk_add_guests(plan_id, eligible)
     if added:
         msg = f"{added} Gäste hinzugefügt."
         if already:
@@ -553,8 +601,10 @@ def clear_guests(plan_id: int):
     plan = FoodPlan.query.filter_by(id=plan_id).first()
     if not plan:
         abort(404)
-    deleted = FoodPlanGuest.query.filter(FoodPlanGuest.food_plan_id == plan_id).delete(
-        synchronize_session=False
+    deleted = (
+        FoodPlanGuest.query.filter(FoodPlanGuest.food_plan_id == plan_id)
+        .execution_options(food_plan_id=plan_id)
+        .delete(synchronize_session=False)
     )
     db.session.commit()
     flash(f"{int(deleted or 0)} Gäste entfernt.", "success")
@@ -592,8 +642,7 @@ def update_guest_note(plan_id: int, guest_id: str):
 @login_required
 @roles_required("admin", "editor")
 def preview_plan(plan_id: int):
-    plan = _load_plan_or_404(plan_id)
-    computed = _compute_plan(plan)
+    plan, computed = _computed_plan_or_404(plan_id)
     location_name = plan.location.name if plan.location else None
     return render_template(
         "food_plans/preview.html",
@@ -608,8 +657,7 @@ def preview_plan(plan_id: int):
 @login_required
 @roles_required("admin", "editor")
 def print_plan(plan_id: int):
-    plan = _load_plan_or_404(plan_id)
-    computed = _compute_plan(plan)
+    plan, computed = _computed_plan_or_404(plan_id)
     location_name = plan.location.name if plan.location else None
     return render_template(
         "reports/food_plan_report.html",
@@ -621,6 +669,43 @@ def print_plan(plan_id: int):
     )
 
 
+@food_plan_bp.route("/<int:plan_id>/print.pdf")
+@login_required
+@roles_required("admin", "editor")
+def print_plan_pdf(plan_id: int):
+    """Server-rendered PDF of the plan for the packing station, cached per plan revision."""
+    key = _plan_cache_key(plan_id)
+    plan, computed = _computed_plan_or_404(plan_id, key)
+    location_name = plan.location.name if plan.location else None
+    settings = current_app.config.get("SETTINGS", {})
+    logo_url = settings.get("logourl", {}).get("value")
+    organisation = settings.get("name", {}).get("value") or "PfotenRegister"
+    # The location name and branding are not covered by the plan revision.
+    pdf_key = key + (location_name, logo_url, organisation)
+
+    def _render() -> bytes:
+        return render_food_plan_pdf(
+            computed,
+            title=plan.title,
+            status=plan.status,
+            location_name=location_name,
+            organisation=organisation,
+            logo_data=load_logo_bytes(logo_url),
+        )
+
+    pdf = food_plan_pdf_cache.get(pdf_key, _render)
+    response = send_file(
+        io.BytesIO(pdf),
+        mimetype="application/pdf",
+        download_name=f"futterplan_{plan_id}.pdf",
+        etag=hashlib.sha1(repr(pdf_key).encode("utf-8")).hexdigest(),
+        conditional=True,
+    )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @food_plan_bp.route("/<int:plan_id>/delete", methods=["POST"])
 @login_required
 @roles_required("admin", "editor")
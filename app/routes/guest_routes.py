@@ -1,27 +1,49 @@
+import base64
+import json
 from datetime import datetime, timedelta
-import hashlib
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, session, current_app
 from flask_login import login_required, current_user
 from sqlalchemy.sql.sqltypes import Boolean, Date, Enum, Text
+from sqlalchemy import or_
 from sqlalchemy.sql.expression import func
 
+from ..code_allocator import commit_with_guest_code
 from ..helpers import (
-    generate_unique_code,
-    get_food_history,
     add_changelog,
     roles_required,
     get_form_value,
-    generate_guest_number, user_has_access, is_different, build_reminder_alerts, send_guest_card_email, is_active,
-    get_guest_list_sort_args, guest_list_sort_order
+    generate_guest_number, user_has_access, is_different, send_guest_card_email, is_active,
+    get_guest_list_sort_args, guest_list_sort_order, keyset_filter
 )
-from ..models import db as sqlalchemy_db, Guest, Animal, Payment, Representative, ChangeLog, FoodHistory, FoodTag, \
-    FieldRegistry, Message, User, Attachment, DropOffLocation, AccessoriesHistory, MedicalEvent
+from ..models import db as sqlalchemy_db, Guest, Animal, Payment, Representative, ChangeLog, FoodHistory, \
+    Message, User, DropOffLocation, AccessoriesHistory
+from ..field_registry_cache import registry_fields
+from ..guest_detail import load_guest_detail
 from ..reports import generate_gast_card_pdf, generate_multiple_gast_cards_pdf
+from ..search_index import (
+    build_search_index_delta,
+    build_shell_search_entries,
+    current_search_index_version,
+    guest_search_engine,
+    mark_guests_changed,
+)
 
 guest_bp = Blueprint("guest", __name__)
 
 GUEST_LIFECYCLE_STATUSES = {"active", "staging", "inactive"}
+GUEST_LIST_PAGE_SIZE = 50
+GUEST_LIST_STATUS_RANK = {"active": 0, "staging": 1, "inactive": 2}
+GUEST_LIST_STATUS_BY_RANK = {rank: status for status, rank in GUEST_LIST_STATUS_RANK.items()}
+GUEST_LIST_SEARCH_COLUMNS = (
+    Guest.id,
+    Guest.number,
+    Guest.firstname,
+    Guest.lastname,
+    Guest.address,
+    Guest.zip,
+    Guest.city,
+)
 GUEST_INTERNAL_FORM_FIELDS = {"lifecycle_status"}
 GUEST_STATUS_OPTIONS = [
     {"value": "1", "label": "Aktiv"},
@@ -145,11 +167,7 @@ GUEST_EDIT_SECTION_LAYOUT = [
 
 def _get_registry_create_fields(model_name):
     """Return visible and editable registry fields for create forms in display order."""
-    fields = (
-        FieldRegistry.query.filter_by(model_name=model_name, globally_visible=True)
-        .order_by(FieldRegistry.display_order.asc(), FieldRegistry.field_name.asc())
-        .all()
-    )
+    fields = registry_fields(model_name, visible_only=True)
     visible_fields = []
     for field in fields:
         if model_name == "Guest" and field.field_name in GUEST_INTERNAL_FORM_FIELDS:
@@ -314,11 +332,7 @@ def _render_register_guest_form(locations_enabled, dispense_locations, form_valu
 
 def _get_registry_edit_fields(model_name):
     """Return visible fields for edit forms with read-only state derived from the registry."""
-    fields = (
-        FieldRegistry.query.filter_by(model_name=model_name)
-        .order_by(FieldRegistry.display_order.asc(), FieldRegistry.field_name.asc())
-        .all()
-    )
+    fields = registry_fields(model_name)
     visible_fields = []
     for field in fields:
         if model_name == "Guest" and field.field_name in GUEST_INTERNAL_FORM_FIELDS:
@@ -431,280 +445,63 @@ def index():
 @guest_bp.route("/guest/search")
 @login_required
 def search_guests():
+    """Autocomplete guests by code, number, name or animal name from the in-memory search index."""
     query = request.args.get("q", "").strip()
     if not query or len(query) < 2:
         return jsonify([])
 
-    results = (
-        Guest.query.filter(
-            (Guest.firstname.ilike(f"%{query}%")) | (Guest.lastname.ilike(f"%{query}%"))
-        )
-        .order_by(Guest.lastname)
-        .limit(10)
-        .all()
-    )
+    guest_search_engine.sync()
+    results = guest_search_engine.search(query, limit=10)
 
     return jsonify([
-        {"id": g.id, "name": f"{g.firstname} {g.lastname}"} for g in results
+        {"id": entry["id"], "name": entry["name"], "number": entry["number"], "animals": entry["animals"]}
+        for entry in results
     ])
 
 
-def _build_shell_search_version():
-    """Build a stable version hash for the shell search cache from searchable guest and animal fields."""
-    guest_rows = (
-        sqlalchemy_db.session.query(Guest.id, Guest.number, Guest.firstname, Guest.lastname)
-        .order_by(Guest.id.asc())
-        .all()
-    )
-    animal_rows = (
-        sqlalchemy_db.session.query(Animal.id, Animal.guest_id, Animal.name)
-        .order_by(Animal.id.asc())
-        .all()
-    )
-
-    version_parts = []
-    for guest in guest_rows:
-        version_parts.append(
-            f"g|{guest.id}|{guest.number or ''}|{guest.firstname or ''}|{guest.lastname or ''}"
-        )
-    for animal in animal_rows:
-        version_parts.append(
-            f"a|{animal.id}|{animal.guest_id or ''}|{animal.name or ''}"
-        )
-
-    digest = hashlib.sha1("\n".join(version_parts).encode("utf-8")).hexdigest()
-    return digest
-
-
-def _build_shell_search_entries():
-    """Return shell search entries enriched with related animal names."""
-    rows = (
-        sqlalchemy_db.session.query(
-            Guest.id,
-            Guest.number,
-            Guest.firstname,
-            Guest.lastname,
-            Animal.name.label("animal_name"),
-        )
-        .outerjoin(Animal, Animal.guest_id == Guest.id)
-        .order_by(Guest.lastname.asc(), Guest.firstname.asc(), Animal.name.asc())
-        .all()
-    )
-
-    guests_by_id = {}
-    for row in rows:
-        guest_entry = guests_by_id.setdefault(
-            row.id,
-            {
-                "id": row.id,
-                "code": row.id,
-                "number": row.number or "",
-                "name": f"{row.firstname or ''} {row.lastname or ''}".strip(),
-                "animals": [],
-            },
-        )
-        if row.animal_name and row.animal_name not in guest_entry["animals"]:
-            guest_entry["animals"].append(row.animal_name)
-
-    entries = []
-    for guest in guests_by_id.values():
-        animal_names = ", ".join(guest["animals"])
-        entries.append(
-            {
-                "id": guest["id"],
-                "code": guest["code"],
-                "number": guest["number"],
-                "name": guest["name"],
-                "animals": guest["animals"],
-                "search": " ".join(
-                    part
-                    for part in [guest["id"], guest["number"], guest["name"], animal_names]
-                    if part
-                ).lower(),
-            }
-        )
-
-    return entries
-
-
 @guest_bp.route("/guest/search-index/meta")
 @login_required
 def guest_search_index_meta():
     """Return a lightweight version token for the shell search cache."""
-    return jsonify({"version": _build_shell_search_version()})
+    return jsonify({"version": current_search_index_version()})
 
 
 @guest_bp.route("/guest/search-index")
 @login_required
 def guest_search_index():
     """Return a guest and animal name index for the shell search field."""
-    return jsonify({"version": _build_shell_search_version(), "entries": _build_shell_search_entries()})
+    version = current_search_index_version()
+    return jsonify({"version": version, "entries": build_shell_search_entries()})
+
+
+@guest_bp.route("/guest/search-index/delta")
+@login_required
+def guest_search_index_delta():
+    """Return shell search entries changed since the given revision so cached indexes can be patched."""
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return jsonify({"version": current_search_index_version(), "full": True, "entries": [], "removed": []})
+    return jsonify(build_search_index_delta(since))
 
 
 @guest_bp.route("/guest/<guest_id>")
 @login_required
 def view_guest(guest_id):
     """Render the guest detail page with all related guest modules."""
-    guest = Guest.query.get(guest_id)
     locations_enabled = is_active("locations") and is_active("locationGuestAssigment")
-    if guest:
-        animals = Animal.query.filter_by(guest_id=guest.id).all()
-        messages = Message.query.filter_by(guest_id=guest.id).all()
-        # Load guest documents
-        guest_documents = Attachment.query.filter_by(owner_id=guest.id).all()
-
-        feed_history = get_food_history(guest.id)
-        changelog = (
-            ChangeLog.query.filter_by(guest_id=guest.id)
-            .order_by(ChangeLog.change_timestamp.desc())
-            .all()
-        )
-        payments = (
-            Payment.query.filter_by(guest_id=guest.id)
-            .order_by(Payment.created_on.desc())
-            .all()
-        )
-        accessories_history = (
-            AccessoriesHistory.query.filter_by(guest_id=guest.id)
-            .order_by(AccessoriesHistory.distributed_on.desc())
-            .all()
-        )
-        medical_events = (
-            MedicalEvent.query.filter_by(guest_id=guest.id)
-            .order_by(
-                MedicalEvent.status.asc(),
-                MedicalEvent.planned_for.asc(),
-                MedicalEvent.completed_on.desc(),
-                MedicalEvent.id.desc(),
-            )
-            .all()
-        )
-        planned_medical_events = [event for event in medical_events if event.status == "Geplant"]
-        active_medical_events = [event for event in medical_events if event.status == "Aktiv"]
-        past_medical_events = [
-            event for event in medical_events if event.status in ("Abgeschlossen", "Abgesagt")
-        ]
-        medical_events_by_attachment = {}
-        for event in medical_events:
-            for link in event.attachment_links:
-                medical_events_by_attachment.setdefault(link.attachment_id, []).append(event)
-
-        all_tags = (
-            FoodTag.query.all()
-        )
-        # Build ordered list of visible Guest fields with UI labels
-        all_fields = FieldRegistry.query.filter_by(model_name="Guest").all()
-        # Filter by access and sort by display_order
-        accessible = [f for f in all_fields if user_has_access(f.visibility_level)]
-        accessible.sort(key=lambda f: f.display_order)
-        # Prepare for template: name, label, inline flag, and order
-        visible_fields_guest = [
-            {
-                "name": f.field_name,
-                "label": f.ui_label or f.field_name,
-                "show_inline": f.show_inline,
-                "order": f.display_order,
-            }
-            for f in accessible
-        ]
-
-        # Build ordered list of visible Guest fields with UI labels
-        all_fields = FieldRegistry.query.filter_by(model_name="Animal").all()
-        # Filter by access and sort by display_order
-        accessible = [f for f in all_fields if user_has_access(f.visibility_level)]
-        accessible.sort(key=lambda f: f.display_order)
-        # Prepare for template: name, label, inline flag, and order
-        visible_fields_animal = [
-            {
-                "name": f.field_name,
-                "label": f.ui_label or f.field_name,
-                "show_inline": f.show_inline,
-                "order": f.display_order,
-            }
-            for f in accessible
-        ]
-
-        representative = Representative.query.filter_by(guest_id=guest.id).first()
-
-        reminder_alerts = build_reminder_alerts(
-            guest,
-            animals=animals,
-            representative=representative,
-        )
-        dispense_locations = (
-            DropOffLocation.query.filter_by(is_dispense_location=True, active=True)
-            .order_by(DropOffLocation.name.asc())
-            .all()
-            if locations_enabled else []
-        )
-
-        # Build ordered list of visible Guest fields with UI labels
-        all_fields = FieldRegistry.query.filter_by(model_name="Representative").all()
-        # Filter by access and sort by display_order
-        accessible = [f for f in all_fields if user_has_access(f.visibility_level)]
-        accessible.sort(key=lambda f: f.display_order)
-        # Prepare for template: name, label, inline flag, and order
-        visible_fields_representative = [
-            {
-                "name": f.field_name,
-                "label": f.ui_label or f.field_name,
-                "show_inline": f.show_inline,
-                "order": f.display_order,
-            }
-            for f in accessible
-        ]
-
-    else:
-        animals = []
-        messages = []
-        changelog = []
-        guest_documents = []
-        all_tags = []
-        feed_history = []
-        payments = []
-        accessories_history = []
-        medical_events = []
-        planned_medical_events = []
-        active_medical_events = []
-        past_medical_events = []
-        medical_events_by_attachment = {}
-        visible_fields_guest = []
-        visible_fields_animal = []
-        visible_fields_representative = []
-        representative = []
-        reminder_alerts = []
-    if guest:
-        return render_template(
-            "view_guest.html",
-            visible_fields_guest=visible_fields_guest,
-            visible_fields_animal=visible_fields_animal,
-            messages=messages,
-            guest_documents=guest_documents,
-            guest=guest,
-            all_tags=all_tags,
-            visible_fields_representative=visible_fields_representative,
-            representative=representative,
-            animals=animals,
-            changelog=changelog,
-            feed_history=feed_history,
-            accessories_history=accessories_history,
-            medical_events=medical_events,
-            planned_medical_events=planned_medical_events,
-            active_medical_events=active_medical_events,
-            past_medical_events=past_medical_events,
-            medical_events_by_attachment=medical_events_by_attachment,
-            scanning_enabled=True,
-            datetime=datetime,
-            current_time=datetime.today().date(),
-            payments=payments,
-            timedelta=timedelta,
-            reminder_alerts=reminder_alerts,
-            locations_enabled=locations_enabled,
-            dispense_locations=dispense_locations,
-        )
-    else:
+    detail = load_guest_detail(guest_id, locations_enabled=locations_enabled)
+    if detail is None:
         flash("Gast nicht gefunden.", "danger")
         return redirect(url_for("guest.index"))
+    return render_template(
+        "view_guest.html",
+        **detail.template_context(),
+        scanning_enabled=True,
+        datetime=datetime,
+        current_time=datetime.today().date(),
+        timedelta=timedelta,
+        locations_enabled=locations_enabled,
+    )
 
 
 @guest_bp.route("/guest/<guest_id>/report", methods=["GET"])
@@ -726,9 +523,7 @@ def guest_report(guest_id):
         exclude_fields = exclude_fields or set()
         multiline_fields = multiline_fields or set()
         rows = []
-        fields = FieldRegistry.query.filter_by(model_name=model_name).all()
-        accessible = [f for f in fields if user_has_access(f.visibility_level)]
-        accessible.sort(key=lambda f: f.display_order)
+        accessible = [f for f in registry_fields(model_name) if user_has_access(f.visibility_level)]
         for field in accessible:
             field_name = field.field_name
             if field_name in exclude_fields or not hasattr(instance, field_name):
@@ -800,55 +595,180 @@ def edit_guest(guest_id):
     )
 
 
-@guest_bp.route("/guest/list")
-@login_required
-def list_guests():
-    sort_by, sort_direction = get_guest_list_sort_args(request.args)
-    status_filter = request.args.get("status", "all")
+def _encode_guest_list_cursor(values):
+    """Serialize the keyset values of the last listed guest into an opaque URL-safe token."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_guest_list_cursor(token, expected_length):
+    """Return the keyset values stored in a cursor token, or None if the token is invalid."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != expected_length:
+        return None
+    return values
+
+
+def _guest_list_args(args):
+    """Normalize sort, status filter and search term of the guest list."""
+    sort_by, sort_direction = get_guest_list_sort_args(args)
+    status_filter = args.get("status", "all")
     if status_filter not in {"all", "active", "staging", "inactive"}:
         status_filter = "all"
-    guests = Guest.query.order_by(*guest_list_sort_order(sort_by, sort_direction)).all()
-    guest_ids = [g.id for g in guests]
-    feed_history = {}
-    if guest_ids:
-        rows = (
-            FoodHistory.query.with_entities(
-                FoodHistory.guest_id, func.max(FoodHistory.distributed_on).label("latest")
-            )
-            .filter(FoodHistory.guest_id.in_(guest_ids))
-            .group_by(FoodHistory.guest_id)
-            .all()
+    search_term = (args.get("q") or "").strip()
+    return sort_by, sort_direction, status_filter, search_term
+
+
+def _latest_feed_dates(guest_ids):
+    """Return {guest_id: latest distributed_on} for the given guests only."""
+    if not guest_ids:
+        return {}
+    rows = (
+        sqlalchemy_db.session.query(FoodHistory.guest_id, func.max(FoodHistory.distributed_on))
+        .filter(FoodHistory.guest_id.in_(guest_ids))
+        .group_by(FoodHistory.guest_id)
+        .all()
+    )
+    return dict(rows)
+
+
+def _filter_guest_list(query, status_filter, search_term):
+    if status_filter != "all":
+        query = query.filter(Guest.lifecycle_status == status_filter)
+    for token in search_term.lower().split():
+        pattern = f"%{token}%"
+        query = query.filter(
+            or_(*(column.ilike(pattern) for column in GUEST_LIST_SEARCH_COLUMNS))
         )
-        for row in rows:
-            feed_history[row.guest_id] = row.latest
-
-    active_guests = []
-    staging_guests = []
-    inactive_guests = []
-
-    for g in guests:
-        if g.status_group == "active":
-            active_guests.append(g)
-        elif g.status_group == "staging":
-            staging_guests.append(g)
-        else:
-            inactive_guests.append(g)
+    return query
+
+
+def _guest_list_count(status_filter, search_term):
+    """Count matching guests over the guest table alone, without aggregating the feed history."""
+    query = sqlalchemy_db.session.query(func.count(Guest.id))
+    return _filter_guest_list(query, status_filter, search_term).scalar()
+
+
+def _guest_list_keyset(sort_by):
+    """Return the raw guest columns a list page seeks on; the guest id breaks ties."""
+    if sort_by == "number":
+        return [Guest.number, Guest.id]
+    return [Guest.lastname, Guest.firstname, Guest.id]
+
+
+def _load_guest_list_page(args, cursor=None):
+    """
+    Load one keyset page of the guest list; returns None if the cursor is invalid.
 
-    grouped_guests = active_guests + staging_guests + inactive_guests
+    Status groups are walked one after another with an equality filter on lifecycle_status,
+    so each group's seek and ORDER BY run on the (lifecycle_status, sort columns) index.
+    """
+    page_size = GUEST_LIST_PAGE_SIZE
+    sort_by, sort_direction, status_filter, search_term = _guest_list_args(args)
+    columns = _guest_list_keyset(sort_by)
+    directions = [sort_direction] * len(columns)
+    order = [column.desc() if sort_direction == "desc" else column.asc() for column in columns]
+    statuses = list(GUEST_LIST_STATUS_RANK) if status_filter == "all" else [status_filter]
+
+    values = None
+    previous_status_group = None
+    if cursor:
+        decoded = _decode_guest_list_cursor(cursor, len(columns) + 1)
+        if decoded is None or not isinstance(decoded[0], int) or decoded[0] not in GUEST_LIST_STATUS_BY_RANK:
+            return None
+        previous_status_group = GUEST_LIST_STATUS_BY_RANK[decoded[0]]
+        if previous_status_group not in statuses:
+            return None
+        statuses = statuses[statuses.index(previous_status_group):]
+        values = decoded[1:]
+
+    rows = []
+    for status in statuses:
+        query = _filter_guest_list(sqlalchemy_db.session.query(Guest), status, search_term)
+        if values is not None and status == previous_status_group:
+            query = query.filter(keyset_filter(columns, directions, values))
+        rows.extend(query.order_by(*order).limit(page_size + 1 - len(rows)).all())
+        if len(rows) > page_size:
+            break
+
+    has_more = len(rows) > page_size
+    guests = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        last = guests[-1]
+        next_cursor = _encode_guest_list_cursor(
+            [GUEST_LIST_STATUS_RANK[last.lifecycle_status]] + [getattr(last, column.key) for column in columns]
+        )
+    return {
+        "guests": guests,
+        "feed_history": _latest_feed_dates([guest.id for guest in guests]),
+        "next_cursor": next_cursor,
+        "previous_status_group": previous_status_group,
+    }
+
+
+def _guest_list_status_counts():
+    """Return guest counts per lifecycle status plus the total."""
+    counts = {"active": 0, "staging": 0, "inactive": 0}
+    rows = (
+        sqlalchemy_db.session.query(Guest.lifecycle_status, func.count(Guest.id))
+        .group_by(Guest.lifecycle_status)
+        .all()
+    )
+    for status, count in rows:
+        key = status if status in counts else "inactive"
+        counts[key] += count
+    counts["total"] = sum(counts.values())
+    return counts
+
+
+@guest_bp.route("/guest/list")
+@login_required
+def list_guests():
+    sort_by, sort_direction, status_filter, search_term = _guest_list_args(request.args)
+    page = _load_guest_list_page(request.args)
+    matching_count = _guest_list_count(status_filter, search_term)
     return render_template(
         "list_guests.html",
-        guests=grouped_guests,
-        active_guests=active_guests,
-        staging_guests=staging_guests,
-        inactive_guests=inactive_guests,
-        feed_history=feed_history,
+        guests=page["guests"],
+        feed_history=page["feed_history"],
+        next_cursor=page["next_cursor"],
+        previous_status_group=None,
+        status_counts=_guest_list_status_counts(),
+        matching_count=matching_count,
         current_sort=sort_by,
         current_sort_direction=sort_direction,
         current_status_filter=status_filter,
+        current_search=search_term,
         title="Gästeliste",
     )
 
 
+@guest_bp.route("/guest/list/page")
+@login_required
+def list_guests_page():
+    """Return the next rendered guest list rows for infinite scrolling."""
+    page = _load_guest_list_page(request.args, cursor=request.args.get("cursor"))
+    if page is None:
+        return jsonify({"error": "Ungültiger Cursor."}), 400
+    payload = {
+        "html": render_template(
+            "partials/guest_list_rows.html",
+            guests=page["guests"],
+            feed_history=page["feed_history"],
+            previous_status_group=page["previous_status_group"],
+        ),
+        "next_cursor": page["next_cursor"],
+    }
+    if not request.args.get("cursor"):
+        _, _, status_filter, search_term = _guest_list_args(request.args)
+        payload["matching_count"] = _guest_list_count(status_filter, search_term)
+    return jsonify(payload)
+
+
 @guest_bp.route("/guest/register", methods=["GET", "POST"])
 @roles_required("admin", "editor")
 @login_required
@@ -904,11 +824,8 @@ def register_guest():
                 initial_step=1,
             )
 
-        guest_id = generate_unique_code(length=6)
         if guest_data.get("member_since") is None:
             guest_data["member_since"] = datetime.today().date()
-        guest_data["id"] = guest_id
-        guest_data["number"] = generate_guest_number()
         guest_data["created_on"] = datetime.now()
         guest_data["updated_on"] = datetime.now()
         guest_lifecycle_status = _normalize_guest_lifecycle_status(guest_data.get("status"), "active")
@@ -920,21 +837,28 @@ def register_guest():
                 disp_loc = DropOffLocation.query.filter_by(id=loc_id, is_dispense_location=True, active=True).first()
                 if disp_loc:
                     guest_data["dispense_location_id"] = disp_loc.id
-        guest = Guest(**guest_data)
-        sqlalchemy_db.session.add(guest)
 
         representative_fields = _get_registry_create_fields("Representative")
         representative_form_fields = [f"r_{field.field_name}" for field in representative_fields]
-        if any(get_form_value(field_name) for field_name in representative_form_fields):
-            representative = Representative(
-                guest_id=guest_id,
-                name=get_form_value("r_name") or None,
-                phone=get_form_value("r_phone") or None,
-                email=get_form_value("r_email") or None,
-                address=get_form_value("r_address") or None,
+        has_representative = any(get_form_value(field_name) for field_name in representative_form_fields)
+
+        def add_guest_rows(new_guest_id):
+            # The number is taken inside each attempt, so a retried commit does not reuse a rolled-back one.
+            sqlalchemy_db.session.add(
+                Guest(**{**guest_data, "id": new_guest_id, "number": generate_guest_number()})
             )
-            sqlalchemy_db.session.add(representative)
-        sqlalchemy_db.session.commit()
+            if has_representative:
+                sqlalchemy_db.session.add(
+                    Representative(
+                        guest_id=new_guest_id,
+                        name=get_form_value("r_name") or None,
+                        phone=get_form_value("r_phone") or None,
+                        email=get_form_value("r_email") or None,
+                        address=get_form_value("r_address") or None,
+                    )
+                )
+
+        guest_id = commit_with_guest_code(add_guest_rows)
         add_changelog(guest_id, "create", "Gast erstellt")
         session["guests_changed"] = True
         action = request.form.get("action", "next")
@@ -959,7 +883,7 @@ def update_guest(guest_id):
     changes = []
 
     # Guest Felder dynamisch aktualisieren
-    for field in FieldRegistry.query.filter_by(model_name="Guest").all():
+    for field in registry_fields("Guest"):
         if not user_has_access(field.visibility_level):
             continue
         if not user_has_access(field.editability_level):
@@ -1014,7 +938,7 @@ def update_guest(guest_id):
             guest.dispense_location_id = resolved_location_id
             changes.append("Ausgabestandort")
 
-    rep_fields = FieldRegistry.query.filter_by(model_name="Representative").all()
+    rep_fields = registry_fields("Representative")
     rep_values = {}
     for field in rep_fields:
         if not user_has_access(field.visibility_level):
@@ -1170,6 +1094,7 @@ def delete_guest(guest_id):
     AccessoriesHistory.query.filter_by(guest_id=guest_id).delete()
     ChangeLog.query.filter_by(guest_id=guest_id).delete()
     Guest.query.filter_by(id=guest_id).delete()
+    mark_guests_changed([guest_id])
     sqlalchemy_db.session.commit()
     session["guests_changed"] = True
     flash("Gast wurde vollständig gelöscht.", "success")
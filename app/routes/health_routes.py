@@ -1,4 +1,4 @@
-from flask import Blueprint
+from flask import Blueprint, current_app, jsonify
 
 health_bp = Blueprint("health", __name__)
 
@@ -7,3 +7,8 @@ health_bp = Blueprint("health", __name__)
 def health():
     return "", 200
 
+
+@health_bp.route("/health/settings", methods=["GET"])
+def settings_cache_metrics():
+    """Expose the settings revision checks of this worker."""
+    return jsonify(current_app.settings_cache.metrics())
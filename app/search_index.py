@@ -0,0 +1,390 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from .models import db, CacheRevision, Guest, Animal, SearchIndexChange
+from .settings_cache import bump_revision
+
+GUEST_SEARCH_FIELDS = ("id", "number", "firstname", "lastname")
+ANIMAL_SEARCH_FIELDS = ("guest_id", "name")
+SEARCH_INDEX_REVISION = "search_index"
+# Guest ids stamped in the session's current transaction, waiting for their revision.
+_PENDING_KEY = "search_index_pending"
+# Guest ids touched by the mapper events of the running flush, stamped once it ends.
+_FLUSHED_KEY = "search_index_flushed"
+# Set while a commit flushes, so its after_flush hook assigns the revision last.
+_COMMITTING_KEY = "search_index_committing"
+_REVISION_BATCH = 500
+
+
+def _stamp_guests(session, guest_ids: Iterable[str]) -> None:
+    """Replace the change rows of the guests by one new row each; the revision follows at commit."""
+    guest_ids = sorted({gid for gid in guest_ids if gid})
+    if not guest_ids:
+        return
+    table = SearchIndexChange.__table__
+    connection = session.connection()
+    for start in range(0, len(guest_ids), _REVISION_BATCH):
+        connection.execute(table.delete().where(table.c.guest_id.in_(guest_ids[start:start + _REVISION_BATCH])))
+    now = datetime.utcnow()
+    connection.execute(table.insert(), [{"guest_id": guest_id, "changed_on": now} for guest_id in guest_ids])
+    session.info.setdefault(_PENDING_KEY, set()).update(guest_ids)
+
+
+def _note_guests(session, guest_ids: Iterable[str]) -> None:
+    session.info.setdefault(_FLUSHED_KEY, set()).update(gid for gid in guest_ids if gid)
+
+
+def _assign_revision(session) -> None:
+    """Give the transaction's change rows the next search index revision."""
+    guest_ids = list(session.info.pop(_PENDING_KEY, ()))
+    if not guest_ids:
+        return
+    connection = session.connection()
+    bump_revision(connection, SEARCH_INDEX_REVISION)
+    revision = connection.execute(
+        select(CacheRevision.revision).where(CacheRevision.name == SEARCH_INDEX_REVISION)
+    ).scalar()
+    table = SearchIndexChange.__table__
+    for start in range(0, len(guest_ids), _REVISION_BATCH):
+        connection.execute(
+            table.update()
+            .where(table.c.guest_id.in_(guest_ids[start:start + _REVISION_BATCH]), table.c.revision.is_(None))
+            .values(revision=revision)
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _stamp_flushed_guests(session, flush_context):
+    guest_ids = session.info.pop(_FLUSHED_KEY, None)
+    if guest_ids:
+        _stamp_guests(session, guest_ids)
+    if session.info.get(_COMMITTING_KEY):
+        _assign_revision(session)
+
+
+@event.listens_for(Session, "before_commit")
+def _assign_search_index_revision(session):
+    """
+    Give this transaction's change rows the next search index revision as its last statement.
+    The counter row stays locked until the commit, so revisions become visible in commit order
+    and a client that synced to revision N never misses a change with a lower revision.
+    """
+    if session.in_nested_transaction():
+        return
+    if session.new or session.dirty or session.deleted:
+        # The commit flushes right after this hook; the after_flush hook then assigns the revision.
+        session.info[_COMMITTING_KEY] = True
+    else:
+        _assign_revision(session)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_search_index_changes(session):
+    session.info.pop(_COMMITTING_KEY, None)
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_FLUSHED_KEY, None)
+
+
+def _changed(target, fields) -> bool:
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _previous_value(target, field):
+    history = inspect(target).attrs[field].history
+    return history.deleted[0] if history.deleted else None
+
+
+@event.listens_for(Guest, "after_insert")
+@event.listens_for(Guest, "after_delete")
+def _guest_inserted_or_deleted(mapper, connection, target):
+    _note_guests(object_session(target), [target.id])
+
+
+@event.listens_for(Guest, "after_update")
+def _guest_updated(mapper, connection, target):
+    if _changed(target, GUEST_SEARCH_FIELDS):
+        _note_guests(object_session(target), [target.id, _previous_value(target, "id")])
+
+
+@event.listens_for(Animal, "after_insert")
+@event.listens_for(Animal, "after_delete")
+def _animal_inserted_or_deleted(mapper, connection, target):
+    _note_guests(object_session(target), [target.guest_id])
+
+
+@event.listens_for(Animal, "after_update")
+def _animal_updated(mapper, connection, target):
+    if _changed(target, ANIMAL_SEARCH_FIELDS):
+        _note_guests(object_session(target), [target.guest_id, _previous_value(target, "guest_id")])
+
+
+def mark_guests_changed(guest_ids: Iterable[str]) -> None:
+    """Stamp guests touched by bulk statements, which bypass the mapper events."""
+    _stamp_guests(db.session(), guest_ids)
+
+
+def mark_guests_inserted(guest_ids: Iterable[str]) -> None:
+    """Stamp guests created by bulk inserts; new guests have no older rows to drop."""
+    now = datetime.utcnow()
+    rows = [{"guest_id": guest_id, "changed_on": now} for guest_id in dict.fromkeys(guest_ids) if guest_id]
+    if rows:
+        db.session.connection().execute(SearchIndexChange.__table__.insert(), rows)
+        db.session.info.setdefault(_PENDING_KEY, set()).update(row["guest_id"] for row in rows)
+
+
+def current_search_index_version() -> int:
+    """Return the latest committed shell search index revision (0 if nothing changed yet)."""
+    return db.session.query(func.coalesce(func.max(SearchIndexChange.revision), 0)).scalar() or 0
+
+
+def build_shell_search_entries(guest_ids: Optional[Iterable[str]] = None) -> List[dict]:
+    """Return shell search entries enriched with related animal names, optionally for selected guests only."""
+    query = (
+        db.session.query(
+            Guest.id,
+            Guest.number,
+            Guest.firstname,
+            Guest.lastname,
+            Animal.name.label("animal_name"),
+        )
+        .outerjoin(Animal, Animal.guest_id == Guest.id)
+    )
+    if guest_ids is not None:
+        guest_ids = list(guest_ids)
+        if not guest_ids:
+            return []
+        query = query.filter(Guest.id.in_(guest_ids))
+    rows = query.order_by(Guest.lastname.asc(), Guest.firstname.asc(), Animal.name.asc()).all()
+
+    guests_by_id = {}
+    for row in rows:
+        guest_entry = guests_by_id.setdefault(
+            row.id,
+            {
+                "id": row.id,
+                "code": row.id,
+                "number": row.number or "",
+                "name": f"{row.firstname or ''} {row.lastname or ''}".strip(),
+                "animals": [],
+            },
+        )
+        if row.animal_name and row.animal_name not in guest_entry["animals"]:
+            guest_entry["animals"].append(row.animal_name)
+
+    entries = []
+    for guest in guests_by_id.values():
+        animal_names = ", ".join(guest["animals"])
+        entries.append(
+            {
+                "id": guest["id"],
+                "code": guest["code"],
+                "number": guest["number"],
+                "name": guest["name"],
+                "animals": guest["animals"],
+                "search": " ".join(
+                    part
+                    for part in [guest["id"], guest["number"], guest["name"], animal_names]
+                    if part
+                ).lower(),
+            }
+        )
+
+    return entries
+
+
+def build_search_index_delta(since: int) -> dict:
+    """
+    Return the entries changed after revision `since`.
+    Guests that no longer exist are reported in `removed`; `full` asks the client to reload everything.
+    """
+    version = current_search_index_version()
+    if since > version:
+        return {"version": version, "full": True, "entries": [], "removed": []}
+
+    changed_ids = [
+        row.guest_id
+        for row in db.session.query(SearchIndexChange.guest_id).filter(SearchIndexChange.revision > since)
+    ]
+    entries = build_shell_search_entries(changed_ids)
+    present = {entry["id"] for entry in entries}
+    return {
+        "version": version,
+        "full": False,
+        "entries": entries,
+        "removed": [guest_id for guest_id in changed_ids if guest_id not in present],
+    }
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token for token in re.split(r"[\s,;]+", (text or "").lower()) if token]
+
+
+def _token_grams(token: str, prefix: bool = False) -> set:
+    """Return padded trigrams of a token; prefix tokens skip the closing trigram."""
+    padded = f"  {token} "
+    grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+    if prefix:
+        grams.discard(f"{token[-2:]} ".rjust(3))
+    return grams
+
+
+class GuestSearchEngine:
+    """
+    Per-process trigram index over the shell search entries.
+    The index catches up with other workers through the search index revisions.
+    """
+
+    # A candidate set covering at least 1/DENSE_FACTOR of all guests is read in name
+    # order instead of being materialized and sorted.
+    DENSE_FACTOR = 64
+
+    def __init__(self, min_score: float = 0.5):
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all indexed entries; the next sync rebuilds the index."""
+        self._entries = {}
+        self._sort_keys = {}
+        self._ordered = []
+        self._grams = {}
+        self._postings = defaultdict(set)
+        self._exact = defaultdict(set)
+        self.version = None
+
+    def _add(self, entry: dict, keep_order: bool = True) -> None:
+        guest_id = entry["id"]
+        self._remove(guest_id)
+        grams = set()
+        for token in _tokenize(entry["search"]):
+            grams |= _token_grams(token)
+        sort_key = (entry["name"].lower(), guest_id)
+        self._entries[guest_id] = entry
+        self._sort_keys[guest_id] = sort_key
+        if keep_order:
+            bisect.insort(self._ordered, sort_key)
+        self._grams[guest_id] = grams
+        for gram in grams:
+            self._postings[gram].add(guest_id)
+        for key in {guest_id.lower(), entry["number"].lower()}:
+            if key:
+                self._exact[key].add(guest_id)
+
+    def _remove(self, guest_id: str) -> None:
+        entry = self._entries.pop(guest_id, None)
+        if entry is None:
+            return
+        sort_key = self._sort_keys.pop(guest_id)
+        position = bisect.bisect_left(self._ordered, sort_key)
+        if position < len(self._ordered) and self._ordered[position] == sort_key:
+            del self._ordered[position]
+        for gram in self._grams.pop(guest_id, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(guest_id)
+                if not posting:
+                    del self._postings[gram]
+        for key in {guest_id.lower(), entry["number"].lower()}:
+            matches = self._exact.get(key)
+            if matches is not None:
+                matches.discard(guest_id)
+                if not matches:
+                    del self._exact[key]
+
+    def _rebuild(self, version: int) -> None:
+        self.reset()
+        for entry in build_shell_search_entries():
+            self._add(entry, keep_order=False)
+        self._ordered = sorted(self._sort_keys.values())
+        self.version = version
+
+    def sync(self) -> None:
+        """Bring the index up to the latest revision, patching it with a delta when possible."""
+        version = current_search_index_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if self.version is None:
+                self._rebuild(version)
+                return
+            if version == self.version:
+                return
+            delta = build_search_index_delta(self.version)
+            if delta["full"]:
+                self._rebuild(delta["version"])
+                return
+            for guest_id in delta["removed"]:
+                self._remove(guest_id)
+            for entry in delta["entries"]:
+                self._add(entry)
+            self.version = delta["version"]
+
+    def _take_in_order(self, postings: List[set], limit: int, skip: set) -> List[str]:
+        """Walk guests in name order and return the first ones contained in every posting."""
+        found = []
+        for _, guest_id in self._ordered:
+            if guest_id in skip:
+                continue
+            if all(guest_id in posting for posting in postings):
+                found.append(guest_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Return the best matching entries: exact code or number hits, then by trigram similarity and name."""
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+        query_grams = set()
+        for index, token in enumerate(tokens):
+            query_grams |= _token_grams(token, prefix=index == len(tokens) - 1)
+
+        with self._lock:
+            sort_key = self._sort_keys.__getitem__
+            exact = self._exact.get(" ".join(tokens), set())
+            results = heapq.nsmallest(limit, exact, key=sort_key)
+            postings = sorted((self._postings.get(gram, set()) for gram in query_grams), key=len)
+
+            if len(postings[0]) * self.DENSE_FACTOR >= len(self._entries):
+                results.extend(self._take_in_order(postings, limit - len(results), exact))
+                if len(results) >= limit:
+                    return [self._entries[guest_id] for guest_id in results]
+            full_matches = set.intersection(*postings)
+            results.extend(heapq.nsmallest(limit - len(results), full_matches - set(results), key=sort_key))
+
+            # Short queries leave no room for typos; longer ones may miss up to (1 - min_score) of their trigrams.
+            total = len(postings)
+            needed = total if total <= 3 else math.ceil(self.min_score * total)
+            if len(results) >= limit or needed == total:
+                return [self._entries[guest_id] for guest_id in results]
+
+            # Every fuzzy candidate shares at least one of the rarest (total - needed + 1) trigrams.
+            candidates = set().union(*postings[:total - needed + 1]) - full_matches - exact
+            counts = Counter()
+            for posting in postings:
+                counts.update(posting & candidates)
+            by_count = defaultdict(list)
+            for guest_id, count in counts.items():
+                if count >= needed:
+                    by_count[count].append(guest_id)
+            for count in sorted(by_count, reverse=True):
+                if len(results) >= limit:
+                    break
+                results.extend(heapq.nsmallest(limit - len(results), by_count[count], key=sort_key))
+            return [self._entries[guest_id] for guest_id in results]
+
+
+guest_search_engine = GuestSearchEngine()
@@ -0,0 +1,179 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import db, CacheRevision, Setting
+
+SETTINGS_REVISION = "settings"
+# Revision names a session bumps once its transaction has committed.
+_BUMP_AFTER_COMMIT_KEY = "cache_revisions_after_commit"
+
+
+def bump_revision(connection, name: str) -> None:
+    """
+    Increment the revision counter of a cached data set, creating its row on first use.
+    A single upsert, so two transactions bumping a new name cannot both try to insert it.
+    """
+    table = CacheRevision.__table__
+    now = datetime.utcnow()
+    if connection.dialect.name == "mysql":
+        stmt = mysql.insert(table).values(name=name, revision=1, updated_on=now)
+        stmt = stmt.on_duplicate_key_update(revision=table.c.revision + 1, updated_on=now)
+    else:
+        stmt = sqlite.insert(table).values(name=name, revision=1, updated_on=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"revision": table.c.revision + 1, "updated_on": now},
+        )
+    connection.execute(stmt)
+
+
+def bump_revision_after_commit(session, names) -> None:
+    """
+    Bump the given revisions in a short transaction of their own once `session` commits.
+    Bumping inside the writing transaction would hold the shared counter rows locked until its
+    commit and serialize all writers on them; a process dying between commit and bump leaves a
+    cache stale only until the next change.
+    """
+    session.info.setdefault(_BUMP_AFTER_COMMIT_KEY, set()).update(names)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_revisions_after_commit(session):
+    names = session.info.pop(_BUMP_AFTER_COMMIT_KEY, None)
+    if not names:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            # A fixed order keeps two sessions bumping the same names from deadlocking.
+            for name in sorted(names):
+                bump_revision(connection, name)
+    except SQLAlchemyError:
+        current_app.logger.exception("Cache revisions %s could not be bumped", sorted(names))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_revisions_after_rollback(session):
+    session.info.pop(_BUMP_AFTER_COMMIT_KEY, None)
+
+
+def read_revision(name: str) -> int:
+    table = CacheRevision.__table__
+    return db.session.execute(select(table.c.revision).where(table.c.name == name)).scalar() or 0
+
+
+def read_revisions(prefix: str) -> dict:
+    """Return all revision counters whose name starts with `prefix` in one query."""
+    table = CacheRevision.__table__
+    rows = db.session.execute(
+        select(table.c.name, table.c.revision).where(table.c.name.startswith(prefix, autoescape=True))
+    )
+    return {name: revision for name, revision in rows}
+
+
+class RevisionWatch:
+    """
+    Notices bumps of a shared revision by other workers for a per-process cache,
+    reading the revision at most every ``poll_seconds``.
+    """
+
+    def __init__(self, name: str, poll_seconds: float = 5.0):
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self.revision = None
+        self._checked_at = None
+
+    def loading(self) -> None:
+        """Remember the current revision; call right before the cache loads its rows."""
+        self.revision = read_revision(self.name)
+        self._checked_at = time.monotonic()
+
+    def changed(self) -> bool:
+        """True if the revision moved since the rows were loaded; errors count as unchanged."""
+        now = time.monotonic()
+        if self.revision is None or (self._checked_at is not None and now - self._checked_at < self.poll_seconds):
+            return False
+        self._checked_at = now
+        try:
+            return read_revision(self.name) != self.revision
+        except SQLAlchemyError:
+            db.session.rollback()
+            current_app.logger.exception("Revision check of %s failed", self.name)
+            return False
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_setting_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Setting):
+            bump_revision_after_commit(session, {SETTINGS_REVISION})
+            return
+
+
+class SettingsCache:
+    """
+    Per-process copy of the settings table kept in ``app.config["SETTINGS"]``.
+    Workers compare the shared settings revision at most every ``poll_seconds`` and reload on change.
+    """
+
+    def __init__(self, app, poll_seconds: float = 5.0):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self.revision = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "checks": 0,
+            "skipped_checks": 0,
+            "reloads": 0,
+            "check_errors": 0,
+            "last_check_at": None,
+            "last_reload_at": None,
+        }
+
+    def reload(self) -> None:
+        """Load all settings and remember the revision they belong to."""
+        with self._lock:
+            revision = read_revision(SETTINGS_REVISION)
+            settings = {}
+            for row in Setting.query.all():
+                settings[row.setting_key] = {
+                    "value": row.value,
+                    "description": row.description,
+                }
+            self.app.config["SETTINGS"] = settings
+            self.revision = revision
+            self._checked_at = time.monotonic()
+            self._metrics["reloads"] += 1
+            self._metrics["last_reload_at"] = datetime.utcnow().isoformat(timespec="seconds")
+
+    def ensure_fresh(self) -> None:
+        """Reload the settings if another worker changed them since the last check."""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.poll_seconds:
+            self._metrics["skipped_checks"] += 1
+            return
+        self._checked_at = now
+        self._metrics["checks"] += 1
+        self._metrics["last_check_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        try:
+            revision = read_revision(SETTINGS_REVISION)
+            if revision != self.revision:
+                self.reload()
+        except SQLAlchemyError:
+            db.session.rollback()
+            self._metrics["check_errors"] += 1
+            self.app.logger.exception("Settings revision check failed")
+
+    def metrics(self) -> dict:
+        return {
+            **self._metrics,
+            "revision": self.revision,
+            "poll_seconds": self.poll_seconds,
+        }
@@ -0,0 +1,229 @@
+import mimetypes
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional
+
+# GCS composes at most 32 source objects per request.
+GCS_COMPOSE_LIMIT = 32
+COPY_BUFFER_BYTES = 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class ObjectInfo(NamedTuple):
+    size: int
+    content_type: str
+    etag: str
+    generation: Optional[int] = None
+
+
+class StorageBackend:
+    """
+    Object storage used for attachments; paths are bucket object names like ``guest/<id>/<file>``.
+    Object metadata is kept in a bounded LRU so a download looks the object up only once;
+    writes and deletes through the backend drop the entry.
+    """
+
+    def __init__(self, info_cache_entries: int = 4096):
+        self.info_cache_entries = info_cache_entries
+        self._info = OrderedDict()
+        self._info_lock = threading.Lock()
+
+    def put(self, path: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def compose(self, path: str, sources: Iterable[str], content_type: Optional[str] = None) -> None:
+        """Write the concatenation of ``sources`` (in order) to ``path``."""
+        raise NotImplementedError
+
+    def delete(self, path: str) -> None:
+        raise NotImplementedError
+
+    def delete_many(self, paths: Iterable[str]) -> None:
+        for path in paths:
+            self.delete(path)
+
+    def list_sizes(self, prefix: str) -> Dict[str, int]:
+        """Sizes of all objects whose name starts with ``prefix``, keyed by object name."""
+        raise NotImplementedError
+
+    def signed_upload_url(
+        self, path: str, expires_minutes: int, content_type: str = "application/octet-stream"
+    ) -> Optional[str]:
+        """A URL the browser can PUT the object to directly, or None if the backend cannot sign one."""
+        return None
+
+    def _stat(self, path: str) -> ObjectInfo:
+        raise NotImplementedError
+
+    def iter_range(
+        self, path: str, start: int, stop: int, info: ObjectInfo, chunk_size: int = DOWNLOAD_CHUNK_BYTES
+    ) -> Iterator[bytes]:
+        """Yield bytes ``start`` up to (excluding) ``stop`` of the object in pieces of ``chunk_size``."""
+        raise NotImplementedError
+
+    def stat(self, path: str) -> ObjectInfo:
+        """Size, content type and ETag of an object; raises FileNotFoundError if it does not exist."""
+        with self._info_lock:
+            info = self._info.get(path)
+            if info is not None:
+                self._info.move_to_end(path)
+                return info
+        info = self._stat(path)
+        with self._info_lock:
+            self._info[path] = info
+            self._info.move_to_end(path)
+            while len(self._info) > self.info_cache_entries:
+                self._info.popitem(last=False)
+        return info
+
+    def read(self, path: str) -> bytes:
+        """The whole object; meant for small objects such as thumbnails."""
+        info = self.stat(path)
+        return b"".join(self.iter_range(path, 0, info.size, info))
+
+    def forget(self, path: str) -> None:
+        with self._info_lock:
+            self._info.pop(path, None)
+
+
+class GCSStorage(StorageBackend):
+    """Attachments in a Google Cloud Storage bucket."""
+
+    def __init__(self, bucket, **kwargs):
+        super().__init__(**kwargs)
+        self.bucket = bucket
+
+    def put(self, path, stream, content_type=None):
+        self.forget(path)
+        self.bucket.blob(path).upload_from_file(stream, content_type=content_type)
+
+    def compose(self, path, sources, content_type=None):
+        # Composing happens inside GCS, so no part data passes through this process.
+        self.forget(path)
+        sources = [self.bucket.blob(source) for source in sources]
+        destination = self.bucket.blob(path)
+        destination.content_type = content_type
+        destination.compose(sources[:GCS_COMPOSE_LIMIT])
+        remaining = sources[GCS_COMPOSE_LIMIT:]
+        while remaining:
+            destination.compose([destination] + remaining[:GCS_COMPOSE_LIMIT - 1])
+            remaining = remaining[GCS_COMPOSE_LIMIT - 1:]
+
+    def delete(self, path):
+        self.forget(path)
+        self.bucket.blob(path).delete()
+
+    def delete_many(self, paths):
+        from google.api_core.exceptions import NotFound
+
+        for path in paths:
+            self.forget(path)
+            try:
+                self.bucket.blob(path).delete()
+            except NotFound:
+                pass
+
+    def list_sizes(self, prefix):
+        return {blob.name: blob.size for blob in self.bucket.list_blobs(prefix=prefix)}
+
+    def signed_upload_url(self, path, expires_minutes, content_type="application/octet-stream"):
+        self.forget(path)
+        return self.bucket.blob(path).generate_signed_url(
+            expiration=timedelta(minutes=expires_minutes),
+            method="PUT",
+            content_type=content_type,
+            version="v4",
+        )
+
+    def _stat(self, path):
+        blob = self.bucket.get_blob(path)
+        if blob is None:
+            raise FileNotFoundError(path)
+        return ObjectInfo(
+            size=blob.size,
+            content_type=blob.content_type or "application/octet-stream",
+            etag=blob.etag,
+            generation=blob.generation,
+        )
+
+    def iter_range(self, path, start, stop, info, chunk_size=DOWNLOAD_CHUNK_BYTES):
+        # Pin the generation so a replaced object never mixes into a running download.
+        blob = self.bucket.blob(path, generation=info.generation)
+        for offset in range(start, stop, chunk_size):
+            # GCS range ends are inclusive.
+            yield blob.download_as_bytes(start=offset, end=min(offset + chunk_size, stop) - 1)
+
+
+class LocalStorage(StorageBackend):
+    """Attachments in a local directory; stands in for the bucket in tests and local setups."""
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Ungültiger Speicherpfad: {path}")
+        return full_path
+
+    def put(self, path, stream, content_type=None):
+        self.forget(path)
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(f"{full_path}.part", "wb") as fh:
+            shutil.copyfileobj(stream, fh, COPY_BUFFER_BYTES)
+        os.replace(f"{full_path}.part", full_path)
+
+    def compose(self, path, sources, content_type=None):
+        self.forget(path)
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(f"{full_path}.part", "wb") as out:
+            for source in sources:
+                with open(self._full_path(source), "rb") as fh:
+                    shutil.copyfileobj(fh, out, COPY_BUFFER_BYTES)
+        os.replace(f"{full_path}.part", full_path)
+
+    def delete(self, path):
+        self.forget(path)
+        try:
+            os.remove(self._full_path(path))
+        except FileNotFoundError:
+            pass
+
+    def list_sizes(self, prefix):
+        sizes = {}
+        base = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        for directory, _, filenames in os.walk(self._full_path(base) if base else self.root):
+            for filename in filenames:
+                if filename.endswith(".part"):
+                    continue
+                full_path = os.path.join(directory, filename)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                if path.startswith(prefix):
+                    sizes[path] = os.path.getsize(full_path)
+        return sizes
+
+    def _stat(self, path):
+        stat = os.stat(self._full_path(path))
+        return ObjectInfo(
+            size=stat.st_size,
+            content_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+            etag=f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+        )
+
+    def iter_range(self, path, start, stop, info, chunk_size=DOWNLOAD_CHUNK_BYTES):
+        with open(self._full_path(path), "rb") as fh:
+            fh.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                data = fh.read(min(chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import threading
+from contextlib import contextmanager
+from typing import List, NamedTuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Bump when the rendering below changes so browsers and storage pick up new thumbnails.
+THUMBNAIL_VERSION = 1
+THUMBNAIL_SIZES = {"small": 160, "medium": 480}
+THUMBNAIL_QUALITY = 80
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp")
+
+
+class ThumbnailFormat(NamedTuple):
+    pil_format: str
+    mimetype: str
+
+
+THUMBNAIL_FORMATS = {
+    "webp": ThumbnailFormat("WEBP", "image/webp"),
+    "jpeg": ThumbnailFormat("JPEG", "image/jpeg"),
+}
+
+
+class ThumbnailError(Exception):
+    """The original is not an image Pillow can read."""
+
+
+def is_image_filename(filename: str) -> bool:
+    return "." in (filename or "") and filename.lower().rsplit(".", 1)[1] in IMAGE_EXTENSIONS
+
+
+def thumbnail_path(gcs_path: str, size: str, fmt: str) -> str:
+    """Object name of a thumbnail, stored next to its original: guest/<id>/<uuid>.thumb-<edge>.<fmt>."""
+    base = gcs_path.rsplit(".", 1)[0] if "." in gcs_path.rsplit("/", 1)[-1] else gcs_path
+    return f"{base}.thumb-v{THUMBNAIL_VERSION}-{THUMBNAIL_SIZES[size]}.{fmt}"
+
+
+def thumbnail_paths(gcs_path: str) -> List[str]:
+    return [thumbnail_path(gcs_path, size, fmt) for size in THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS]
+
+
+def thumbnail_etag(gcs_path: str, size: str, fmt: str) -> str:
+    """Attachments never change under the same object name, so the ETag needs no storage lookup."""
+    return hashlib.sha1(thumbnail_path(gcs_path, size, fmt).encode("utf-8")).hexdigest()
+
+
+def render_thumbnail(data: bytes, size: str, fmt: str) -> bytes:
+    """Scale an image into a square of THUMBNAIL_SIZES[size] pixels, honouring the EXIF orientation."""
+    edge = THUMBNAIL_SIZES[size]
+    target = THUMBNAIL_FORMATS[fmt]
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # draft() lets the JPEG decoder skip most of the pixels of large photos.
+            image.draft("RGB", (edge * 2, edge * 2))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            if target.pil_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                else:
+                    image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, format=target.pil_format, quality=THUMBNAIL_QUALITY, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ThumbnailError(str(exc)) from exc
+    return out.getvalue()
+
+
+# path -> [lock, number of threads holding or waiting for it]
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _render_lock(path: str):
+    """Serialise renders of one path; the entry is dropped once the last waiter is done."""
+    with _render_locks_guard:
+        entry = _render_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _render_locks[path]
+
+
+def ensure_thumbnail(storage, gcs_path: str, size: str, fmt: str) -> bytes:
+    """
+    Return the thumbnail bytes, rendering and storing them on first use.
+    Raises FileNotFoundError if the original is gone and ThumbnailError if it is no image.
+    """
+    path = thumbnail_path(gcs_path, size, fmt)
+    # One render per thumbnail and process; concurrent requests wait for the first.
+    with _render_lock(path):
+        try:
+            return storage.read(path)
+        except FileNotFoundError:
+            pass
+        data = render_thumbnail(storage.read(gcs_path), size, fmt)
+        storage.put(path, io.BytesIO(data), content_type=THUMBNAIL_FORMATS[fmt].mimetype)
+        return data
@@ -13,3 +13,71 @@ DB_PASSWORD = os.environ['DB_PASSWORD']
 
 # GCS
 GCS_BUCKET_NAME = os.environ["GCS_BUCKET_NAME"]
+
+# Seconds between checks of the shared settings, field registry and payment package
+# revisions in each worker.
+SETTINGS_POLL_SECONDS = float(os.environ.get("SETTINGS_POLL_SECONDS", 5))
+
+# Guest card PDFs are rendered by a background print job and kept in CARD_PRINT_DIR (default: a
+# directory in the system temp dir) for CARD_PRINT_KEEP_HOURS; jobs still unfinished after
+# CARD_PRINT_JOB_STALE_MINUTES are failed at startup. Print runs with at least
+# GUEST_CARD_PARALLEL_MIN_CARDS cards are rendered on a pool of GUEST_CARD_PDF_WORKERS processes;
+# 1, the default, renders in the print job's thread.
+CARD_PRINT_DIR = os.environ.get("CARD_PRINT_DIR")
+CARD_PRINT_KEEP_HOURS = int(os.environ.get("CARD_PRINT_KEEP_HOURS", 24))
+CARD_PRINT_JOB_STALE_MINUTES = int(os.environ.get("CARD_PRINT_JOB_STALE_MINUTES", 30))
+GUEST_CARD_PDF_WORKERS = int(os.environ.get("GUEST_CARD_PDF_WORKERS", 1))
+GUEST_CARD_PARALLEL_MIN_CARDS = int(os.environ.get("GUEST_CARD_PARALLEL_MIN_CARDS", 200))
+
+# Start the email job runner, the card print cleanup and the upload sweeper when the app is created,
+# picking up work left behind by a previous process. Only the web server sets this (see Dockerfile);
+# CLI scripts and the debug reloader's watcher process leave it off so they never requeue or claim jobs.
+BACKGROUND_WORKERS_AUTOSTART = os.environ.get("BACKGROUND_WORKERS_AUTOSTART", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Bulk guest card emails: concurrent senders, Brevo rate limit (emails per second),
+# retries with exponential backoff and how many results are written back at once.
+# Running jobs without progress for EMAIL_JOB_STALE_MINUTES are queued again.
+EMAIL_JOB_WORKERS = int(os.environ.get("EMAIL_JOB_WORKERS", 4))
+EMAIL_JOB_RATE_PER_SECOND = float(os.environ.get("EMAIL_JOB_RATE_PER_SECOND", 5))
+EMAIL_JOB_MAX_ATTEMPTS = int(os.environ.get("EMAIL_JOB_MAX_ATTEMPTS", 3))
+EMAIL_JOB_BACKOFF_SECONDS = float(os.environ.get("EMAIL_JOB_BACKOFF_SECONDS", 2))
+EMAIL_JOB_BATCH_SIZE = int(os.environ.get("EMAIL_JOB_BATCH_SIZE", 25))
+EMAIL_JOB_STALE_MINUTES = int(os.environ.get("EMAIL_JOB_STALE_MINUTES", 10))
+
+# Attachment storage: "gcs" (default) or "local" with files under LOCAL_STORAGE_PATH.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "gcs")
+LOCAL_STORAGE_PATH = os.environ.get("LOCAL_STORAGE_PATH")
+
+# Browser uploads are sent in ATTACHMENT_CHUNK_BYTES parts. With ATTACHMENT_UPLOAD_MODE "direct"
+# the browser PUTs them straight into the bucket through signed URLs valid for
+# ATTACHMENT_UPLOAD_URL_MINUTES (the bucket needs a CORS rule allowing PUT from the app's origin);
+# "proxy", or a storage that cannot sign URLs, sends them one at a time through the app.
+# Direct uploads of files of at least ATTACHMENT_PARALLEL_MIN_BYTES send ATTACHMENT_PARALLEL_PARTS parts at once.
+# Parts are assembled by ATTACHMENT_FINALIZE_WORKERS background threads.
+ATTACHMENT_UPLOAD_MODE = os.environ.get("ATTACHMENT_UPLOAD_MODE", "direct")
+ATTACHMENT_UPLOAD_URL_MINUTES = int(os.environ.get("ATTACHMENT_UPLOAD_URL_MINUTES", 60))
+ATTACHMENT_CHUNK_BYTES = int(os.environ.get("ATTACHMENT_CHUNK_BYTES", 8 * 1024 * 1024))
+ATTACHMENT_PARALLEL_MIN_BYTES = int(os.environ.get("ATTACHMENT_PARALLEL_MIN_BYTES", 32 * 1024 * 1024))
+ATTACHMENT_PARALLEL_PARTS = int(os.environ.get("ATTACHMENT_PARALLEL_PARTS", 4))
+ATTACHMENT_FINALIZE_WORKERS = int(os.environ.get("ATTACHMENT_FINALIZE_WORKERS", 2))
+# Every ATTACHMENT_UPLOAD_SWEEP_SECONDS each worker resubmits uploads stuck in "finalizing" for
+# ATTACHMENT_FINALIZE_STALE_MINUTES, expires uploads older than ATTACHMENT_UPLOAD_EXPIRE_HOURS
+# that were never completed and deletes staging parts that are no longer needed.
+ATTACHMENT_FINALIZE_STALE_MINUTES = int(os.environ.get("ATTACHMENT_FINALIZE_STALE_MINUTES", 10))
+ATTACHMENT_UPLOAD_EXPIRE_HOURS = int(os.environ.get("ATTACHMENT_UPLOAD_EXPIRE_HOURS", 48))
+ATTACHMENT_UPLOAD_SWEEP_SECONDS = float(os.environ.get("ATTACHMENT_UPLOAD_SWEEP_SECONDS", 300))
+
+# Downloads: "proxy" streams the object in ATTACHMENT_DOWNLOAD_CHUNK_BYTES pieces (with Range
+# support), "redirect" sends the browser to a signed GCS URL valid for ATTACHMENT_SIGNED_URL_MINUTES.
+ATTACHMENT_DOWNLOAD_MODE = os.environ.get("ATTACHMENT_DOWNLOAD_MODE", "proxy")
+ATTACHMENT_DOWNLOAD_CHUNK_BYTES = int(os.environ.get("ATTACHMENT_DOWNLOAD_CHUNK_BYTES", 1024 * 1024))
+ATTACHMENT_SIGNED_URL_MINUTES = int(os.environ.get("ATTACHMENT_SIGNED_URL_MINUTES", 10))
+
+# Exports fetch EXPORT_CHUNK_ROWS rows per query round trip and are buffered in memory
+# up to EXPORT_SPOOL_MAX_BYTES before spilling to a temporary file.
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))
+EXPORT_SPOOL_MAX_BYTES = int(os.environ.get("EXPORT_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
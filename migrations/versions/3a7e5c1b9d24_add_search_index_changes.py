@@ -0,0 +1,33 @@
+"""add search index changes
+
+Revision ID: 3a7e5c1b9d24
+Revises: 91d4a7f6c2b8
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "3a7e5c1b9d24"
+down_revision: Union[str, None] = "91d4a7f6c2b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_index_changes",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("guest_id", sa.String(length=255), nullable=False),
+        sa.Column("changed_on", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_search_index_changes_guest_id"), "search_index_changes", ["guest_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_search_index_changes_guest_id"), table_name="search_index_changes")
+    op.drop_table("search_index_changes")
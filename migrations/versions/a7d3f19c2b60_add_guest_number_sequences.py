@@ -0,0 +1,31 @@
+"""add guest number sequences
+
+Revision ID: a7d3f19c2b60
+Revises: e4b9a2c7d113
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a7d3f19c2b60"
+down_revision: Union[str, None] = "e4b9a2c7d113"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "guest_number_sequences",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("updated_on", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("guest_number_sequences")
@@ -0,0 +1,40 @@
+"""add search index change revision
+
+Revision ID: a8e4f0b3c527
+Revises: f1c83b5d7a29
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a8e4f0b3c527"
+down_revision: Union[str, None] = "f1c83b5d7a29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("search_index_changes", sa.Column("revision", sa.Integer(), nullable=True))
+    op.create_index(
+        op.f("ix_search_index_changes_revision"), "search_index_changes", ["revision"], unique=False
+    )
+    # Existing rows keep their id as revision; the counter continues from there.
+    op.execute("UPDATE search_index_changes SET revision = id")
+    connection = op.get_bind()
+    current = connection.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM search_index_changes")).scalar()
+    connection.execute(sa.text("DELETE FROM cache_revisions WHERE name = 'search_index'"))
+    connection.execute(
+        sa.text("INSERT INTO cache_revisions (name, revision, updated_on) VALUES ('search_index', :revision, :now)"),
+        {"revision": current, "now": datetime.utcnow()},
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM cache_revisions WHERE name = 'search_index'")
+    op.drop_index(op.f("ix_search_index_changes_revision"), table_name="search_index_changes")
+    op.drop_column("search_index_changes", "revision")
@@ -0,0 +1,60 @@
+"""add attachment uploads
+
+Revision ID: b3e5c8d2f914
+Revises: a7d3f19c2b60
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b3e5c8d2f914"
+down_revision: Union[str, None] = "a7d3f19c2b60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "attachment_uploads",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("owner_id", sa.String(length=255), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("content_type", sa.String(length=255), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("chunk_size", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("gcs_path", sa.String(length=512), nullable=True),
+        sa.Column("attachment_id", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), nullable=True),
+        sa.Column("created_on", sa.DateTime(), nullable=False),
+        sa.Column("finished_on", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["attachment_id"], ["attachments.id"], name="fk_attachment_uploads_attachment_id", ondelete="SET NULL"
+        ),
+        sa.ForeignKeyConstraint(["created_by_id"], ["users.id"], name="fk_attachment_uploads_created_by_id"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "attachment_upload_parts",
+        sa.Column("upload_id", sa.String(length=32), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("received_on", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["upload_id"],
+            ["attachment_uploads.id"],
+            name="fk_attachment_upload_parts_upload_id",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("upload_id", "part_number"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("attachment_upload_parts")
+    op.drop_table("attachment_uploads")
@@ -0,0 +1,25 @@
+"""add email job claim_token
+
+Revision ID: c6d2b8e17f40
+Revises: a8e4f0b3c527
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c6d2b8e17f40"
+down_revision: Union[str, None] = "a8e4f0b3c527"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("email_jobs", sa.Column("claim_token", sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("email_jobs", "claim_token")
@@ -0,0 +1,25 @@
+"""add attachment upload finalize_requested_on
+
+Revision ID: d4a7e2c91b06
+Revises: b3e5c8d2f914
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d4a7e2c91b06"
+down_revision: Union[str, None] = "b3e5c8d2f914"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("attachment_uploads", sa.Column("finalize_requested_on", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("attachment_uploads", "finalize_requested_on")
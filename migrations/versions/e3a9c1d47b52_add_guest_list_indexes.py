@@ -0,0 +1,26 @@
+"""add guest list keyset indexes
+
+Revision ID: e3a9c1d47b52
+Revises: c6d2b8e17f40
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "e3a9c1d47b52"
+down_revision: Union[str, None] = "c6d2b8e17f40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_guests_list_name", "guests", ["lifecycle_status", "lastname", "firstname"])
+    op.create_index("ix_guests_list_number", "guests", ["lifecycle_status", "number"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_guests_list_number", table_name="guests")
+    op.drop_index("ix_guests_list_name", table_name="guests")
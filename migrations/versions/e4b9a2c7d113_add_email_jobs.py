@@ -0,0 +1,62 @@
+"""add email jobs
+
+Revision ID: e4b9a2c7d113
+Revises: c81f0e2a4d57
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e4b9a2c7d113"
+down_revision: Union[str, None] = "c81f0e2a4d57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("sent", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), nullable=True),
+        sa.Column("created_on", sa.DateTime(), nullable=False),
+        sa.Column("started_on", sa.DateTime(), nullable=True),
+        sa.Column("finished_on", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["created_by_id"], ["users.id"], name="fk_email_jobs_created_by_id"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_email_jobs_status", "email_jobs", ["status"], unique=False)
+    op.create_table(
+        "email_job_items",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("guest_id", sa.String(length=255), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("sent_on", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["job_id"], ["email_jobs.id"], name="fk_email_job_items_job_id", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_email_job_items_job_id_status", "email_job_items", ["job_id", "status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_job_items_job_id_status", table_name="email_job_items")
+    op.drop_table("email_job_items")
+    op.drop_index("ix_email_jobs_status", table_name="email_jobs")
+    op.drop_table("email_jobs")
@@ -0,0 +1,25 @@
+"""add email job heartbeat_on
+
+Revision ID: f1c83b5d7a29
+Revises: d4a7e2c91b06
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "f1c83b5d7a29"
+down_revision: Union[str, None] = "d4a7e2c91b06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("email_jobs", sa.Column("heartbeat_on", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("email_jobs", "heartbeat_on")
@@ -0,0 +1,43 @@
+"""add card print jobs
+
+Revision ID: f7c2d5a91e08
+Revises: e3a9c1d47b52
+Create Date: 2026-10-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "f7c2d5a91e08"
+down_revision: Union[str, None] = "e3a9c1d47b52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "card_print_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("guest_ids", sa.Text(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("double_sided", sa.Boolean(), nullable=False),
+        sa.Column("flip_backside", sa.Boolean(), nullable=False),
+        sa.Column("file_path", sa.String(length=1024), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), nullable=True),
+        sa.Column("created_on", sa.DateTime(), nullable=False),
+        sa.Column("started_on", sa.DateTime(), nullable=True),
+        sa.Column("finished_on", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["created_by_id"], ["users.id"], name="fk_card_print_jobs_created_by_id"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_card_print_jobs_status", "card_print_jobs", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_card_print_jobs_status", table_name="card_print_jobs")
+    op.drop_table("card_print_jobs")
@@ -1,5 +1,7 @@
 import os
 import sys
+import uuid
+from datetime import date
 from pathlib import Path
 from typing import Generator
 
@@ -12,7 +14,7 @@ if str(ROOT_DIR) not in sys.path:
 from app import create_app
 from sqlalchemy import Date, DateTime
 
-from app.models import db, FieldRegistry, Setting
+from app.models import db, FieldRegistry, Guest, Setting
 
 
 def _set_test_env_defaults() -> None:
@@ -52,6 +54,26 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture
+def make_guest():
+    """Factory for unsaved guests with the required columns filled; keyword arguments override them."""
+    def _make(guest_id: str = None, number: str = None, **fields) -> Guest:
+        guest_id = guest_id or uuid.uuid4().hex[:6].upper()
+        values = {
+            "id": guest_id,
+            "number": number or f"N-{guest_id}",
+            "firstname": "Test",
+            "lastname": number or guest_id,
+            "member_since": date.today(),
+            "created_on": date.today(),
+            "updated_on": date.today(),
+        }
+        values.update(fields)
+        return Guest(**values)
+
+    return _make
+
+
 @pytest.fixture(autouse=True)
 def _clean_db(app):
     with app.app_context():
@@ -1,12 +1,17 @@
+import csv
 import io
 import os
 import uuid
+import zipfile
 from datetime import date
 
 import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash
 
-from app.models import Guest, User, db
+from app.models import Guest, SearchIndexChange, User, db
 
 
 def _create_user(username: str, password: str, role: str = "admin") -> None:
@@ -134,6 +139,125 @@ def test_admin_import_confirm(client, app, tmp_path):
     assert "Import erfolgreich".encode("utf-8") in response.data
 
 
+def test_admin_import_parses_workbook_once(client, app, monkeypatch):
+    from app.routes.admin import import_export_routes
+
+    _bootstrap_login(client, app)
+    number = f"G-{uuid.uuid4().hex[:6]}"
+    source = io.BytesIO()
+    with pd.ExcelWriter(source, engine="openpyxl") as writer:
+        pd.DataFrame(
+            [{"nummer": number, "vorname": "Einmal", "nachname": number, "eintritt": "01.03.2024"}]
+        ).to_excel(writer, sheet_name="gaeste", index=False)
+        pd.DataFrame([{"gast_nummer": number, "art": "Katze", "name": "Mimi"}]).to_excel(
+            writer, sheet_name="tiere", index=False
+        )
+    source.seek(0)
+    filename = f"single_pass_{number}.xlsx"
+    response = client.post(
+        "/admin/import",
+        data={"file": (source, filename)},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    assert os.path.exists(os.path.join("tmp", f"{filename}.parsed.json"))
+
+    def _no_workbook(*args, **kwargs):
+        raise AssertionError("workbook parsed again")
+
+    monkeypatch.setattr(import_export_routes, "load_workbook", _no_workbook)
+    try:
+        preview = client.get(f"/admin/import/preview?filepath={filename}")
+        assert preview.status_code == 200
+        assert number.encode("utf-8") in preview.data
+
+        confirm = client.get(f"/admin/import/confirm?filepath={filename}", follow_redirects=True)
+        assert "Import erfolgreich".encode("utf-8") in confirm.data
+        with app.app_context():
+            guest = Guest.query.filter_by(number=number).one()
+            assert guest.member_since == date(2024, 3, 1)
+            assert [animal.name for animal in guest.animals] == ["Mimi"]
+    finally:
+        for path in (os.path.join("tmp", filename), os.path.join("tmp", f"{filename}.parsed.json")):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_admin_import_confirm_bulk_inserts(client, app):
+    from app.search_index import current_search_index_version
+
+    _bootstrap_login(client, app)
+    prefix = f"B{uuid.uuid4().hex[:6]}"
+    guests = [
+        {"nummer": f"{prefix}-{index}", "vorname": "Bulk", "nachname": f"{prefix}-{index}",
+         "vertreter_name": "Vertretung" if index == 0 else None}
+        for index in range(30)
+    ]
+    animals = [{"gast_nummer": f"{prefix}-{index}", "art": "Hund", "name": f"Hund {index}"} for index in range(30)]
+    filename = f"bulk_{prefix}.xlsx"
+    path = os.path.join("tmp", filename)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame(guests).to_excel(writer, sheet_name="gaeste", index=False)
+        pd.DataFrame(animals).to_excel(writer, sheet_name="tiere", index=False)
+
+    with app.app_context():
+        version_before = current_search_index_version()
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    try:
+        response = client.get(f"/admin/import/confirm?filepath={filename}", follow_redirects=False)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _count)
+        for leftover in (path, f"{path}.parsed.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    assert response.status_code == 302
+    assert len(statements) < 30
+
+    with app.app_context():
+        imported = Guest.query.filter(Guest.number.like(f"{prefix}-%")).all()
+        assert len(imported) == 30
+        assert sum(len(guest.animals) for guest in imported) == 30
+        assert sum(len(guest.representative) for guest in imported) == 1
+        version = current_search_index_version()
+        assert version > version_before
+        assert SearchIndexChange.query.filter(
+            SearchIndexChange.guest_id.in_([guest.id for guest in imported]),
+            SearchIndexChange.revision == version,
+        ).count() == 30
+
+
+def test_admin_import_numbers_guests_without_number(client, app):
+    from app.guest_numbers import current_guest_number_pattern
+
+    _bootstrap_login(client, app)
+    lastname = f"Ohne-{uuid.uuid4().hex[:6]}"
+    filename = f"numbers_{lastname}.xlsx"
+    path = os.path.join("tmp", filename)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame([{"nummer": None, "vorname": "Neu", "nachname": lastname}]).to_excel(
+            writer, sheet_name="gaeste", index=False
+        )
+        pd.DataFrame([], columns=["gast_nummer"]).to_excel(writer, sheet_name="tiere", index=False)
+    try:
+        preview = client.get(f"/admin/import/preview?filepath={filename}")
+        assert "ohne Gastnummer".encode("utf-8") in preview.data
+        response = client.get(f"/admin/import/confirm?filepath={filename}", follow_redirects=True)
+        assert "Import erfolgreich".encode("utf-8") in response.data
+    finally:
+        for leftover in (path, f"{path}.parsed.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    with app.app_context():
+        guest = Guest.query.filter_by(lastname=lastname).one()
+        assert current_guest_number_pattern().counter_of(guest.number) is not None
+
+
 def test_admin_export_get(client, app):
     _bootstrap_login(client, app)
     response = client.get("/admin/export", follow_redirects=True)
@@ -179,3 +303,119 @@ def test_admin_export_post_with_selection(client, app):
     )
     assert response.status_code == 200
     assert response.mimetype == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def test_admin_export_streams_rows_in_chunks(client, app, monkeypatch, make_guest):
+    _bootstrap_login(client, app)
+    prefix = f"S{uuid.uuid4().hex[:6]}"
+    with app.app_context():
+        for index in range(5):
+            db.session.add(
+                make_guest(
+                    f"{prefix}-{index}",
+                    f"{prefix}-N{index}",
+                    firstname="Stream",
+                    lastname=f"Gast {index}",
+                    member_since=date(2024, 1, index + 1),
+                    status=True,
+                )
+            )
+        db.session.commit()
+    # Tiny chunks and spool size force several fetches and a spill to disk.
+    monkeypatch.setitem(app.config, "EXPORT_CHUNK_ROWS", 2)
+    monkeypatch.setitem(app.config, "EXPORT_SPOOL_MAX_BYTES", 1)
+
+    response = client.post(
+        "/admin/export",
+        data={
+            "fields[guests][]": ["number", "member_since", "unbekannt"],
+            "include_header": "on",
+        },
+    )
+    assert response.status_code == 200
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    sheet = load_workbook(io.BytesIO(response.data), read_only=True)["guests"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("number", "member_since", "unbekannt")
+    exported = [row[:2] for row in rows[1:] if str(row[0]).startswith(prefix)]
+    assert exported == [(f"{prefix}-N{index}", f"2024-01-0{index + 1}") for index in range(5)]
+    assert all(row[2:] in ((), (None,)) for row in rows[1:])
+
+
+def _add_export_guests(app, make_guest, prefix: str, count: int = 3) -> None:
+    with app.app_context():
+        for index in range(count):
+            db.session.add(
+                make_guest(
+                    f"{prefix}-{index}",
+                    f"{prefix}-N{index}",
+                    firstname="Format",
+                    lastname=f"Gast {index}",
+                    member_since=date(2024, 2, index + 1),
+                    status=True,
+                )
+            )
+        db.session.commit()
+
+
+def test_admin_export_csv_zip(client, app, make_guest):
+    _bootstrap_login(client, app)
+    prefix = f"C{uuid.uuid4().hex[:6]}"
+    _add_export_guests(app, make_guest, prefix)
+
+    response = client.post(
+        "/admin/export",
+        data={
+            "format": "csv",
+            "fields[guests][]": ["number", "member_since"],
+            "fields[payments][]": ["id", "paid_on"],
+            "include_header": "on",
+        },
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    assert "_csv.zip" in response.headers["Content-Disposition"]
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert sorted(archive.namelist()) == ["guests.csv", "payments.csv"]
+        rows = list(csv.reader(io.TextIOWrapper(archive.open("guests.csv"), encoding="utf-8")))
+    assert rows[0] == ["number", "member_since"]
+    assert [row for row in rows[1:] if row[0].startswith(prefix)] == [
+        [f"{prefix}-N{index}", f"2024-02-0{index + 1}"] for index in range(3)
+    ]
+
+
+def test_admin_export_parquet_types(client, app, make_guest):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _bootstrap_login(client, app)
+    prefix = f"P{uuid.uuid4().hex[:6]}"
+    _add_export_guests(app, make_guest, prefix)
+
+    response = client.post(
+        "/admin/export",
+        data={
+            "format": "parquet",
+            "fields[guests][]": ["number", "member_since"],
+            "fields[payments][]": ["food_amount", "paid_on"],
+        },
+    )
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        table = pq.read_table(io.BytesIO(archive.read("guests.parquet")))
+        payments = pq.read_table(io.BytesIO(archive.read("payments.parquet")))
+    assert str(payments.schema.field("food_amount").type) == "decimal128(10, 2)"
+    assert table.column_names == ["number", "member_since"]
+    rows = [row for row in table.to_pylist() if row["number"].startswith(prefix)]
+    assert rows[0]["member_since"] == date(2024, 2, 1)
+
+
+def test_admin_export_unknown_format(client, app):
+    _bootstrap_login(client, app)
+    response = client.post(
+        "/admin/export",
+        data={"format": "pdf", "fields[guests][]": ["number"]},
+    )
+    assert response.status_code == 200
+    assert "Unbekanntes Exportformat".encode("utf-8") in response.data
@@ -89,6 +89,43 @@ def test_admin_export_transactions_view(client, app):
     assert "Zahlungsbericht".encode("utf-8") in response.data
 
 
+def test_admin_export_transactions_sums(client, app):
+    from datetime import timedelta
+
+    _bootstrap_login(client, app)
+    first = _create_guest(client)
+    second = _create_guest(client)
+    day_one = date(2020, 3, 1)
+    day_two = day_one + timedelta(days=1)
+    with app.app_context():
+        for lastname, paid_on, food, other in (
+            (first, day_one, 5.0, 1.0),
+            (second, day_one, 2.5, 0.0),
+            (first, day_two, 4.0, 3.0),
+        ):
+            db.session.add(
+                Payment(
+                    guest_id=_get_guest(lastname).id,
+                    created_on=paid_on,
+                    paid=True,
+                    paid_on=paid_on,
+                    food_amount=food,
+                    other_amount=other,
+                )
+            )
+        db.session.commit()
+
+    response = client.get(f"/admin/export_transactions?from={day_one}&to={day_two}")
+    assert response.status_code == 200
+    assert response.is_streamed
+    page = " ".join(response.get_data(as_text=True).split())
+    assert "<strong>Anzahl Einträge:</strong> 3" in page
+    assert "Summe 01.03.2020 (2)</td> <td>7,50</td> <td>1,00</td> <td>8,50</td>" in page
+    assert "Summe 02.03.2020 (1)</td> <td>4,00</td> <td>3,00</td> <td>7,00</td>" in page
+    assert f"{first}</td> <td>2</td> <td>9,00</td> <td>4,00</td> <td>13,00</td>" in page
+    assert "11,50" in page and "15,50" in page
+
+
 def test_admin_print_export_transactions(client, app, monkeypatch):
     _bootstrap_login(client, app)
     unique_lastname = _create_guest(client)
@@ -107,7 +144,7 @@ def test_admin_print_export_transactions(client, app, monkeypatch):
         )
         db.session.commit()
 
-    def _fake_report(_records, _from_dt, _to_dt):
+    def _fake_report(_records, _from_dt, _to_dt, target=None):
         return io.BytesIO(b"pdf")
 
     monkeypatch.setattr("app.routes.admin.admin_routes.generate_payment_report", _fake_report)
@@ -128,7 +165,7 @@ def test_admin_guest_cards_view(client, app):
     assert "Gästekarten".encode("utf-8") in response.data
 
 
-def test_admin_print_guest_cards_pdf(client, app, monkeypatch):
+def test_admin_print_guest_cards_pdf(client, app, monkeypatch, tmp_path):
     _bootstrap_login(client, app)
     unique_lastname = _create_guest(client)
     with app.app_context():
@@ -137,7 +174,9 @@ def test_admin_print_guest_cards_pdf(client, app, monkeypatch):
     def _fake_cards(_guest_ids, double_sided=True, flip_backside=False):
         return io.BytesIO(b"%PDF-1.4 test")
 
-    monkeypatch.setattr("app.routes.admin.admin_routes.generate_multiple_gast_cards_pdf", _fake_cards)
+    monkeypatch.setattr("app.card_print_jobs.generate_multiple_gast_cards_pdf", _fake_cards)
+    monkeypatch.setattr(app.card_print_jobs, "inline", True)
+    monkeypatch.setattr(app.card_print_jobs, "output_dir", str(tmp_path))
 
     response = client.post(
         "/admin/print_guest_cards",
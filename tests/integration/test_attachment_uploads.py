@@ -0,0 +1,190 @@
+import io
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g
+from werkzeug.security import generate_password_hash
+
+from app.attachment_uploads import part_path
+from app.models import Attachment, AttachmentUpload, User, db
+
+
+@pytest.fixture(autouse=True)
+def _fresh_request_state(app, monkeypatch):
+    # Requests share the session-wide app context; drop the previous test's user and rows.
+    g.pop("_login_user", None)
+    db.session.remove()
+    monkeypatch.setitem(app.config, "ATTACHMENT_CHUNK_BYTES", 4)
+    monkeypatch.setattr(app.upload_finalizer, "inline", True)
+    yield
+    g.pop("_login_user", None)
+    db.session.remove()
+
+
+def _bootstrap_login(client, app) -> None:
+    username = f"admin-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role="admin",
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guest(app, make_guest) -> str:
+    guest_id = uuid.uuid4().hex[:6]
+    with app.app_context():
+        db.session.add(
+            make_guest(guest_id, f"UP-{guest_id}", firstname="Upload")
+        )
+        db.session.commit()
+    return guest_id
+
+
+def _start(client, guest_id: str, size: int) -> dict:
+    response = client.post(
+        f"/attachment/{guest_id}/uploads",
+        json={"filename": "scan.pdf", "size": size, "content_type": "application/pdf"},
+    )
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_chunked_upload_out_of_order_parts(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    upload = _start(client, guest_id, 10)
+    assert upload["part_count"] == 3
+    assert upload["parallel_parts"] == 1
+
+    assert client.put(f"/attachment/uploads/{upload['id']}/parts/2", data=b"89").status_code == 200
+    status = client.get(f"/attachment/uploads/{upload['id']}").get_json()
+    assert status["missing_parts"] == [0, 1]
+    assert client.post(f"/attachment/uploads/{upload['id']}/complete").status_code == 409
+
+    assert client.put(f"/attachment/uploads/{upload['id']}/parts/1", data=b"4567").status_code == 200
+    assert client.put(f"/attachment/uploads/{upload['id']}/parts/0", data=b"0123").status_code == 200
+    response = client.post(f"/attachment/uploads/{upload['id']}/complete")
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["status"] == "done"
+
+    with app.app_context():
+        attachment = db.session.get(Attachment, result["attachment_id"])
+        assert attachment.owner_id == guest_id
+        assert attachment.filename == "scan.pdf"
+        assert attachment.gcs_path.startswith(f"guest/{guest_id}/") and attachment.gcs_path.endswith(".pdf")
+        root = app.storage.root
+        with open(os.path.join(root, attachment.gcs_path), "rb") as fh:
+            assert fh.read() == b"0123456789"
+        assert not any(os.path.exists(os.path.join(root, part_path(upload["id"], n))) for n in range(3))
+
+
+def test_chunked_upload_rejects_wrong_part_size(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    upload = _start(client, guest_id, 10)
+
+    response = client.put(f"/attachment/uploads/{upload['id']}/parts/0", data=b"01")
+    assert response.status_code == 400
+    assert client.put(f"/attachment/uploads/{upload['id']}/parts/3", data=b"0123").status_code == 400
+
+
+def test_chunked_upload_retries_failed_finalize(client, app, monkeypatch, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    upload = _start(client, guest_id, 4)
+    client.put(f"/attachment/uploads/{upload['id']}/parts/0", data=b"abcd")
+
+    original_compose = app.storage.compose
+
+    def _broken_compose(*args, **kwargs):
+        raise OSError("Speicher nicht erreichbar")
+
+    monkeypatch.setattr(app.storage, "compose", _broken_compose)
+    failed = client.post(f"/attachment/uploads/{upload['id']}/complete").get_json()
+    assert failed["status"] == "failed"
+    assert "nicht erreichbar" in failed["error"]
+
+    monkeypatch.setattr(app.storage, "compose", original_compose)
+    done = client.post(f"/attachment/uploads/{upload['id']}/complete").get_json()
+    assert done["status"] == "done"
+    with app.app_context():
+        assert db.session.get(AttachmentUpload, upload["id"]).attachment_id == done["attachment_id"]
+
+
+def test_direct_upload_parts_are_recorded_on_complete(client, app, monkeypatch, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    monkeypatch.setitem(app.config, "ATTACHMENT_UPLOAD_MODE", "direct")
+    monkeypatch.setitem(app.config, "ATTACHMENT_PARALLEL_MIN_BYTES", 8)
+    monkeypatch.setattr(
+        app.storage, "signed_upload_url", lambda path, minutes, content_type=None: f"https://bucket.test/{path}"
+    )
+    upload = _start(client, guest_id, 10)
+    assert upload["part_urls"] == {str(n): f"https://bucket.test/{part_path(upload['id'], n)}" for n in range(3)}
+    assert upload["parallel_parts"] == app.config["ATTACHMENT_PARALLEL_PARTS"]
+
+    # The browser writes the parts into the bucket; a part of the wrong size is not counted.
+    for number, data in ((0, b"0123"), (1, b"45"), (2, b"89")):
+        app.storage.put(part_path(upload["id"], number), io.BytesIO(data))
+    status = client.get(f"/attachment/uploads/{upload['id']}").get_json()
+    assert status["missing_parts"] == [1]
+    assert list(status["part_urls"]) == ["1"]
+
+    app.storage.put(part_path(upload["id"], 1), io.BytesIO(b"4567"))
+    result = client.post(f"/attachment/uploads/{upload['id']}/complete").get_json()
+    assert result["status"] == "done"
+    with app.app_context():
+        attachment = db.session.get(Attachment, result["attachment_id"])
+        assert app.storage.read(attachment.gcs_path) == b"0123456789"
+
+
+def test_upload_sweep_resubmits_stale_finalizing_upload(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    upload = _start(client, guest_id, 4)
+    client.put(f"/attachment/uploads/{upload['id']}/parts/0", data=b"abcd")
+    # The process that was meant to finalize the upload went away after claiming it.
+    with app.app_context():
+        row = db.session.get(AttachmentUpload, upload["id"])
+        row.status = "finalizing"
+        row.finalize_requested_on = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+    assert app.upload_finalizer.recover()["resubmitted"] >= 1
+    status = client.get(f"/attachment/uploads/{upload['id']}").get_json()
+    assert status["status"] == "done"
+    assert app.upload_finalizer.recover()["resubmitted"] == 0
+
+
+def test_upload_sweep_expires_abandoned_uploads_and_deletes_their_parts(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    abandoned = _start(client, guest_id, 10)
+    active = _start(client, guest_id, 10)
+    for upload in (abandoned, active):
+        client.put(f"/attachment/uploads/{upload['id']}/parts/0", data=b"0123")
+    app.storage.put(part_path("0" * 32, 0), io.BytesIO(b"orphan"))
+    with app.app_context():
+        db.session.get(AttachmentUpload, abandoned["id"]).created_on = datetime.utcnow() - timedelta(days=3)
+        db.session.commit()
+
+    app.upload_finalizer.recover()
+
+    assert client.get(f"/attachment/uploads/{abandoned['id']}").get_json()["status"] == "expired"
+    assert not app.storage.list_sizes(f"uploads/{abandoned['id']}/")
+    assert not app.storage.list_sizes(f"uploads/{'0' * 32}/")
+    assert list(app.storage.list_sizes(f"uploads/{active['id']}/")) == [part_path(active["id"], 0)]
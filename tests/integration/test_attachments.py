@@ -119,22 +119,81 @@ def test_attachment_download(client, app, monkeypatch):
         db.session.commit()
         att_id = att.id
 
-    class _FakeBlob:
-        content_type = "text/plain"
+    app.storage.put("guest/test/test.txt", io.BytesIO(b"test"))
+
+    response = client.get(f"/attachment/{att_id}/download")
+    assert response.status_code == 200
+    assert response.data == b"test"
+    assert response.mimetype == "text/plain"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def _stored_attachment(client, app, data: bytes) -> int:
+    _bootstrap_login(client, app)
+    unique_lastname = _create_guest(client)
+    with app.app_context():
+        guest_id = _get_guest_id(unique_lastname)
+        path = f"guest/{guest_id}/{uuid.uuid4().hex}.pdf"
+        app.storage.put(path, io.BytesIO(data))
+        att = Attachment(owner_id=guest_id, filename="Befund ä.pdf", gcs_path=path, uploaded_on=date.today())
+        db.session.add(att)
+        db.session.commit()
+        return att.id
+
+
+def test_attachment_download_range(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, "ATTACHMENT_DOWNLOAD_CHUNK_BYTES", 3)
+    att_id = _stored_attachment(client, app, b"0123456789")
+
+    response = client.get(f"/attachment/{att_id}/download", headers={"Range": "bytes=2-6"})
+    assert response.status_code == 206
+    assert response.data == b"23456"
+    assert response.headers["Content-Range"] == "bytes 2-6/10"
+    assert response.headers["Content-Length"] == "5"
+    assert "filename*=UTF-8''Befund%20%C3%A4.pdf" in response.headers["Content-Disposition"]
+
+    stale = client.get(
+        f"/attachment/{att_id}/download", headers={"Range": "bytes=2-6", "If-Range": '"veraltet"'}
+    )
+    assert stale.status_code == 200
+    assert stale.data == b"0123456789"
+
+    unsatisfiable = client.get(f"/attachment/{att_id}/download", headers={"Range": "bytes=20-30"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == "bytes */10"
+
+
+def test_attachment_download_caches_metadata(client, app, monkeypatch):
+    att_id = _stored_attachment(client, app, b"abc")
+    calls = []
+    original_stat = app.storage._stat
+
+    def _counting_stat(path):
+        calls.append(path)
+        return original_stat(path)
+
+    monkeypatch.setattr(app.storage, "_stat", _counting_stat)
+    assert client.get(f"/attachment/{att_id}/download").data == b"abc"
+    assert client.get(f"/attachment/{att_id}/download").data == b"abc"
+    assert len(calls) == 1
+
 
-        def download_as_bytes(self):
-            return b"test"
+def test_attachment_download_redirects_to_signed_url(client, app, monkeypatch):
+    att_id = _stored_attachment(client, app, b"abc")
+
+    class _FakeBlob:
+        def generate_signed_url(self, **_kwargs):
+            return "https://storage.example/signed"
 
     class _FakeBucket:
         def blob(self, _path):
             return _FakeBlob()
 
-    with app.app_context():
-        app.bucket = _FakeBucket()
-
+    monkeypatch.setattr(app, "bucket", _FakeBucket(), raising=False)
+    monkeypatch.setitem(app.config, "ATTACHMENT_DOWNLOAD_MODE", "redirect")
     response = client.get(f"/attachment/{att_id}/download")
-    assert response.status_code == 200
-    assert response.data == b"test"
+    assert response.status_code == 302
+    assert response.headers["Location"] == "https://storage.example/signed"
 
 
 def test_attachment_delete(client, app, monkeypatch):
@@ -245,3 +304,44 @@ def test_attachment_remove_animal_picture(client, app):
     )
     assert response.status_code == 200
     assert "Profilbild entfernt".encode("utf-8") in response.data
+
+
+def test_attachment_thumbnail(client, app):
+    from PIL import Image
+
+    image = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (10, 120, 200)).save(image, "JPEG")
+    _bootstrap_login(client, app)
+    unique_lastname = _create_guest(client)
+    with app.app_context():
+        guest_id = _get_guest_id(unique_lastname)
+        path = f"guest/{guest_id}/{uuid.uuid4().hex}.jpg"
+        app.storage.put(path, io.BytesIO(image.getvalue()))
+        att = Attachment(owner_id=guest_id, filename="hund.jpg", gcs_path=path, uploaded_on=date.today())
+        db.session.add(att)
+        db.session.commit()
+        att_id = att.id
+
+    response = client.get(f"/attachment/{att_id}/thumbnail?size=medium", headers={"Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert len(response.data) < len(image.getvalue())
+    assert Image.open(io.BytesIO(response.data)).size == (480, 360)
+    assert "immutable" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+
+    cached = client.get(
+        f"/attachment/{att_id}/thumbnail?size=medium",
+        headers={"Accept": "image/webp,*/*", "If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+
+    jpeg = client.get(f"/attachment/{att_id}/thumbnail")
+    assert jpeg.mimetype == "image/jpeg"
+
+    assert client.get(f"/attachment/{att_id}/thumbnail?size=huge").status_code == 404
+
+
+def test_attachment_thumbnail_not_an_image(client, app):
+    att_id = _stored_attachment(client, app, b"%PDF-1.4")
+    assert client.get(f"/attachment/{att_id}/thumbnail").status_code == 404
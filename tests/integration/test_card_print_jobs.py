@@ -0,0 +1,128 @@
+import io
+import os
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.card_print_jobs import create_card_print_job
+from app.models import CardPrintJob, Guest, User, db
+
+
+@pytest.fixture
+def fake_cards(app, monkeypatch, tmp_path):
+    calls = []
+
+    def _fake_cards(guest_ids, double_sided=False, flip_backside=False):
+        calls.append((list(guest_ids), double_sided, flip_backside))
+        return io.BytesIO(b"%PDF-1.4 test")
+
+    monkeypatch.setattr("app.card_print_jobs.generate_multiple_gast_cards_pdf", _fake_cards)
+    monkeypatch.setattr(app.card_print_jobs, "output_dir", str(tmp_path))
+    return calls
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def test_print_request_returns_before_the_cards_are_rendered(client, app, monkeypatch, fake_cards, make_guest):
+    submitted = []
+    monkeypatch.setattr(app.card_print_jobs, "submit", submitted.append)
+    _bootstrap_login(client, app)
+    with app.app_context():
+        db.session.add(make_guest("PRINT1"))
+        db.session.commit()
+
+    response = client.post(
+        "/admin/print_guest_cards",
+        data={"guest_ids": ["PRINT1"], "backside": "1", "flip_backside": "on"},
+    )
+
+    assert response.status_code == 302
+    assert f"print_job={submitted[0]}" in response.headers["Location"]
+    assert fake_cards == []
+    progress = client.get(f"/admin/card_print_jobs/{submitted[0]}").get_json()
+    assert progress["status"] == "queued"
+    assert "download_url" not in progress
+    page = client.get(response.headers["Location"]).get_data(as_text=True)
+    assert f"/admin/card_print_jobs/{submitted[0]}" in page
+
+
+def test_print_job_renders_and_offers_the_download(client, app, fake_cards, make_guest):
+    _bootstrap_login(client, app)
+    with app.app_context():
+        db.session.add_all([make_guest("PRINT2"), make_guest("PRINT3")])
+        db.session.commit()
+        job_id = create_card_print_job(["PRINT3", "PRINT2"], double_sided=True, flip_backside=True).id
+
+    app.card_print_jobs.run_job(job_id)
+
+    assert fake_cards == [(["PRINT3", "PRINT2"], True, True)]
+    progress = client.get(f"/admin/card_print_jobs/{job_id}").get_json()
+    assert progress["status"] == "done"
+    response = client.get(progress["download_url"])
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert response.data == b"%PDF-1.4 test"
+    with app.app_context():
+        assert db.session.get(Guest, "PRINT2").guest_card_printed_on == date.today()
+    assert client.get("/admin/card_print_jobs/999999").status_code == 404
+
+
+def test_print_job_records_a_render_failure(app, monkeypatch, fake_cards):
+    def _broken(guest_ids, double_sided=False, flip_backside=False):
+        raise RuntimeError("Layout kaputt")
+
+    monkeypatch.setattr("app.card_print_jobs.generate_multiple_gast_cards_pdf", _broken)
+    with app.app_context():
+        job_id = create_card_print_job(["PRINT4"]).id
+
+    app.card_print_jobs.run_job(job_id)
+    app.card_print_jobs.run_job(job_id)
+
+    with app.app_context():
+        job = db.session.get(CardPrintJob, job_id)
+        assert job.status == "failed"
+        assert job.error == "Layout kaputt"
+
+
+def test_recover_fails_abandoned_jobs_and_deletes_old_pdfs(app, fake_cards, make_guest):
+    with app.app_context():
+        db.session.add(make_guest("PRINT5"))
+        db.session.commit()
+        old_id = create_card_print_job(["PRINT5"]).id
+        abandoned_id = create_card_print_job(["PRINT5"]).id
+        fresh_id = create_card_print_job(["PRINT5"]).id
+    app.card_print_jobs.run_job(old_id)
+    with app.app_context():
+        old = db.session.get(CardPrintJob, old_id)
+        path = old.file_path
+        old.finished_on = datetime.utcnow() - timedelta(hours=app.card_print_jobs.keep_hours + 1)
+        db.session.get(CardPrintJob, abandoned_id).created_on = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+    assert app.card_print_jobs.recover() == {"abandoned": 1, "expired": 1}
+
+    assert not os.path.exists(path)
+    with app.app_context():
+        assert db.session.get(CardPrintJob, old_id).status == "expired"
+        assert db.session.get(CardPrintJob, abandoned_id).status == "failed"
+        assert db.session.get(CardPrintJob, fresh_id).status == "queued"
@@ -0,0 +1,139 @@
+import uuid
+from datetime import date
+
+import pytest
+from flask import g
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app.dashboard_stats import dashboard_stats
+from app.models import FoodHistory, Guest, User, db
+
+
+@pytest.fixture(autouse=True)
+def _fresh_dashboard_state(app):
+    # Requests share the session-wide app context; drop the previous test's user and rows.
+    g.pop("_login_user", None)
+    db.session.remove()
+    dashboard_stats.clear()
+    yield
+    g.pop("_login_user", None)
+    db.session.remove()
+    dashboard_stats.clear()
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guest(app, make_guest, guest_id: str) -> None:
+    with app.app_context():
+        db.session.add(
+            make_guest(guest_id, firstname="Dash")
+        )
+        db.session.commit()
+
+
+def _aggregate_statements(client, app, path: str = "/admin/") -> list:
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "count(" in statement.lower() or "sum(" in statement.lower():
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert response.status_code == 200
+    return statements
+
+
+def test_dashboard_skips_aggregates_when_unchanged(client, app, make_guest):
+    _bootstrap_login(client, app)
+    _add_guest(app, make_guest, "DASH1")
+
+    assert _aggregate_statements(client, app)
+    assert _aggregate_statements(client, app) == []
+
+
+def test_dashboard_rebuilds_touched_sections(client, app, monkeypatch, make_guest):
+    monkeypatch.setattr(dashboard_stats, "min_rebuild_seconds", 0)
+    _bootstrap_login(client, app)
+    _add_guest(app, make_guest, "DASH2")
+    client.get("/admin/")
+    builds = dashboard_stats.metrics()["section_builds"]
+
+    with app.app_context():
+        db.session.add(FoodHistory(guest_id="DASH2", distributed_on=date.today()))
+        db.session.commit()
+
+    response = client.get("/admin/")
+    assert response.status_code == 200
+    # FoodHistory feeds the visit and payment sections only.
+    assert dashboard_stats.metrics()["section_builds"] == builds + 2
+    with app.app_context():
+        stats = dashboard_stats.stats()
+    assert stats["recent_guests"] == 1
+    assert stats["top_guests_by_visits"][0].besuche == 1
+    assert stats["total_guests"] == 1
+
+
+def test_dashboard_throttles_rebuilds_of_changed_sections(client, app, monkeypatch, make_guest):
+    _bootstrap_login(client, app)
+    _add_guest(app, make_guest, "DASH4")
+    client.get("/admin/")
+    builds = dashboard_stats.metrics()["section_builds"]
+
+    with app.app_context():
+        db.session.add(FoodHistory(guest_id="DASH4", distributed_on=date.today()))
+        db.session.commit()
+
+    assert _aggregate_statements(client, app) == []
+    assert dashboard_stats.metrics()["section_builds"] == builds
+
+    monkeypatch.setattr(dashboard_stats, "min_rebuild_seconds", 0)
+    with app.app_context():
+        assert dashboard_stats.stats()["recent_guests"] == 1
+    assert dashboard_stats.metrics()["section_builds"] == builds + 2
+
+
+def test_dashboard_refresh_recomputes_all(client, app, make_guest):
+    _bootstrap_login(client, app)
+    _add_guest(app, make_guest, "DASH3")
+    client.get("/admin/")
+    with app.app_context():
+        # Bulk updates bypass the ORM change tracking; a forced refresh picks them up.
+        db.session.query(Guest).filter_by(id="DASH3").update(
+            {"lifecycle_status": "staging"}, synchronize_session=False
+        )
+        db.session.commit()
+        assert dashboard_stats.stats()["staging_guests"] == 0
+
+    builds = dashboard_stats.metrics()["section_builds"]
+    response = client.post("/admin/dashboard/refresh", follow_redirects=True)
+
+    assert response.status_code == 200
+    assert "Dashboard-Statistiken neu berechnet".encode("utf-8") in response.data
+    assert dashboard_stats.metrics()["section_builds"] == builds + 5
+    with app.app_context():
+        assert dashboard_stats.stats()["staging_guests"] == 1
@@ -0,0 +1,169 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.email_jobs import EmailSendError, create_guest_card_job
+from app.models import EmailJob, EmailJobItem, Guest, User, db
+
+
+class _StubTransport:
+    """Records payloads instead of calling Brevo; `failures` maps recipients to errors raised once each."""
+
+    def __init__(self, failures=None):
+        self.sent = []
+        self.failures = failures or {}
+
+    def send(self, payload):
+        recipient = payload["to"][0]["email"]
+        errors = self.failures.get(recipient)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(recipient)
+
+
+@pytest.fixture
+def stub_transport(app, monkeypatch):
+    transport = _StubTransport()
+    monkeypatch.setattr(app, "email_transport", transport)
+    monkeypatch.setattr(app.email_jobs, "inline", True)
+    monkeypatch.setattr(app.email_jobs, "backoff_seconds", 0)
+    monkeypatch.setattr(app.email_jobs, "batch_size", 2)
+    monkeypatch.setenv("MAIL_KEY", "test-key")
+    monkeypatch.setenv("REPLY_TO", "reply@example.org")
+    return transport
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guests(app, make_guest, emails) -> list:
+    guest_ids = []
+    with app.app_context():
+        for index, email in enumerate(emails):
+            guest_ids.append(f"MAIL{index}")
+            db.session.add(
+                make_guest(
+                    guest_ids[-1], f"2026{index:03d}", firstname="Mail", lastname=f"Gast{index}", email=email
+                )
+            )
+        db.session.commit()
+    return guest_ids
+
+
+def test_bulk_guest_card_email_job(client, app, stub_transport, make_guest):
+    _bootstrap_login(client, app)
+    guest_ids = _add_guests(app, make_guest, ["a@example.org", None, "c@example.org"])
+    stub_transport.failures["c@example.org"] = [EmailSendError("429 Too Many Requests", retryable=True)]
+    app.config["SETTINGS"]["emailEnabled"] = {"value": "Aktiv"}
+
+    response = client.post(
+        "/admin/print_guest_cards",
+        data={"guest_ids": guest_ids, "action": "email"},
+        follow_redirects=True,
+    )
+
+    assert response.status_code == 200
+    assert "2 E-Mails versendet".encode("utf-8") in response.data
+    assert sorted(stub_transport.sent) == ["a@example.org", "c@example.org"]
+    with app.app_context():
+        job = EmailJob.query.one()
+        assert (job.status, job.total, job.sent, job.skipped, job.failed) == ("done", 3, 2, 1, 0)
+        attempts = {item.guest_id: item.attempts for item in job.items}
+        assert attempts == {"MAIL0": 1, "MAIL1": 0, "MAIL2": 2}
+        emailed = {guest.id: guest.guest_card_emailed_on for guest in Guest.query.all()}
+        assert emailed == {"MAIL0": date.today(), "MAIL1": None, "MAIL2": date.today()}
+        job_id = job.id
+
+    progress = client.get(f"/admin/email_jobs/{job_id}").get_json()
+    assert progress["status"] == "done"
+    assert (progress["done"], progress["percent"]) == (3, 100)
+    assert client.get("/admin/email_jobs/999999").status_code == 404
+
+
+def test_email_job_fails_items_after_max_attempts(app, stub_transport, monkeypatch, make_guest):
+    monkeypatch.setattr(app.email_jobs, "max_attempts", 2)
+    guest_ids = _add_guests(app, make_guest, ["busy@example.org", "bad@example.org"])
+    stub_transport.failures["busy@example.org"] = [EmailSendError("503", retryable=True) for _ in range(3)]
+    stub_transport.failures["bad@example.org"] = [EmailSendError("400 invalid", retryable=False)]
+
+    with app.app_context():
+        job = create_guest_card_job(guest_ids)
+        app.email_jobs.submit(job.id)
+        db.session.expire_all()
+        items = {item.guest_id: item for item in EmailJobItem.query.filter_by(job_id=job.id).all()}
+        assert [items[guest_id].status for guest_id in guest_ids] == ["failed", "failed"]
+        assert [items[guest_id].attempts for guest_id in guest_ids] == [2, 1]
+        assert "400 invalid" in items["MAIL1"].message
+        assert db.session.get(EmailJob, job.id).failed == 2
+        assert Guest.query.filter(Guest.guest_card_emailed_on.isnot(None)).count() == 0
+    assert stub_transport.sent == []
+
+
+def test_interrupted_email_job_is_requeued_and_finishes_pending_items(app, stub_transport, make_guest):
+    guest_ids = _add_guests(app, make_guest, ["first@example.org", "second@example.org"])
+
+    with app.app_context():
+        job = create_guest_card_job(guest_ids)
+        # The worker sending this job died after the first batch.
+        job.status = "running"
+        job.started_on = job.heartbeat_on = datetime.utcnow() - timedelta(hours=1)
+        job.sent = 1
+        job.items[0].status = "sent"
+        db.session.commit()
+        job_id = job.id
+
+        assert app.email_jobs._requeue_stale_jobs() == 1
+        claimed_id, token = app.email_jobs._claim_next_job()
+        assert claimed_id == job_id
+        app.email_jobs.run_job(job_id, token=token)
+
+    with app.app_context():
+        job = db.session.get(EmailJob, job_id)
+        assert (job.status, job.sent) == ("done", 2)
+        assert app.email_jobs._requeue_stale_jobs() == 0
+    assert stub_transport.sent == ["second@example.org"]
+
+
+def test_runner_stops_once_its_job_was_claimed_again(app, stub_transport, make_guest):
+    guest_ids = _add_guests(app, make_guest, ["first@example.org", "second@example.org"])
+
+    with app.app_context():
+        job_id = create_guest_card_job(guest_ids).id
+        _, stale_token = app.email_jobs._claim_next_job()
+        # The first runner stalled with its first item claimed; the sweeper hands the job on.
+        first_item = EmailJobItem.query.filter_by(job_id=job_id).order_by(EmailJobItem.id).first()
+        first_item.status = "sending"
+        db.session.get(EmailJob, job_id).heartbeat_on = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        assert app.email_jobs._requeue_stale_jobs() == 1
+        assert EmailJobItem.query.filter_by(job_id=job_id, status="pending").count() == 2
+        _, token = app.email_jobs._claim_next_job()
+
+        app.email_jobs.run_job(job_id, token=stale_token)
+        assert stub_transport.sent == []
+        assert db.session.get(EmailJob, job_id).status == "running"
+
+        app.email_jobs.run_job(job_id, token=token)
+        db.session.expire_all()
+        job = db.session.get(EmailJob, job_id)
+        assert (job.status, job.sent) == ("done", 2)
+    assert sorted(stub_transport.sent) == ["first@example.org", "second@example.org"]
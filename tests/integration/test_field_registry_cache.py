@@ -0,0 +1,132 @@
+import uuid
+
+from sqlalchemy import event, update
+from werkzeug.security import generate_password_hash
+
+from app.field_registry_cache import FIELD_REGISTRY_REVISION, field_registry_cache, registry_fields
+from app.models import FieldRegistry, User, db
+from app.settings_cache import bump_revision
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guest(app, make_guest) -> str:
+    guest_id = uuid.uuid4().hex[:6]
+    with app.app_context():
+        db.session.add(
+            make_guest(guest_id, firstname="Feld", lastname="Cache")
+        )
+        db.session.commit()
+    return guest_id
+
+
+def _count_registry_queries(app, callback) -> int:
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "field_registry" in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        callback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return len(statements)
+
+
+def test_view_guest_uses_cached_registry(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    assert client.get(f"/guest/{guest_id}").status_code == 200
+
+    def _view():
+        assert client.get(f"/guest/{guest_id}").status_code == 200
+
+    assert _count_registry_queries(app, _view) == 0
+
+
+def test_registry_cache_groups_and_sorts_fields(app):
+    with app.app_context():
+        field = FieldRegistry.query.filter_by(model_name="Guest", field_name="lastname").first()
+        field.display_order = -1
+        db.session.commit()
+
+        fields = registry_fields("Guest")
+        assert fields[0].field_name == "lastname"
+        assert {f.model_name for f in fields} == {"Guest"}
+
+
+def test_registry_cache_invalidated_by_commit(app):
+    with app.app_context():
+        field = FieldRegistry.query.filter_by(model_name="Guest", field_name="city").first()
+        assert "city" in [f.field_name for f in registry_fields("Guest", visible_only=True)]
+        version = field_registry_cache.version
+
+        field.globally_visible = False
+        db.session.commit()
+
+        assert field_registry_cache.version > version
+        assert "city" not in [f.field_name for f in registry_fields("Guest", visible_only=True)]
+
+
+def test_registry_cache_invalidated_by_reminder_settings(client, app):
+    _bootstrap_login(client, app)
+    with app.app_context():
+        field = FieldRegistry.query.filter_by(model_name="Guest", field_name="member_until").first()
+        field_id = field.id
+        assert {f.id: f for f in registry_fields("Guest")}[field_id].reminder_interval_days is None
+
+    response = client.post(
+        "/admin/reminders",
+        data={f"remindable_{field_id}": "on", f"reminder_interval_{field_id}": "30"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+    with app.app_context():
+        cached = {f.id: f for f in registry_fields("Guest")}
+        assert cached[field_id].remindable is True
+        assert cached[field_id].reminder_interval_days == 30
+
+
+def test_registry_cache_reloads_after_another_worker_bumps_revision(app, monkeypatch):
+    with app.app_context():
+        assert "city" in [f.field_name for f in registry_fields("Guest", visible_only=True)]
+        # Another worker hides the field; this process only sees the shared revision move.
+        table = FieldRegistry.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(table)
+                .where(table.c.model_name == "Guest", table.c.field_name == "city")
+                .values(globally_visible=False)
+            )
+            bump_revision(connection, FIELD_REGISTRY_REVISION)
+
+    monkeypatch.setattr(field_registry_cache.watch, "poll_seconds", 3600)
+    with app.app_context():
+        assert "city" in [f.field_name for f in registry_fields("Guest", visible_only=True)]
+
+    monkeypatch.setattr(field_registry_cache.watch, "poll_seconds", 0)
+    with app.app_context():
+        assert "city" not in [f.field_name for f in registry_fields("Guest", visible_only=True)]
@@ -0,0 +1,187 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app.guest_detail import GuestDetail
+from app.models import (
+    AccessoriesHistory,
+    Animal,
+    Attachment,
+    ChangeLog,
+    FoodHistory,
+    FoodHistoryTag,
+    FoodTag,
+    MedicalEvent,
+    MedicalEventAttachment,
+    Message,
+    Payment,
+    Representative,
+    User,
+    db,
+)
+
+# Guest row, twelve child collections, food tags and dispense locations, with warm caches.
+VIEW_GUEST_QUERY_BUDGET = 16
+
+
+@pytest.fixture(autouse=True)
+def _fresh_request_state(app):
+    # Requests share the session-wide app context, so ``g`` and the ORM identity map
+    # would otherwise carry the previous test's user and rows into this one.
+    g.pop("_login_user", None)
+    db.session.remove()
+    yield
+    g.pop("_login_user", None)
+    db.session.remove()
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> int:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        user = User(
+            username=username,
+            password_hash=generate_password_hash("admin"),
+            role=role,
+            realname=username,
+        )
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    return user_id
+
+
+def _create_guest_with_children(app, make_guest, guest_id: str, user_id: int, count: int) -> None:
+    today = date.today()
+    with app.app_context():
+        tag = FoodTag(name=f"Tag-{guest_id}", color="#123456")
+        guest = make_guest(guest_id, firstname="Detail")
+        db.session.add_all([tag, guest])
+        db.session.add(Representative(guest_id=guest_id, name="Vertretung"))
+        for index in range(count):
+            animal = Animal(
+                guest_id=guest_id,
+                name=f"Tier {index}",
+                species="Hund",
+                status=True,
+                created_on=today,
+                updated_on=today,
+                food_tags=[tag],
+            )
+            attachment = Attachment(
+                owner_id=guest_id,
+                filename=f"befund-{index}.pdf",
+                gcs_path=f"{guest_id}/befund-{index}.pdf",
+                uploaded_on=datetime.now(),
+            )
+            medical_event = MedicalEvent(
+                guest_id=guest_id,
+                animal=animal,
+                title=f"Termin {index}",
+                event_type="Untersuchung",
+                status="Geplant" if index % 2 else "Abgeschlossen",
+                priority="Mittel",
+                planned_for=today + timedelta(days=index),
+            )
+            medical_event.attachment_links.append(MedicalEventAttachment(attachment=attachment))
+            food_entry = FoodHistory(guest_id=guest_id, distributed_on=today - timedelta(days=index))
+            food_entry.tag_assocs.append(FoodHistoryTag(food_tag=tag))
+            db.session.add_all(
+                [
+                    animal,
+                    attachment,
+                    medical_event,
+                    food_entry,
+                    Message(guest_id=guest_id, created_by=user_id, created_on=today, content=f"Notiz {index}"),
+                    Payment(guest_id=guest_id, created_on=today, food_amount=5, other_amount=0),
+                    AccessoriesHistory(guest_id=guest_id, distributed_on=today, item=f"Leine {index}"),
+                    ChangeLog(
+                        guest_id=guest_id,
+                        change_type="update",
+                        description=f"Änderung {index}",
+                        user_id=user_id,
+                        change_timestamp=datetime.now(),
+                    ),
+                ]
+            )
+        db.session.commit()
+
+
+def _count_view_queries(client, app, guest_id: str) -> int:
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        response = client.get(f"/guest/{guest_id}")
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_view_guest_query_count(client, app, make_guest):
+    user_id = _bootstrap_login(client, app)
+    _create_guest_with_children(app, make_guest, "SMALL", user_id, count=1)
+    _create_guest_with_children(app, make_guest, "LARGE", user_id, count=6)
+
+    # Warm the process-level registry and payment package caches first.
+    client.get("/guest/SMALL")
+    small = _count_view_queries(client, app, "SMALL")
+    large = _count_view_queries(client, app, "LARGE")
+
+    assert small == large
+    assert large <= VIEW_GUEST_QUERY_BUDGET
+
+
+def test_view_guest_renders_all_children(client, app, make_guest):
+    user_id = _bootstrap_login(client, app)
+    _create_guest_with_children(app, make_guest, "FULL", user_id, count=2)
+
+    response = client.get("/guest/FULL")
+    html = response.get_data(as_text=True)
+
+    for text in ("Tier 1", "Termin 0", "Notiz 1", "Leine 0", "Änderung 1", "befund-1.pdf", "Tag-FULL"):
+        assert text in html
+
+
+def test_guest_detail_view_model(client, app, make_guest):
+    from app.guest_detail import load_guest_detail
+
+    user_id = _bootstrap_login(client, app)
+    _create_guest_with_children(app, make_guest, "MODEL", user_id, count=3)
+
+    with app.test_request_context():
+        from flask_login import login_user
+
+        from app.auth import get_user
+
+        with app.app_context():
+            login_user(get_user(user_id))
+            detail = load_guest_detail("MODEL")
+            assert load_guest_detail("UNKNOWN") is None
+
+            assert isinstance(detail, GuestDetail)
+            assert [event.status for event in detail.medical_events] == ["Geplant", "Abgeschlossen", "Abgeschlossen"]
+            assert [entry.distributed_on for entry in detail.feed_history] == sorted(
+                (entry.distributed_on for entry in detail.feed_history), reverse=True
+            )
+            assert detail.representative.name == "Vertretung"
+            assert len(detail.medical_events_by_attachment) == 3
+            with pytest.raises(AttributeError):
+                detail.animals = ()
+            with pytest.raises(TypeError):
+                detail.medical_events_by_attachment[0] = ()
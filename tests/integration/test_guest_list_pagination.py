@@ -0,0 +1,190 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app.models import FoodHistory, User, db
+from app.routes import guest_routes
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guests(app, make_guest, count: int, lifecycle_status: str = "active", prefix: str = "Gast") -> list:
+    guest_ids = []
+    with app.app_context():
+        for index in range(count):
+            guest_id = uuid.uuid4().hex[:6]
+            db.session.add(
+                make_guest(
+                    guest_id,
+                    f"{prefix}-{index:03d}",
+                    firstname="Vorname",
+                    lastname=f"{prefix}{index:03d}",
+                    lifecycle_status=lifecycle_status,
+                    status=lifecycle_status == "active",
+                )
+            )
+            guest_ids.append(guest_id)
+        db.session.commit()
+    return guest_ids
+
+
+def _collect_pages(client, query: str = "") -> list:
+    html_pages = []
+    response = client.get(f"/guest/list/page?{query}")
+    assert response.status_code == 200
+    payload = response.get_json()
+    html_pages.append(payload["html"])
+    while payload["next_cursor"]:
+        response = client.get(f"/guest/list/page?{query}&cursor={payload['next_cursor']}")
+        assert response.status_code == 200
+        payload = response.get_json()
+        html_pages.append(payload["html"])
+    return html_pages
+
+
+def test_guest_list_first_page(client, app, monkeypatch, make_guest):
+    monkeypatch.setattr(guest_routes, "GUEST_LIST_PAGE_SIZE", 3)
+    _bootstrap_login(client, app)
+    _add_guests(app, make_guest, 5, prefix="Seite")
+
+    response = client.get("/guest/list")
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Seite000" in html
+    assert "Seite002" in html
+    assert "Seite003" not in html
+    assert 'data-next-cursor=""' not in html
+
+
+def test_guest_list_page_cursor(client, app, monkeypatch, make_guest):
+    monkeypatch.setattr(guest_routes, "GUEST_LIST_PAGE_SIZE", 2)
+    _bootstrap_login(client, app)
+    _add_guests(app, make_guest, 3, lifecycle_status="inactive", prefix="Alt")
+    _add_guests(app, make_guest, 3, lifecycle_status="active", prefix="Neu")
+
+    html = "".join(_collect_pages(client, "sort=name&direction=desc"))
+    order = [f"Neu{index:03d}" for index in (2, 1, 0)] + [f"Alt{index:03d}" for index in (2, 1, 0)]
+    positions = [html.index(name) for name in order]
+    assert positions == sorted(positions)
+    assert all(html.count(name) == 1 for name in order)
+    assert html.count('data-status-heading="active"') == 1
+    assert html.count('data-status-heading="inactive"') == 1
+
+
+def test_guest_list_page_filters(client, app, make_guest):
+    _bootstrap_login(client, app)
+    _add_guests(app, make_guest, 2, lifecycle_status="staging", prefix="Entwurf")
+    _add_guests(app, make_guest, 2, lifecycle_status="active", prefix="Aktiv")
+
+    payload = client.get("/guest/list/page?status=staging").get_json()
+    assert payload["matching_count"] == 2
+    assert "Entwurf000" in payload["html"]
+    assert "Aktiv000" not in payload["html"]
+
+    payload = client.get("/guest/list/page?q=aktiv001").get_json()
+    assert payload["matching_count"] == 1
+    assert "Aktiv001" in payload["html"]
+
+
+def test_guest_list_matching_count_skips_feed_history(client, app, make_guest):
+    _bootstrap_login(client, app)
+    _add_guests(app, make_guest, 3, prefix="Zähl")
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lower())
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            assert guest_routes._guest_list_count("active", "zähl") == 3
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+    assert len(statements) == 1
+    assert "food_history" not in statements[0]
+
+
+def test_guest_list_latest_feed_date(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guests(app, make_guest, 1, prefix="Futter")[0]
+    with app.app_context():
+        db.session.add_all(
+            [
+                FoodHistory(guest_id=guest_id, distributed_on=date(2024, 1, 5)),
+                FoodHistory(guest_id=guest_id, distributed_on=date(2024, 3, 9)),
+            ]
+        )
+        db.session.commit()
+
+    html = client.get("/guest/list").get_data(as_text=True)
+    assert "09.03.2024" in html
+    assert "05.01.2024" not in html
+
+
+def test_guest_list_page_invalid_cursor(client, app):
+    _bootstrap_login(client, app)
+
+    response = client.get("/guest/list/page?cursor=kaputt")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_guest_list_page_reads_feed_history_for_its_guests_only(client, app, monkeypatch, make_guest):
+    monkeypatch.setattr(guest_routes, "GUEST_LIST_PAGE_SIZE", 2)
+    _bootstrap_login(client, app)
+    guest_ids = _add_guests(app, make_guest, 4, prefix="Blatt")
+    with app.app_context():
+        db.session.add_all(
+            FoodHistory(guest_id=guest_id, distributed_on=date(2024, 2, 1)) for guest_id in guest_ids
+        )
+        db.session.commit()
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "food_history" in statement.lower():
+            statements.append((statement.lower(), parameters))
+
+    with app.test_request_context("/guest/list/page"):
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            page = guest_routes._load_guest_list_page({})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+    assert [guest.id for guest in page["guests"]] == guest_ids[:2]
+    assert set(page["feed_history"]) == set(guest_ids[:2])
+    assert len(statements) == 1
+    assert " in (" in statements[0][0]
+    assert set(statements[0][1]) == set(guest_ids[:2])
+
+
+def test_guest_list_page_cursor_by_number(client, app, monkeypatch, make_guest):
+    monkeypatch.setattr(guest_routes, "GUEST_LIST_PAGE_SIZE", 2)
+    _bootstrap_login(client, app)
+    _add_guests(app, make_guest, 3, lifecycle_status="staging", prefix="Neu")
+    _add_guests(app, make_guest, 3, lifecycle_status="active", prefix="Da")
+
+    html = "".join(_collect_pages(client, "sort=number"))
+    order = [f"Da{index:03d}" for index in range(3)] + [f"Neu{index:03d}" for index in range(3)]
+    positions = [html.index(name) for name in order]
+    assert positions == sorted(positions)
+    assert all(html.count(name) == 1 for name in order)
@@ -0,0 +1,234 @@
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app.models import Animal, Guest, SearchIndexChange, User, db
+from app.search_index import current_search_index_version, guest_search_engine
+
+
+@pytest.fixture(autouse=True)
+def _reset_search_engine():
+    guest_search_engine.reset()
+    yield
+    guest_search_engine.reset()
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _add_guest(app, make_guest, firstname: str = "Suche", lastname: str = "Index") -> str:
+    guest_id = uuid.uuid4().hex[:6]
+    with app.app_context():
+        db.session.add(
+            make_guest(guest_id, firstname=firstname, lastname=lastname)
+        )
+        db.session.commit()
+    return guest_id
+
+
+def _version(client) -> int:
+    response = client.get("/guest/search-index/meta")
+    assert response.status_code == 200
+    return response.get_json()["version"]
+
+
+def test_search_index_version_bumps_on_guest_insert(client, app, make_guest):
+    _bootstrap_login(client, app)
+    before = _version(client)
+
+    _add_guest(app, make_guest)
+
+    assert _version(client) > before
+
+
+def test_search_index_revision_is_assigned_when_the_change_commits(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+
+    with app.app_context():
+        before = current_search_index_version()
+        guest = db.session.get(Guest, guest_id)
+        guest.lastname = "Umbenannt"
+        db.session.flush()
+        # Flushed but uncommitted changes carry no revision yet, so no client can sync past them.
+        assert db.session.query(SearchIndexChange.revision).filter_by(guest_id=guest_id).scalar() is None
+        db.session.commit()
+
+        assert db.session.query(SearchIndexChange.revision).filter_by(guest_id=guest_id).scalar() > before
+        assert current_search_index_version() > before
+
+
+def test_search_index_stamps_a_flush_with_one_insert(client, app, make_guest):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "search_index_changes" in statement:
+            statements.append(statement.split()[0].upper())
+
+    with app.app_context():
+        guests = [make_guest() for _ in range(3)]
+        db.session.add_all(guests)
+        db.session.add_all(
+            Animal(
+                guest_id=guest.id,
+                name="Minka",
+                species="Katze",
+                status=True,
+                created_on=date.today(),
+                updated_on=date.today(),
+            )
+            for guest in guests
+        )
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            db.session.commit()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+
+        # One DELETE of older rows, one INSERT for all guests, one UPDATE for the revision.
+        assert statements == ["DELETE", "INSERT", "UPDATE"]
+        revisions = {
+            revision for (revision,) in db.session.query(SearchIndexChange.revision).filter(
+                SearchIndexChange.guest_id.in_([guest.id for guest in guests])
+            )
+        }
+        assert len(revisions) == 1 and None not in revisions
+
+
+def test_search_index_version_ignores_unsearchable_update(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    before = _version(client)
+
+    with app.app_context():
+        guest = db.session.get(Guest, guest_id)
+        guest.notes = "Nur eine Notiz"
+        db.session.commit()
+
+    assert _version(client) == before
+
+
+def test_search_index_delta_changed_entries(client, app, make_guest):
+    _bootstrap_login(client, app)
+    untouched_id = _add_guest(app, make_guest, lastname="Unverändert")
+    guest_id = _add_guest(app, make_guest)
+    since = _version(client)
+
+    with app.app_context():
+        db.session.add(
+            Animal(
+                guest_id=guest_id,
+                name="Bello",
+                species="Hund",
+                status=True,
+                created_on=date.today(),
+                updated_on=date.today(),
+            )
+        )
+        db.session.commit()
+
+    response = client.get(f"/guest/search-index/delta?since={since}")
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["full"] is False
+    assert payload["version"] > since
+    assert [entry["id"] for entry in payload["entries"]] == [guest_id]
+    assert payload["entries"][0]["animals"] == ["Bello"]
+    assert untouched_id not in payload["removed"]
+
+
+def test_search_index_delta_removed_guest(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest)
+    since = _version(client)
+
+    with app.app_context():
+        db.session.delete(db.session.get(Guest, guest_id))
+        db.session.commit()
+
+    payload = client.get(f"/guest/search-index/delta?since={since}").get_json()
+    assert payload["entries"] == []
+    assert payload["removed"] == [guest_id]
+
+
+def test_search_index_delta_unknown_revision(client, app, make_guest):
+    _bootstrap_login(client, app)
+    _add_guest(app, make_guest)
+
+    payload = client.get("/guest/search-index/delta?since=999999").get_json()
+    assert payload["full"] is True
+
+    payload = client.get("/guest/search-index/delta?since=abc").get_json()
+    assert payload["full"] is True
+
+
+def _search(client, query: str) -> list:
+    response = client.get(f"/guest/search?q={query}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_guest_search_typo(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest, firstname="Erika", lastname="Mustermann")
+    _add_guest(app, make_guest, firstname="Hans", lastname="Meier")
+
+    results = _search(client, "Musterman")
+    assert [result["id"] for result in results] == [guest_id]
+
+    results = _search(client, "Mustremann")
+    assert [result["id"] for result in results] == [guest_id]
+
+
+def test_guest_search_exact_number_first(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest, firstname="Zora", lastname="Zeller")
+    _add_guest(app, make_guest, firstname="Anna", lastname="Zellermann")
+    with app.app_context():
+        number = db.session.get(Guest, guest_id).number
+
+    results = _search(client, number)
+    assert results[0]["id"] == guest_id
+
+
+def test_guest_search_animal_name_and_updates(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = _add_guest(app, make_guest, firstname="Tina", lastname="Tierlieb")
+    assert _search(client, "Schnuffel") == []
+
+    with app.app_context():
+        db.session.add(
+            Animal(
+                guest_id=guest_id,
+                name="Schnuffel",
+                species="Katze",
+                status=True,
+                created_on=date.today(),
+                updated_on=date.today(),
+            )
+        )
+        db.session.commit()
+
+    results = _search(client, "Schnuffel")
+    assert [result["id"] for result in results] == [guest_id]
+    assert results[0]["animals"] == ["Schnuffel"]
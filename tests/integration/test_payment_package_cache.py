@@ -0,0 +1,119 @@
+import uuid
+from decimal import Decimal
+
+import pytest
+from flask import render_template_string
+from sqlalchemy import event, update
+from werkzeug.security import generate_password_hash
+
+from app.models import PaymentPackage, User, db
+from app.payment_package_cache import PAYMENT_PACKAGE_REVISION, payment_package_cache
+from app.settings_cache import bump_revision
+
+
+@pytest.fixture(autouse=True)
+def _reset_payment_package_cache():
+    payment_package_cache.invalidate()
+    yield
+    payment_package_cache.invalidate()
+
+
+def _bootstrap_login(client, app, role: str = "admin") -> None:
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(
+            User(
+                username=username,
+                password_hash=generate_password_hash("admin"),
+                role=role,
+                realname=username,
+            )
+        )
+        db.session.commit()
+    response = client.post(
+        "/login",
+        data={"username": username, "password": "admin"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+
+def _count_package_queries(app, callback) -> int:
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM payment_packages" in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        callback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+    return len(statements)
+
+
+def test_template_without_packages_skips_query(app):
+    def _render():
+        with app.test_request_context("/login"):
+            assert render_template_string("{{ 'ok' }}") == "ok"
+
+    assert _count_package_queries(app, _render) == 0
+
+
+def test_payment_packages_cache_and_admin_routes(client, app, make_guest):
+    _bootstrap_login(client, app)
+    guest_id = uuid.uuid4().hex[:6]
+    with app.app_context():
+        db.session.add(
+            make_guest(guest_id, "P-1", firstname="Paket", lastname="Gast")
+        )
+        db.session.commit()
+
+    response = client.post(
+        "/admin/payment-packages",
+        data={"name": "Futterpaket Klein", "category": "food", "amount": "3,50", "active": "on"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    assert "Futterpaket Klein" in client.get(f"/guest/{guest_id}").get_data(as_text=True)
+
+    def _view():
+        assert client.get(f"/guest/{guest_id}").status_code == 200
+
+    assert _count_package_queries(app, _view) == 0
+
+    with app.app_context():
+        package_id = PaymentPackage.query.filter_by(name="Futterpaket Klein").one().id
+    response = client.post(
+        f"/admin/payment-packages/{package_id}/update",
+        data={"name": "Futterpaket Groß", "category": "food", "amount": "7,00", "active": "on"},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    html = client.get(f"/guest/{guest_id}").get_data(as_text=True)
+    assert "Futterpaket Groß" in html
+    assert "Futterpaket Klein" not in html
+
+    client.post(f"/admin/payment-packages/{package_id}/delete", follow_redirects=True)
+    assert "Futterpaket Groß" not in client.get(f"/guest/{guest_id}").get_data(as_text=True)
+
+
+def test_package_cache_reloads_after_another_worker_bumps_revision(app, monkeypatch):
+    with app.app_context():
+        db.session.add(PaymentPackage(name="Futterpaket Klein", category="food", amount=Decimal("3.50"), active=True))
+        db.session.commit()
+        assert [p.name for p in payment_package_cache.get()] == ["Futterpaket Klein"]
+        # Another worker renames the package; this process only sees the shared revision move.
+        table = PaymentPackage.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(table).values(name="Futterpaket Groß"))
+            bump_revision(connection, PAYMENT_PACKAGE_REVISION)
+
+        monkeypatch.setattr(payment_package_cache.watch, "poll_seconds", 3600)
+        assert [p.name for p in payment_package_cache.get()] == ["Futterpaket Klein"]
+
+        monkeypatch.setattr(payment_package_cache.watch, "poll_seconds", 0)
+        assert [p.name for p in payment_package_cache.get()] == ["Futterpaket Groß"]
@@ -0,0 +1,77 @@
+from app.helpers import is_active
+from app.models import Setting, db
+from app.settings_cache import SETTINGS_REVISION, bump_revision, bump_revision_after_commit, read_revision
+
+
+def _set_setting_elsewhere(app, key: str, value: str) -> None:
+    """Change a setting the way another worker would, without refreshing this worker's copy."""
+    with app.app_context():
+        Setting.query.filter_by(setting_key=key).one().value = value
+        db.session.commit()
+
+
+def test_settings_revision_bumps_once_per_commit(app):
+    with app.app_context():
+        before = read_revision(SETTINGS_REVISION)
+        Setting.query.filter_by(setting_key="payments").one().value = "Inaktiv"
+        Setting.query.filter_by(setting_key="tagsystem").one().value = "Inaktiv"
+        db.session.flush()
+        assert read_revision(SETTINGS_REVISION) == before
+        db.session.commit()
+        assert read_revision(SETTINGS_REVISION) == before + 1
+
+
+def test_bump_revision_creates_and_increments_counter(app):
+    with app.app_context():
+        for _ in range(2):
+            with db.engine.begin() as connection:
+                bump_revision(connection, "test:new-counter")
+        assert read_revision("test:new-counter") == 2
+
+
+def test_bump_revision_after_commit_skips_rolled_back_transactions(app):
+    with app.app_context():
+        db.session.connection()
+        bump_revision_after_commit(db.session(), {"test:after-commit"})
+        db.session.rollback()
+        db.session.commit()
+        assert read_revision("test:after-commit") == 0
+
+        bump_revision_after_commit(db.session(), {"test:after-commit"})
+        db.session.commit()
+        assert read_revision("test:after-commit") == 1
+
+
+def test_settings_cache_reloads_after_poll_interval(client, app, monkeypatch):
+    monkeypatch.setattr(app.settings_cache, "poll_seconds", 0)
+    app.refresh_settings()
+    assert is_active("tagsystem", app)
+
+    _set_setting_elsewhere(app, "tagsystem", "Inaktiv")
+    assert is_active("tagsystem", app)
+
+    client.get("/health")
+    assert not is_active("tagsystem", app)
+
+
+def test_settings_cache_skips_check_within_poll_interval(client, app, monkeypatch):
+    monkeypatch.setattr(app.settings_cache, "poll_seconds", 3600)
+    app.refresh_settings()
+    checks = app.settings_cache.metrics()["checks"]
+
+    _set_setting_elsewhere(app, "locations", "Inaktiv")
+    client.get("/health")
+
+    assert app.settings_cache.metrics()["checks"] == checks
+    assert is_active("locations", app)
+
+
+def test_settings_cache_metrics(client, app, monkeypatch):
+    monkeypatch.setattr(app.settings_cache, "poll_seconds", 0)
+    response = client.get("/health/settings")
+    assert response.status_code == 200
+    payload = response.get_json()
+    with app.app_context():
+        assert payload["revision"] == read_revision(SETTINGS_REVISION)
+    assert payload["checks"] >= 1
+    assert {"reloads", "skipped_checks", "check_errors", "last_check_at"} <= payload.keys()
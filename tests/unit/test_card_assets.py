@@ -0,0 +1,107 @@
+import io
+
+import pytest
+
+from app import card_assets, reports
+from app.models import db
+
+
+@pytest.fixture(autouse=True)
+def _clear_asset_caches():
+    card_assets.qr_code_cache.clear()
+    card_assets.logo_cache.clear()
+    yield
+    card_assets.qr_code_cache.clear()
+    card_assets.logo_cache.clear()
+
+
+def _count_qr_renders(monkeypatch) -> list:
+    calls = []
+    real_make = card_assets.qrcode.make
+
+    def _make(payload):
+        calls.append(payload)
+        return real_make(payload)
+
+    monkeypatch.setattr(card_assets.qrcode, "make", _make)
+    return calls
+
+
+def test_qr_code_cache_renders_once(monkeypatch):
+    calls = _count_qr_renders(monkeypatch)
+
+    first = card_assets.qr_code_cache.png("ABC123")
+    second = card_assets.qr_code_cache.png("ABC123")
+
+    assert first == second
+    assert first.startswith(b"\x89PNG")
+    assert calls == ["ABC123"]
+
+
+def test_qr_code_cache_disk_tier(monkeypatch, tmp_path):
+    calls = _count_qr_renders(monkeypatch)
+    data = card_assets.qr_code_cache.png("DISK01", disk_dir=str(tmp_path))
+    card_assets.qr_code_cache.clear()
+
+    assert card_assets.qr_code_cache.png("DISK01", disk_dir=str(tmp_path)) == data
+    assert calls == ["DISK01"]
+    assert [entry.name for entry in tmp_path.iterdir()] == [f"{card_assets.QRCodeCache.key('DISK01')}.png"]
+
+
+def test_logo_cache_static_logo(app):
+    with app.test_request_context():
+        assert card_assets.load_logo_reader(None) is card_assets.load_logo_reader("/static/logo.png")
+
+
+def test_guest_cards_query_and_qr_count(app, monkeypatch, make_guest):
+    calls = _count_qr_renders(monkeypatch)
+    with app.app_context():
+        for index in range(3):
+            db.session.add(
+                make_guest(f"CARD{index}", f"2024{index:03d}", firstname="Karten", lastname=f"Gast{index}")
+            )
+        db.session.commit()
+
+        guest_ids = ["CARD2", "MISSING", "CARD0", "CARD1"]
+        loaded = reports._load_guests_in_order(guest_ids)
+        assert sorted(loaded) == ["CARD0", "CARD1", "CARD2"]
+
+        with app.test_request_context():
+            buffer = reports.generate_multiple_gast_cards_pdf_LP898(guest_ids, double_sided=True)
+            reports.generate_multiple_gast_cards_pdf_DP839(guest_ids, double_sided=True)
+
+    assert isinstance(buffer, io.BytesIO)
+    assert buffer.getvalue().startswith(b"%PDF")
+    assert sorted(calls) == ["CARD0", "CARD1", "CARD2"]
+
+
+def test_parallel_guest_cards_match_sequential(app, make_guest):
+    from pypdf import PdfReader
+
+    with app.app_context():
+        guest_ids = []
+        for index in range(12):
+            guest_ids.append(f"PAR{index:02d}")
+            db.session.add(
+                make_guest(guest_ids[-1], f"2025{index:03d}", firstname="Parallel", lastname=f"Gast{index}")
+            )
+        db.session.commit()
+
+        try:
+            with app.test_request_context():
+                parallel = reports.generate_multiple_gast_cards_pdf_parallel(
+                    guest_ids, double_sided=True, max_workers=2
+                )
+                sequential = reports.generate_multiple_gast_cards_pdf(guest_ids, double_sided=True)
+        finally:
+            if reports._card_pool is not None:
+                reports._card_pool.shutdown()
+                reports._card_pool = None
+
+    parallel_pages = PdfReader(parallel).pages
+    sequential_pages = PdfReader(sequential).pages
+    assert len(parallel_pages) == len(sequential_pages) == 4
+    for merged, expected in zip(parallel_pages, sequential_pages):
+        assert merged.extract_text() == expected.extract_text()
+    assert "Gast0" in parallel_pages[0].extract_text()
+    assert "Gast10" in parallel_pages[1].extract_text()
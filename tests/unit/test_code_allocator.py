@@ -0,0 +1,43 @@
+from datetime import date
+
+from app.code_allocator import GuestCodeAllocator, commit_with_guest_code, guest_codes
+from app.models import Guest, db
+
+
+def _choices(monkeypatch, codes: str) -> None:
+    chars = iter(codes)
+    monkeypatch.setattr("app.code_allocator.secrets.choice", lambda alphabet: next(chars))
+
+
+def test_reserve_skips_used_ids(app, monkeypatch, make_guest):
+    db.session.add(make_guest("DDDDDD", "ALLOC-1"))
+    db.session.commit()
+    allocator = GuestCodeAllocator()
+    _choices(monkeypatch, "DDDDDD" "EEEEEE" "EEEEEE" "FFFFFF")
+
+    assert allocator.reserve(1) == ["EEEEEE"]
+    assert allocator.reserve(1) == ["FFFFFF"]
+
+
+def test_commit_with_guest_code_retries_conflict(app, monkeypatch, make_guest):
+    guest_codes.invalidate()
+    guest_codes.reserve(0)  # take the snapshot before the other worker inserts
+    db.session.execute(
+        Guest.__table__.insert().values(
+            id="GGGGGG",
+            number="ALLOC-2",
+            firstname="Other",
+            lastname="Worker",
+            member_since=date.today(),
+            created_on=date.today(),
+            updated_on=date.today(),
+            lifecycle_status="active",
+        )
+    )
+    db.session.commit()
+    _choices(monkeypatch, "GGGGGG" "HHHHHH")
+
+    guest_id = commit_with_guest_code(lambda new_id: db.session.add(make_guest(new_id, "ALLOC-3")))
+
+    assert guest_id == "HHHHHH"
+    assert db.session.get(Guest, "HHHHHH").number == "ALLOC-3"
@@ -0,0 +1,95 @@
+import uuid
+from datetime import date
+
+from app.food_plan_cache import food_plan_cache, food_plan_revision
+from app.models import Animal, FoodPlan, FoodPlanGuest, Guest, User, db
+from app.routes.food_plan_routes import _computed_plan_or_404
+
+
+def _plan_with_guest(make_guest):
+    suffix = uuid.uuid4().hex[:8]
+    user = User(username=f"plan-{suffix}", password_hash="x", role="admin", realname="Plan")
+    guest = make_guest(suffix[:6], f"FP-{suffix}", firstname="Futter", lastname=suffix)
+    db.session.add_all([user, guest])
+    db.session.flush()
+    db.session.add(
+        Animal(
+            guest_id=guest.id, species="Hund", name="Bello", status=True,
+            created_on=date.today(), updated_on=date.today(),
+        )
+    )
+    plan = FoodPlan(title="Cache", created_by_id=user.id)
+    db.session.add(plan)
+    db.session.flush()
+    db.session.add(FoodPlanGuest(food_plan_id=plan.id, guest_id=guest.id, sort_order=1))
+    db.session.commit()
+    return plan.id, guest.id
+
+
+def test_computed_plan_cached_until_revision_changes(app, make_guest):
+    food_plan_cache.clear()
+    plan_id, guest_id = _plan_with_guest(make_guest)
+
+    with app.test_request_context():
+        _, first = _computed_plan_or_404(plan_id)
+        _, second = _computed_plan_or_404(plan_id)
+        assert second is first
+        assert first["guests"][0]["animals"][0]["name"] == "Bello"
+
+        revision = food_plan_revision(plan_id)
+        Animal.query.filter_by(guest_id=guest_id).first().name = "Rex"
+        db.session.commit()
+        assert food_plan_revision(plan_id) > revision
+        _, renamed = _computed_plan_or_404(plan_id)
+        assert renamed is not first
+        assert renamed["guests"][0]["animals"][0]["name"] == "Rex"
+
+
+def test_computed_plan_invalidated_by_bulk_delete(app, make_guest):
+    food_plan_cache.clear()
+    plan_id, _ = _plan_with_guest(make_guest)
+
+    with app.test_request_context():
+        _, before = _computed_plan_or_404(plan_id)
+        assert len(before["guests"]) == 1
+
+        FoodPlanGuest.query.filter(FoodPlanGuest.food_plan_id == plan_id).delete(synchronize_session=False)
+        db.session.commit()
+        _, after = _computed_plan_or_404(plan_id)
+        assert after["guests"] == []
+
+
+def test_guest_change_invalidates_only_the_plans_of_that_guest(app, make_guest):
+    food_plan_cache.clear()
+    plan_id, guest_id = _plan_with_guest(make_guest)
+    other_plan_id, _ = _plan_with_guest(make_guest)
+
+    with app.test_request_context():
+        _, plan = _computed_plan_or_404(plan_id)
+        _, other_plan = _computed_plan_or_404(other_plan_id)
+
+        db.session.get(Guest, guest_id).firstname = "Umbenannt"
+        db.session.commit()
+
+        assert _computed_plan_or_404(other_plan_id)[1] is other_plan
+        renamed = _computed_plan_or_404(plan_id)[1]
+        assert renamed is not plan
+        assert renamed["guests"][0]["name"].startswith("Umbenannt")
+
+
+def test_scoped_bulk_delete_invalidates_only_its_plan(app, make_guest):
+    food_plan_cache.clear()
+    plan_id, _ = _plan_with_guest(make_guest)
+    other_plan_id, _ = _plan_with_guest(make_guest)
+
+    with app.test_request_context():
+        _, other_plan = _computed_plan_or_404(other_plan_id)
+        _computed_plan_or_404(plan_id)
+
+        FoodPlanGuest.query.filter(FoodPlanGuest.food_plan_id == plan_id).execution_options(
+            food_plan_id=plan_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+        assert _computed_plan_or_404(plan_id)[1]["guests"] == []
+        assert _computed_plan_or_404(other_plan_id)[1] is other_plan
@@ -1,3 +1,9 @@
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.models import FoodPlan, FoodPlanGuest, Guest, User, db
 from app.routes import food_plan_routes as fpr
 
 
@@ -15,3 +21,77 @@ def test_normalize_recent_food_filter():
     assert fpr._normalize_recent_food_filter("all") == "all"
     assert fpr._normalize_recent_food_filter("only_recent") == "only_recent"
     assert fpr._normalize_recent_food_filter("bad") == "all"
+
+
+def _plan_with_guests(make_guest):
+    """A plan holding the first of three new guests, plus an eligible query over all three."""
+    suffix = uuid.uuid4().hex[:6]
+    user = User(username=f"bulk-{suffix}", password_hash="x", role="admin", realname="Bulk")
+    db.session.add(user)
+    guests = [
+        make_guest(
+            f"{suffix[:4]}{idx:02d}", f"BULK-{suffix}-{idx}", firstname="Bulk", lastname=f"{suffix}-{name}"
+        )
+        for idx, name in enumerate(["Cäsar", "Anton", "Berta"])
+    ]
+    db.session.add_all(guests)
+    db.session.flush()
+    plan = FoodPlan(title="Bulk", created_by_id=user.id)
+    db.session.add(plan)
+    db.session.flush()
+    db.session.add(FoodPlanGuest(food_plan_id=plan.id, guest_id=guests[0].id, sort_order=5))
+    db.session.commit()
+
+    eligible = (
+        Guest.query.filter(Guest.lastname.startswith(suffix))
+        .with_entities(Guest.id, Guest.lastname, Guest.firstname, Guest.number)
+        .distinct()
+    )
+    return plan, guests, eligible
+
+
+def test_bulk_add_guests_single_insert(app, make_guest):
+    plan, guests, eligible = _plan_with_guests(make_guest)
+    inserts = []
+
+    def _count_inserts(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("INSERT") and "food_plan_guests" in statement:
+            inserts.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _count_inserts)
+    try:
+        assert fpr._bulk_add_guests(plan.id, eligible) == (2, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_inserts)
+
+    assert len(inserts) == 1
+    rows = (
+        FoodPlanGuest.query.filter_by(food_plan_id=plan.id)
+        .order_by(FoodPlanGuest.sort_order)
+        .with_entities(FoodPlanGuest.guest_id, FoodPlanGuest.sort_order)
+        .all()
+    )
+    assert rows == [(guests[0].id, 5), (guests[1].id, 6), (guests[2].id, 7)]
+    assert fpr._bulk_add_guests(plan.id, eligible) == (0, 3)
+
+
+def test_bulk_add_guests_retries_after_concurrent_insert(app, make_guest):
+    plan, guests, eligible = _plan_with_guests(make_guest)
+    attempts = []
+
+    def _conflict_once(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("INSERT") and "food_plan_guests" in statement:
+            attempts.append(statement)
+            if len(attempts) == 1:
+                raise IntegrityError(statement, parameters, Exception("Duplicate entry"))
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _conflict_once)
+    try:
+        assert fpr._bulk_add_guests(plan.id, eligible) == (2, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", _conflict_once)
+
+    assert len(attempts) == 2
+    assert FoodPlanGuest.query.filter_by(food_plan_id=plan.id).count() == 3
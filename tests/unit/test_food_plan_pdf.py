@@ -0,0 +1,85 @@
+import io
+
+from pypdf import PdfReader
+
+from app.food_plan_pdf import FOOD_PLAN_PDF_TABLE_ROWS, render_food_plan_pdf
+
+
+def _animal(idx: int, **overrides) -> dict:
+    animal = {
+        "id": idx,
+        "species": "Hund",
+        "name": f"Tier {idx}",
+        "age": "3 Jahre",
+        "weight_or_size": "",
+        "food_type": "Trocken",
+        "complete_care": "Nein",
+        "combo": (("Senior", "#ff0000"),),
+        "combo_label": "Senior",
+        "tags": [{"name": "Senior", "color": "#ff0000"}, {"name": "<Diät>", "color": "red; x"}],
+        "food_info": "",
+        "allergies": "",
+        "illnesses": "",
+        "note": "",
+        "guest_id": f"g{idx}",
+        "guest_number": f"N-{idx}",
+        "guest_name": f"Gast {idx} & Co",
+    }
+    animal.update(overrides)
+    return animal
+
+
+def _computed(mode: str, guest_count: int = 3) -> dict:
+    guests = []
+    for idx in range(guest_count):
+        animals = [_animal(idx, food_info="200 g" if idx == 0 else "", allergies="Huhn" if idx == 1 else "")]
+        guests.append({
+            "id": f"g{idx}", "number": f"N-{idx}", "name": f"Gast {idx} & Co", "address": "Weg 1",
+            "city_line": "00001 Kurzdorf", "phone": "", "mobile": "0170", "email": "", "dispense_location_id": None,
+            "note": "Klingeln" if idx == 0 else "", "sort_order": idx, "animals": animals,
+        })
+    entries = [animal for guest in guests for animal in guest["animals"]]
+    combo = {"combo": entries[0]["combo"], "combo_label": "Senior", "tags": entries[0]["tags"],
+             "count": len(entries), "entries": entries}
+    return {
+        "mode": mode,
+        "general_note": "Bitte <zügig> packen",
+        "guests": guests,
+        "grouped": {},
+        "grouped_sorted": [{"species": "Hund", "combos": [combo]}],
+        "combo_summary_by_species": [{"species": "Hund", "combos": [dict(combo, entries=None)]}],
+        "special": [e for e in entries if e["food_info"] or e["allergies"]],
+        "tagsystem_active": True,
+    }
+
+
+def _text(pdf: bytes) -> str:
+    return " ".join(" ".join(page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages).split())
+
+
+def test_render_food_plan_pdf_all_modes():
+    for mode, expected in (
+        ("guest_view", "Ansicht: Gäste › Tiere › Tags"),
+        ("detail_view", "Futtermenge / Futterinfo: 200 g"),
+        ("type_view", "N-2 Gast 2 & Co — Tier 2"),
+        ("type_summary", "Anzahl Tiere"),
+    ):
+        pdf = render_food_plan_pdf(_computed(mode), title="Samstag", status="Packen", location_name="Halle")
+        assert pdf.startswith(b"%PDF")
+        text = _text(pdf)
+        assert expected in text
+        assert "Bitte <zügig> packen" in text
+        assert "Standort: Halle" in text
+
+
+def test_render_food_plan_pdf_detail_view():
+    pdf = render_food_plan_pdf(_computed("detail_view"), title="Samstag", status="Packen")
+    assert len(PdfReader(io.BytesIO(pdf)).pages) == 3
+
+
+def test_render_food_plan_pdf_large_plan():
+    guest_count = FOOD_PLAN_PDF_TABLE_ROWS * 3
+    pdf = render_food_plan_pdf(_computed("type_view", guest_count=guest_count), title="Groß", status="Planen")
+    text = _text(pdf)
+    assert f"N-{guest_count - 1} Gast {guest_count - 1} & Co" in text
+    assert text.count("Tag-Kombination") > 1
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from app.guest_numbers import (
+    GuestNumberPattern,
+    allocate_guest_numbers,
+    current_guest_number_pattern,
+    reserve_guest_numbers,
+)
+from app.models import Setting, db
+
+
+def test_current_guest_number_pattern(app, monkeypatch):
+    class _Setting:
+        value = "GTNN00-YYYY-NNN/MM"
+
+    class _Query:
+        def filter_by(self, **_kwargs):
+            return self
+
+        def first(self):
+            return _Setting()
+
+    monkeypatch.setattr(Setting, "query", _Query())
+    pattern = current_guest_number_pattern(datetime(2026, 3, 5))
+
+    assert pattern == GuestNumberPattern(prefix="GTNN00-2026-", digits=3, suffix="/03")
+    assert pattern.key == "GTNN00-2026-###/03"
+    assert pattern.counter_of("GTNN00-2026-017/03") == 17
+    assert pattern.counter_of("GTNN00-2026-0017/03") is None
+
+
+def test_allocate_guest_numbers(app, make_guest):
+    pattern = GuestNumberPattern(prefix="SQ1-", digits=4, suffix="")
+    db.session.add_all(
+        [make_guest("SEQ001", "SQ1-0041"), make_guest("SEQ002", "SQ1-12345"), make_guest("SEQ003", "XX-9999")]
+    )
+    db.session.commit()
+
+    assert allocate_guest_numbers(2, pattern) == ["SQ1-0042", "SQ1-0043"]
+    db.session.commit()
+    # The counter is not re-read from the guests table once it exists.
+    db.session.add(make_guest("SEQ004", "SQ1-0100"))
+    db.session.commit()
+    assert allocate_guest_numbers(1, pattern) == ["SQ1-0044"]
+
+
+def test_reserve_guest_numbers_skips_matching_numbers(app):
+    pattern = GuestNumberPattern(prefix="SQ2-", digits=3, suffix="-X")
+
+    reserve_guest_numbers(["SQ2-010-X", "SQ2-500", "andere"], pattern)
+    reserve_guest_numbers(["SQ2-004-X"], pattern)
+
+    assert allocate_guest_numbers(1, pattern) == ["SQ2-011-X"]
@@ -6,10 +6,11 @@ from app.helpers import (
     _settings_value,
     format_date,
     format_date_iso,
+    generate_unique_codes,
     is_active,
     is_different,
 )
-from app.models import Guest
+from app.models import Guest, db
 
 
 def test_format_date_from_datetime():
@@ -69,3 +70,12 @@ def test_is_active_false_when_setting_inactive():
         config = {"SETTINGS": {"payments": {"value": "Inaktiv"}}}
 
     assert is_active("payments", app=_FakeApp()) is False
+
+
+def test_generate_unique_codes_replaces_existing_ids(app, monkeypatch, make_guest):
+    db.session.add(make_guest("AAAAAA", "CODE-1"))
+    db.session.commit()
+    chars = iter("AAAAAA" "BBBBBB" "CCCCCC")
+    monkeypatch.setattr("app.code_allocator.secrets.choice", lambda alphabet: next(chars))
+
+    assert sorted(generate_unique_codes(2)) == ["BBBBBB", "CCCCCC"]
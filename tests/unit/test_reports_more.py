@@ -37,6 +37,27 @@ def test_generate_payment_report_multiple_pages(app, monkeypatch):
         assert buffer.getbuffer().nbytes > 0
 
 
+def test_generate_payment_report_carry_over(app, monkeypatch):
+    from pypdf import PdfReader
+    import flask_login
+
+    class _User:
+        realname = "Tester"
+
+    monkeypatch.setattr(flask_login, "current_user", _User())
+    records = [_Record(i) for i in range(60)]
+    records[30].food_amount = 10.5
+    with app.app_context():
+        reader = PdfReader(reports.generate_payment_report(records, date.today(), date.today()))
+
+    pages = [" ".join(page.extract_text().split()) for page in reader.pages]
+    assert len(pages) == 3
+    assert "Zwischensumme 25,00 25,00 50,00" in pages[0]
+    assert "Übertrag 25,00 25,00 50,00" in pages[1]
+    assert "Zwischensumme 59,50 50,00 109,50" in pages[1]
+    assert "Gesamtsumme 69,50 60,00 129,50" in pages[2]
+
+
 def test_generate_multiple_gast_cards_pdf_dp839(app, monkeypatch):
     with app.app_context():
         setting = Setting.query.filter_by(setting_key="guestCardFormat").first()
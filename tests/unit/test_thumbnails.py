@@ -0,0 +1,84 @@
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from app.storage import LocalStorage
+from app.thumbnails import ThumbnailError, _render_locks, ensure_thumbnail, render_thumbnail, thumbnail_path, thumbnail_paths
+
+
+def _png(width: int, height: int, mode: str = "RGBA") -> bytes:
+    out = io.BytesIO()
+    Image.new(mode, (width, height), (200, 10, 10, 128) if mode == "RGBA" else (200, 10, 10)).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_render_thumbnail():
+    webp = Image.open(io.BytesIO(render_thumbnail(_png(1200, 600), "small", "webp")))
+    assert webp.format == "WEBP"
+    assert webp.size == (160, 80)
+
+    jpeg = Image.open(io.BytesIO(render_thumbnail(_png(300, 900), "medium", "jpeg")))
+    assert jpeg.format == "JPEG"
+    assert jpeg.mode == "RGB"
+    assert jpeg.size == (160, 480)
+
+
+def test_render_thumbnail_not_an_image():
+    with pytest.raises(ThumbnailError):
+        render_thumbnail(b"%PDF-1.4", "small", "jpeg")
+
+
+def test_thumbnail_path():
+    assert thumbnail_path("guest/abc/1234.png", "small", "webp") == "guest/abc/1234.thumb-v1-160.webp"
+    assert len(set(thumbnail_paths("guest/abc/1234.png"))) == 4
+
+
+def test_ensure_thumbnail_renders_once(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    storage.put("guest/abc/1234.png", io.BytesIO(_png(800, 800, "RGB")))
+    renders = []
+    monkeypatch.setattr(
+        "app.thumbnails.render_thumbnail",
+        lambda data, size, fmt: renders.append(size) or render_thumbnail(data, size, fmt),
+    )
+
+    first = ensure_thumbnail(storage, "guest/abc/1234.png", "small", "jpeg")
+    second = ensure_thumbnail(storage, "guest/abc/1234.png", "small", "jpeg")
+
+    assert first == second
+    assert renders == ["small"]
+    assert (tmp_path / "guest/abc/1234.thumb-v1-160.jpeg").exists()
+
+
+def test_concurrent_requests_render_thumbnail_once(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    storage.put("guest/abc/1234.png", io.BytesIO(_png(800, 800, "RGB")))
+    renders = []
+    release = threading.Event()
+
+    def _slow_render(data, size, fmt):
+        renders.append(size)
+        release.wait(5)
+        return render_thumbnail(data, size, fmt)
+
+    monkeypatch.setattr("app.thumbnails.render_thumbnail", _slow_render)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(ensure_thumbnail(storage, "guest/abc/1234.png", "small", "jpeg")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    # Let every thread queue on the lock before the first render finishes.
+    while _render_locks.get("guest/abc/1234.thumb-v1-160.jpeg", [None, 0])[1] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert renders == ["small"]
+    assert len(results) == 4 and len(set(results)) == 1
+    assert _render_locks == {}